@@ -0,0 +1,63 @@
+"""Fixed datasets for the benchmarks. The same seed and size always give
+the same data, so runs on different trees compare like for like
+"""
+import random
+import datetime as dt
+from typing import (
+    Iterator,
+    Tuple,
+    Dict,
+    Any,
+)
+from bot import Row
+from idset import encode_id
+from utils import fingerprint
+
+
+__all__ = (
+    'SEED',
+    'post_rows',
+    'json_pairs',
+)
+
+
+SEED = 1729
+_WORDS = (
+    'minecraft server world crash java bedrock mod forge fabric launcher '
+    'chunk lag memory texture shader creeper villager redstone nether end '
+    'backup save corrupted login account realm update version error help'
+).split()
+_EPOCH = dt.datetime(2024, 1, 1)
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return ' '.join(rng.choice(_WORDS) for _ in range(words))
+
+
+def post_rows(size: int, seed: int = SEED) -> Iterator[Row]:
+    """`size` rows shaped like the bot's tracked posts, with bodies of 20
+    to 400 words and about ten posts per author
+    """
+    rng = random.Random(seed)
+    for i in range(size):
+        text = _sentence(rng, rng.randint(20, 400))
+        created = str(_EPOCH + dt.timedelta(seconds=i * 37))
+        yield Row(
+            username=f"user{rng.randrange(max(1, size // 10))}",
+            title=_sentence(rng, rng.randint(3, 12)),
+            text=text,
+            post_id=encode_id(36 ** 6 + i),
+            deletion_method=None,
+            post_last_edit=None,
+            record_created=created,
+            record_edited=created,
+            reddit_edited=0.0,
+            text_hash=fingerprint(text),
+        )
+
+
+def json_pairs(size: int, seed: int = SEED) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """`size` small JSON objects keyed by post id, like checkpoint state"""
+    rng = random.Random(seed)
+    for i in range(size):
+        yield encode_id(36 ** 6 + i), {'seen': rng.random() < 0.5, 'edited': rng.randrange(10**9)}
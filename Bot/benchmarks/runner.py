@@ -0,0 +1,169 @@
+"""Runs the registered benchmarks, writes their results as JSON and flags
+regressions against a baseline. Run from the ``Bot`` directory:
+
+    python -m benchmarks [--sizes 1000,100000] [--filter model.] [--repeat 5]
+                         [--output results.json] [--baseline FILE] [--save-baseline]
+
+Every benchmark fills a fresh store with a fixed dataset of each size, then
+times the same batch of operations ``repeat`` times; the best time per
+operation is reported, as it is the least affected by other load
+"""
+import json
+import time
+import shutil
+import sqlite3
+import argparse
+import platform
+import tempfile
+import datetime as dt
+from pathlib import Path
+from typing import (
+    NamedTuple,
+    Optional,
+    Callable,
+    Iterable,
+    Union,
+    Tuple,
+    List,
+    Dict,
+    Any,
+)
+
+
+__all__ = (
+    'BASELINE_PATH',
+    'benchmark',
+    'compare',
+    'run',
+)
+
+
+BASELINE_PATH = Path(__file__).parent / 'baseline.json'
+DEFAULT_SIZES = (1_000, 100_000)
+# a measurement times a callable returning how many operations it made
+Measurement = Callable[[], int]
+# optionally with a callable run untimed after each repeat, to undo what it did
+Setup = Union[Measurement, Tuple[Measurement, Callable[[], None]]]
+
+
+class Benchmark(NamedTuple):
+    name: str
+    setup: Callable[[Path, int, Optional[str]], Setup]
+    variants: Tuple[Optional[str], ...]
+
+
+BENCHMARKS: Dict[str, Benchmark] = {}
+
+
+def benchmark(name: str, variants: Iterable[str] = ()) -> Callable[[Any], Any]:
+    """Register a setup function ``(directory, size, variant) -> measurement``.
+    It prepares a store of ``size`` entries in ``directory`` and returns the
+    callable that is timed, or a ``(measurement, reset)`` pair when the store
+    has to be put back between repeats
+    """
+    def decorator(setup: Callable[[Path, int, Optional[str]], Setup]) -> Any:
+        BENCHMARKS[name] = Benchmark(name, setup, tuple(variants) or (None,))
+        return setup
+    return decorator
+
+
+def _key(name: str, variant: Optional[str], size: int) -> str:
+    return f"{name}[{variant}]/{size}" if variant else f"{name}/{size}"
+
+
+def run(sizes: Iterable[int] = DEFAULT_SIZES, pattern: str = '', repeat: int = 5,
+        report: Callable[[str], None] = print) -> Dict[str, Any]:
+    from . import storage  # noqa: F401  registers the benchmarks
+
+    results: Dict[str, Any] = {}
+    # each benchmark gets a directory of its own; setups may keep data they
+    # can reuse (e.g. a filled database to copy) next to it, in the root
+    with tempfile.TemporaryDirectory() as root:
+        for bench in BENCHMARKS.values():
+            for variant in bench.variants:
+                for size in sizes:
+                    key = _key(bench.name, variant, size)
+                    if pattern not in key:
+                        continue
+                    directory = Path(root, f"case{len(results)}")
+                    directory.mkdir()
+                    measure = bench.setup(directory, size, variant)
+                    reset = None
+                    if isinstance(measure, tuple):
+                        measure, reset = measure
+                    timings = []
+                    for _ in range(repeat):
+                        started = time.perf_counter()
+                        ops = measure()
+                        timings.append((time.perf_counter() - started) / ops)
+                        if reset is not None:
+                            reset()
+                    shutil.rmtree(directory)
+                    results[key] = _result(timings, ops, repeat)
+                    report(f"{key:<40} {results[key]['per_op_us']:>14,.2f} us/op")
+    return {
+        'meta': {
+            'date': dt.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+        },
+        'results': results,
+    }
+
+
+def _result(timings: List[float], ops: int, repeat: int) -> Dict[str, Any]:
+    best = min(timings)
+    return {
+        'per_op_us': round(best * 1e6, 3),
+        'ops_per_s': round(1 / best, 1),
+        'ops': ops,
+        'repeat': repeat,
+    }
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any],
+            threshold: float = 0.25) -> List[Tuple[str, float]]:
+    """The benchmarks that got slower than the baseline by more than
+    `threshold` (0.25 = 25%), with their ratio to it
+    """
+    regressions = []
+    for key, result in results['results'].items():
+        base = baseline['results'].get(key)
+        if base is None:
+            continue
+        ratio = result['per_op_us'] / base['per_op_us']
+        if ratio > 1 + threshold:
+            regressions.append((key, ratio))
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Storage layer benchmarks")
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                        help="comma separated store sizes")
+    parser.add_argument('--filter', default='', help="only run benchmarks whose key contains this")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', type=Path, help="write the results to this JSON file")
+    parser.add_argument('--baseline', type=Path, default=BASELINE_PATH)
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help="slowdown over the baseline reported as a regression")
+    parser.add_argument('--save-baseline', action='store_true',
+                        help="store the results as the new baseline")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    results = run(sizes, args.filter, args.repeat)
+    if args.output is not None:
+        args.output.write_text(json.dumps(results, indent=4))
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(results, indent=4))
+        print(f"Saved the baseline to {args.baseline}")
+        return 0
+    if not args.baseline.exists():
+        return 0
+
+    regressions = compare(results, json.loads(args.baseline.read_text()), args.threshold)
+    for key, ratio in regressions:
+        print(f"REGRESSION {key}: {ratio:.2f}x the baseline")
+    return 1 if regressions else 0
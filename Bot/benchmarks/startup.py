@@ -0,0 +1,101 @@
+"""Cold start benchmark of the bot. Run from the ``Bot`` directory:
+
+    python -m benchmarks.startup [--runs N] [--top N] [--json]
+
+It reports what importing ``main`` costs according to ``python -X importtime``,
+the slowest modules it pulls in, whether praw got imported (it should not be)
+and the wall time of the ``help`` command, each in a fresh interpreter
+"""
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+from pathlib import Path
+from typing import (
+    NamedTuple,
+    Optional,
+    List,
+    Dict,
+    Any,
+)
+
+
+BOT_DIR = Path(__file__).parent.parent
+
+
+class ImportTime(NamedTuple):
+    module: str
+    self_us: int
+    cumulative_us: int
+
+
+def import_times(module: str = 'main') -> List[ImportTime]:
+    """Every import made by a fresh interpreter importing `module`, in the
+    order ``-X importtime`` reports them
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f"import {module}"],
+        cwd=BOT_DIR, capture_output=True, text=True, check=True,
+    )
+    times = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        times.append(ImportTime(name.strip(), int(self_us), int(cumulative_us)))
+    return times
+
+
+def command_time(args: List[str], runs: int) -> float:
+    """Median wall time in seconds of ``python main.py *args``"""
+    durations = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run(
+            [sys.executable, 'main.py', *args],
+            cwd=BOT_DIR, capture_output=True, check=True,
+        )
+        durations.append(time.perf_counter() - started)
+    return statistics.median(durations)
+
+
+def run(runs: int = 5, top: int = 10) -> Dict[str, Any]:
+    samples = [import_times() for _ in range(runs)]
+    totals = [next(t.cumulative_us for t in times if t.module == 'main') for times in samples]
+    slowest = sorted(samples[-1], key=lambda t: t.self_us, reverse=True)[:top]
+    return {
+        'import_main_us': int(statistics.median(totals)),
+        'modules': len(samples[-1]),
+        'praw_imported': any(t.module.split('.')[0] == 'praw' for t in samples[-1]),
+        'slowest': [t._asdict() for t in slowest],
+        'help_command_s': round(command_time(['help'], runs), 4),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--json', action='store_true', help="print the results as JSON")
+    args = parser.parse_args(argv)
+
+    results = run(args.runs, args.top)
+    if args.json:
+        print(json.dumps(results, indent=4))
+        return 0
+
+    print(f"import main: {results['import_main_us'] / 1000:.1f} ms, {results['modules']} modules")
+    print(f"praw imported: {results['praw_imported']}")
+    print(f"main.py help: {results['help_command_s'] * 1000:.1f} ms")
+    print("slowest modules (self time):")
+    for t in results['slowest']:
+        print(f"  {t['self_us'] / 1000:8.2f} ms  {t['module']}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(
+        main()
+    )
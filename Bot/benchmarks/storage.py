@@ -0,0 +1,188 @@
+# mypy: disable-error-code=attr-defined
+"""Benchmarks of `sqlitewrapper` (through the bot's `Posts` table) and of
+`jsonwrapper`. Each one fills a store of the given size and measures a
+fixed batch of operations on it
+"""
+import os
+import random
+import shutil
+from pathlib import Path
+from typing import (
+    Optional,
+    List,
+)
+from bot import Posts, Row
+from jsonwrapper import AutoSaveDict, JournalDict
+from .datasets import SEED, post_rows, json_pairs
+from .runner import benchmark, Measurement, Setup
+
+
+# operations per measurement
+OPS = 100
+# each write rewrites the whole file, keep it short
+FILE_OPS = 10
+BACKENDS = ('sqlite', 'dict')
+
+
+def _fill(directory: Path, size: int, backend: str) -> Posts:
+    posts = Posts('bench', directory, backend)
+    posts.init()
+    with posts.unit_of_work(max_pending=10_000):
+        for row in post_rows(size):
+            posts.save(row)
+    return posts
+
+
+def _posts(directory: Path, size: int, backend: Optional[str]) -> Posts:
+    """A `Posts` table holding `size` rows. Database files are filled once
+    per size and copied for the following benchmarks
+    """
+    if backend != 'sqlite':
+        return _fill(directory, size, backend or 'sqlite')
+    template = directory.parent / f"template-{size}"
+    if not template.exists():
+        template.mkdir()
+        _fill(template, size, backend).close()
+    posts = Posts('bench', directory, backend)
+    shutil.copyfile(Posts('bench', template, backend).path, posts.path)
+    posts.init()
+    return posts
+
+
+def _new_rows(count: int) -> List[Row]:
+    rows = list(post_rows(count, seed=SEED + 1))
+    for i, row in enumerate(rows):
+        row.post_id = f"new{i}"
+    return rows
+
+
+def _sample_ids(posts: Posts, count: int) -> List[str]:
+    rng = random.Random(SEED)
+    ids = list(posts.index)
+    return [rng.choice(ids) for _ in range(count)]
+
+
+@benchmark('model.save', BACKENDS)
+def save(directory: Path, size: int, backend: Optional[str]) -> Measurement:
+    posts = _posts(directory, size, backend)
+    rows = _new_rows(OPS)
+
+    def measure() -> int:
+        for row in rows:
+            posts.save(row)
+        for row in rows:
+            posts.delete(post_id=row.post_id)
+        return len(rows) * 2
+    return measure
+
+
+@benchmark('model.save_batched', BACKENDS)
+def save_batched(directory: Path, size: int, backend: Optional[str]) -> Measurement:
+    posts = _posts(directory, size, backend)
+    rows = _new_rows(OPS)
+
+    def measure() -> int:
+        with posts.unit_of_work():
+            for row in rows:
+                posts.save(row)
+        with posts.unit_of_work():
+            for row in rows:
+                posts.delete(post_id=row.post_id)
+        return len(rows) * 2
+    return measure
+
+
+@benchmark('model.edit', BACKENDS)
+def edit(directory: Path, size: int, backend: Optional[str]) -> Measurement:
+    posts = _posts(directory, size, backend)
+    rows = [posts.get(post_id=post_id) for post_id in _sample_ids(posts, OPS)]
+
+    def measure() -> int:
+        for row in rows:
+            row.reddit_edited += 1
+            posts.edit(row)
+        return len(rows)
+    return measure
+
+
+@benchmark('model.get', BACKENDS)
+def get(directory: Path, size: int, backend: Optional[str]) -> Measurement:
+    posts = _posts(directory, size, backend)
+    post_ids = _sample_ids(posts, OPS)
+
+    def measure() -> int:
+        for post_id in post_ids:
+            posts.get(post_id=post_id)
+        return len(post_ids)
+    return measure
+
+
+@benchmark('model.filter', BACKENDS)
+def filter_(directory: Path, size: int, backend: Optional[str]) -> Measurement:
+    posts = _posts(directory, size, backend)
+    usernames = [posts.index[post_id].username for post_id in _sample_ids(posts, OPS)]
+
+    def measure() -> int:
+        for username in usernames:
+            list(posts.filter(username=username))
+        return len(usernames)
+    return measure
+
+
+@benchmark('model.fetch_all', BACKENDS)
+def fetch_all(directory: Path, size: int, backend: Optional[str]) -> Measurement:
+    posts = _posts(directory, size, backend)
+
+    def measure() -> int:
+        # per row, the cost of a full scan
+        return sum(1 for _ in posts.fetch_all())
+    return measure
+
+
+def _json(cls: type, directory: Path, size: int) -> AutoSaveDict:
+    store = cls(directory / 'bench.json')
+    store.init()
+    with store.batch():
+        store.update(dict(json_pairs(size)))
+    return store  # type: ignore
+
+
+@benchmark('autosavedict.setitem')
+def asd_setitem(directory: Path, size: int, variant: Optional[str]) -> Measurement:
+    store = _json(AutoSaveDict, directory, size)
+
+    def measure() -> int:
+        for i in range(FILE_OPS):
+            store[f"new{i}"] = {'seen': True, 'edited': i}
+        return FILE_OPS
+    return measure
+
+
+@benchmark('autosavedict.batch')
+def asd_batch(directory: Path, size: int, variant: Optional[str]) -> Measurement:
+    store = _json(AutoSaveDict, directory, size)
+
+    def measure() -> int:
+        with store.batch():
+            for i in range(OPS):
+                store[f"new{i}"] = {'seen': True, 'edited': i}
+        return OPS
+    return measure
+
+
+@benchmark('journaldict.setitem')
+def journal_setitem(directory: Path, size: int, variant: Optional[str]) -> Setup:
+    store = _json(JournalDict, directory, size)
+    # measure appends only, not compaction
+    store.compact_every = 10**9  # type: ignore
+
+    def measure() -> int:
+        for i in range(OPS):
+            store[f"new{i}"] = {'seen': True, 'edited': i}
+        return OPS
+
+    def reset() -> None:
+        # every repeat starts from an empty journal
+        store.close()  # type: ignore
+        os.remove(store.journal_path)  # type: ignore
+    return measure, reset
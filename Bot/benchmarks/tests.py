@@ -0,0 +1,28 @@
+import unittest
+from typing import List
+from .runner import compare, run
+
+
+class TestRunner(unittest.TestCase):
+    def test_run(self) -> None:
+        lines: List[str] = []
+        results = run([10], 'journaldict', repeat=2, report=lines.append)
+        self.assertEqual(list(results['results']), ['journaldict.setitem/10'])
+        result = results['results']['journaldict.setitem/10']
+        self.assertEqual(result['repeat'], 2)
+        self.assertGreater(result['per_op_us'], 0)
+        self.assertEqual(len(lines), 1)
+        self.assertIn('sqlite', results['meta'])
+
+    def test_run_sqlite(self) -> None:
+        results = run([10], 'model.get[sqlite]', repeat=1, report=lambda line: None)
+        self.assertEqual(list(results['results']), ['model.get[sqlite]/10'])
+
+    def test_compare(self) -> None:
+        baseline = {'results': {'a/1': {'per_op_us': 10.0}, 'b/1': {'per_op_us': 10.0}}}
+        results = {'results': {
+            'a/1': {'per_op_us': 12.0},
+            'b/1': {'per_op_us': 14.0},
+            'c/1': {'per_op_us': 99.0},
+        }}
+        self.assertEqual(compare(results, baseline, threshold=0.25), [('b/1', 1.4)])
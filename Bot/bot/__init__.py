@@ -1 +1,3 @@
 from .post import *  # noqa
+from .authors import *  # noqa
+from .checkpoint import *  # noqa
@@ -0,0 +1,148 @@
+import time
+from enum import Enum
+from collections import OrderedDict
+from typing import (
+    Iterable,
+    Optional,
+    Callable,
+    Tuple,
+    List,
+    Dict,
+    Any,
+)
+
+
+__all__ = (
+    'AuthorStatus',
+    'AuthorCache',
+)
+
+
+class AuthorStatus(Enum):
+    ACTIVE = 'active'
+    SUSPENDED = 'suspended'
+    DELETED = 'deleted'
+
+
+class AuthorCache:
+    """A bounded, least recently used cache of account states by username.
+    Entries expire `ttl` seconds after they were stored. Usernames are
+    resolved through their account fullname (`t2_...`), which has to be
+    learnt first with `remember()`, in batches of `BATCH_SIZE` per request
+    """
+    BATCH_SIZE = 100
+    ENDPOINT = 'api/user_data_by_account_ids'
+
+    def __init__(self, ttl: float = 3600, max_size: int = 10_000,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        self.ttl = ttl
+        self.max_size = max_size
+        self._clock = clock
+        self._entries: OrderedDict[str, Tuple[AuthorStatus, float]] = OrderedDict()
+        self._fullnames: OrderedDict[str, str] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, username: Any) -> bool:
+        return self.get(username) is not None
+
+    def _trim(self, entries: OrderedDict) -> None:  # type: ignore
+        while len(entries) > self.max_size:
+            entries.popitem(last=False)
+
+    def get(self, username: str) -> Optional[AuthorStatus]:
+        """The cached status, or `None` if it is unknown or expired"""
+        entry = self._entries.get(username)
+        if entry is None:
+            return None
+        status, expires = entry
+        if expires <= self._clock():
+            del self._entries[username]
+            return None
+        self._entries.move_to_end(username)
+        return status
+
+    def set(self, username: str, status: AuthorStatus) -> None:
+        self._entries[username] = (status, self._clock() + self.ttl)
+        self._entries.move_to_end(username)
+        self._trim(self._entries)
+
+    def remember(self, username: str, fullname: Optional[str]) -> None:
+        """Learn the account fullname of `username` so `resolve()` can look
+        it up. Calls without a fullname are ignored
+        """
+        if fullname:
+            self._fullnames[username] = fullname
+            self._fullnames.move_to_end(username)
+            self._trim(self._fullnames)
+
+    def resolve(self, reddit: Any, usernames: Iterable[str]) -> List[str]:
+        """Refresh the expired or unknown usernames with a fullname on record,
+        in as few requests as possible. The endpoint leaves out deleted
+        accounts, but also shadowbanned ones and whatever it failed to look
+        up, so an account missing from the response is confirmed with a
+        lookup of its profile. Accounts that could not be confirmed, and
+        every account of a batch that fails, are left unresolved
+
+        :param reddit: A `praw.Reddit` instance
+        :type reddit: Any
+        :param usernames: The usernames to make sure are cached
+        :type usernames: Iterable[str]
+        :return: The usernames that could not be resolved
+        :rtype: List[str]
+        """
+        wanted: Dict[str, str] = {}
+        unresolved = []
+        for username in dict.fromkeys(usernames):
+            if self.get(username) is not None:
+                continue
+            fullname = self._fullnames.get(username)
+            if fullname is None:
+                unresolved.append(username)
+            else:
+                wanted[fullname] = username
+
+        fullnames = list(wanted)
+        for i in range(0, len(fullnames), self.BATCH_SIZE):
+            batch = fullnames[i:i + self.BATCH_SIZE]
+            try:
+                data = reddit.request(method='GET', path=self.ENDPOINT, params={'ids': ','.join(batch)})
+            except Exception:
+                unresolved.extend(wanted[fullname] for fullname in batch)
+                continue
+            for fullname in batch:
+                account = data.get(fullname)
+                if account is None:
+                    found = self.lookup(reddit, wanted[fullname])
+                    if found is None:
+                        unresolved.append(wanted[fullname])
+                        continue
+                    status = found
+                elif account.get('is_suspended'):
+                    status = AuthorStatus.SUSPENDED
+                else:
+                    status = AuthorStatus.ACTIVE
+                self.set(wanted[fullname], status)
+        return unresolved
+
+    def lookup(self, reddit: Any, username: str) -> Optional[AuthorStatus]:
+        """The state of one account according to its profile, `None` if the
+        lookup failed. A profile that is not found (HTTP 404) is a deleted
+        account
+
+        :param reddit: A `praw.Reddit` instance
+        :type reddit: Any
+        :param username: The account to look up
+        :type username: str
+        :return: The state of the account, not cached
+        :rtype: Optional[AuthorStatus]
+        """
+        try:
+            # reading a missing attribute fetches the profile
+            suspended = getattr(reddit.redditor(username), 'is_suspended', False)
+        except Exception as e:
+            if getattr(getattr(e, 'response', None), 'status_code', None) == 404:
+                return AuthorStatus.DELETED
+            return None
+        return AuthorStatus.SUSPENDED if suspended else AuthorStatus.ACTIVE
@@ -0,0 +1,81 @@
+import os
+from jsonwrapper import JournalDict
+from typing import (
+    Optional,
+    Set,
+    Any,
+)
+
+
+__all__ = (
+    'CycleCheckpoint',
+)
+
+
+_PENDING = 'pending:'
+
+
+class CycleCheckpoint:
+    """The progress of the cycle being run, journaled to `path` so that a
+    bot stopped in the middle of a cycle (a crash, a container restart)
+    finishes that cycle where it left off instead of starting over.
+
+    It records the post the revalidation order starts from, the next post
+    to revalidate, written every `every` posts, and the posts found deleted
+    whose deletion is not flushed to the database yet, so that no modmail
+    is sent twice for them
+    """
+    def __init__(self, path: os.PathLike[Any], every: int = 50) -> None:
+        self.path = path
+        self.every = every
+        self._data = JournalDict(path)
+        self._unsaved = 0
+
+    def __str__(self) -> str:
+        return f"<{self.__class__.__name__}({str(self.path)!r}, next={self.next!r})>"
+
+    def __repr__(self) -> str:
+        return str(self)
+
+    @property
+    def start(self) -> Optional[str]:
+        """The post the revalidation order starts from"""
+        return self._data.get('start')
+
+    @property
+    def next(self) -> Optional[str]:
+        """The post an unfinished cycle stopped at, `None` between cycles"""
+        return self._data.get('next')
+
+    @property
+    def pending(self) -> Set[str]:
+        return {key[len(_PENDING):] for key in self._data if key.startswith(_PENDING)}
+
+    def at(self, post_id: str, force: bool = False) -> None:
+        """`post_id` is about to be revalidated. Only every `every`th call is
+        written, unless `force`d
+        """
+        self._unsaved += 1
+        if force or self._unsaved >= self.every:
+            self._data['next'] = post_id
+            self._unsaved = 0
+
+    def delete(self, post_id: str) -> None:
+        self._data[f"{_PENDING}{post_id}"] = True
+
+    def flushed(self, start: Optional[str], finished: bool) -> None:
+        """The cycle's writes reached the database. `start` is where the next
+        cycle's order starts, and the position is kept if it was not
+        `finished`
+        """
+        with self._data.batch():
+            for key in [key for key in self._data if key.startswith(_PENDING)]:
+                del self._data[key]
+            self._data['start'] = start
+            if finished and 'next' in self._data:
+                del self._data['next']
+        self._unsaved = 0
+        self._data.compact()
+
+    def close(self) -> None:
+        self._data.close()
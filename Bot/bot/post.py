@@ -1,16 +1,38 @@
+# mypy: disable-error-code=attr-defined
+import datetime as dt
 from pathlib import Path
 from sqlitewrapper import Model, Datatype, Row
+from typing import (
+    NamedTuple,
+    Optional,
+    Dict,
+    Any,
+)
 
 
 __all__ = (
     'Datatype',
     'Posts',
     'Row',
+    'TrackedPost',
 )
 
 
+class TrackedPost(NamedTuple):
+    """What `Posts.index` keeps in memory for every tracked post"""
+    post_id: str
+    username: str
+    record_created: str
+    deletion_method: Optional[str]
+    reddit_edited: Optional[float]
+
+
 class Posts(Model):
-    def __init__(self, db_name: str, save_path: Path) -> None:
+    fts_columns = ('username', 'title', 'text')
+    fts_stored = ('post_id', 'deletion_method', 'record_created')
+    indexes = ('post_id',)
+
+    def __init__(self, db_name: str, save_path: Path, backend: str = 'sqlite') -> None:
         self.__table = {
             'username': Datatype.STR,
             'title': Datatype.STR,
@@ -20,5 +42,57 @@ class Posts(Model):
             'post_last_edit': Datatype.STR,
             'record_created': Datatype.STR,
             'record_edited': Datatype.STR,
+            # `submission.edited` when last checked, 0 if it was never edited
+            'reddit_edited': Datatype.REAL,
+            # `utils.fingerprint()` of the latest known text
+            'text_hash': Datatype.STR,
         }
-        super().__init__(db_name, save_path, **self.__table)
+        super().__init__(db_name, save_path, backend, **self.__table)
+        self._index: Optional[Dict[str, TrackedPost]] = None
+
+    @property
+    def index(self) -> Dict[str, TrackedPost]:
+        """The tracked posts by `post_id`, in the order they were saved.
+        It is read from the database once and then kept up to date by
+        `save`, `edit` and `delete`, including the writes still buffered
+        in a unit of work
+        """
+        if self._index is None:
+            self._index = {
+                row.post_id: self._tracked(row) for row in self.fetch_all()
+            }
+        return self._index
+
+    def _tracked(self, row: Row) -> TrackedPost:
+        return TrackedPost(row.post_id, row.username, row.record_created, row.deletion_method, row.reddit_edited)
+
+    def _discarded(self) -> None:
+        self._index = None
+
+    def save(self, row: Row) -> None:
+        super().save(row)
+        self.index[row.post_id] = self._tracked(row)
+
+    def edit(self, row: Row) -> None:
+        super().edit(row)
+        self.index[row.post_id] = self._tracked(row)
+
+    def delete(self, **where: Any) -> None:
+        super().delete(**where)
+        if tuple(where) == ('post_id',):
+            self.index.pop(where['post_id'], None)
+        else:
+            # Let the next access reload it from the database
+            self._index = None
+
+    def prune_archive(self, max_days: int) -> int:
+        """Drop deleted posts older than `max_days` from the full-text archive.
+        Posts that are still tracked are kept regardless of their age
+
+        :param max_days: How many days deleted posts stay searchable
+        :type max_days: int
+        :return: The number of archived posts removed
+        :rtype: int
+        """
+        cutoff = str(dt.datetime.now() - dt.timedelta(days=max_days))
+        return self.prune_search('record_created', cutoff)
@@ -0,0 +1,218 @@
+# mypy: disable-error-code=attr-defined
+import os
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Optional, List
+from .post import (
+    TrackedPost,
+    Posts,
+    Row,
+)
+from .authors import (
+    AuthorStatus,
+    AuthorCache,
+)
+from .checkpoint import CycleCheckpoint
+
+
+def make_row(post_id: str, **fields: str) -> Row:
+    values = {
+        'username': 'John',
+        'title': 'Title',
+        'text': 'Text',
+        'post_id': post_id,
+        'deletion_method': None,
+        'post_last_edit': None,
+        'record_created': '2023-01-01 00:00:00.000000',
+        'record_edited': '2023-01-01 00:00:00.000000',
+        'reddit_edited': 0.0,
+        'text_hash': None,
+    }
+    values.update(fields)
+    return Row(**values)
+
+
+class TestPosts(unittest.TestCase):
+    def setUp(self) -> None:
+        self.posts = Posts('testposts', Path(__file__).parent)
+        self.posts.init()
+        return super().setUp()
+
+    def tearDown(self) -> None:
+        self.posts.close()
+        os.remove(self.posts.path)
+        return super().tearDown()
+
+    def test_index_loads_once(self) -> None:
+        self.posts.save(make_row('a'))
+        other = Posts('testposts', Path(__file__).parent)
+        self.assertEqual(
+            other.index,
+            {'a': TrackedPost('a', 'John', '2023-01-01 00:00:00.000000', None, 0.0)}
+        )
+
+    def test_index_follows_writes(self) -> None:
+        self.posts.save(make_row('a'))
+        self.posts.save(make_row('b'))
+        row = self.posts.get(post_id='a')
+        row.deletion_method = 'Deleted by OP'
+        self.posts.edit(row)
+        self.posts.delete(post_id='b')
+
+        self.assertEqual(list(self.posts.index), ['a'])
+        self.assertEqual(self.posts.index['a'].deletion_method, 'Deleted by OP')
+
+    def test_index_follows_unit_of_work(self) -> None:
+        with self.posts.unit_of_work():
+            self.posts.save(make_row('a'))
+            self.assertIn('a', self.posts.index)
+
+        with self.assertRaises(RuntimeError):
+            with self.posts.unit_of_work():
+                self.posts.save(make_row('b'))
+                self.assertIn('b', self.posts.index)
+                raise RuntimeError
+        self.assertEqual(list(self.posts.index), ['a'])
+
+    def test_prune_archive(self) -> None:
+        self.posts.save(make_row('a', title='Creeper'))
+        self.posts.save(make_row('b', title='Creeper', record_created='2999-01-01 00:00:00.000000'))
+        self.posts.delete(post_id='a')
+        self.posts.delete(post_id='b')
+        self.assertEqual(self.posts.prune_archive(30), 1)
+        self.assertEqual([r.post_id for r in self.posts.search('creeper')], ['b'])
+
+
+class HTTPError(Exception):
+    def __init__(self, status_code: int) -> None:
+        super().__init__(status_code)
+        self.response = SimpleNamespace(status_code=status_code)
+
+
+class FakeProfile:
+    def __init__(self, reddit: 'FakeReddit', name: str) -> None:
+        self.reddit = reddit
+        self.name = name
+
+    @property
+    def is_suspended(self) -> bool:
+        self.reddit.lookups.append(self.name)
+        status = self.reddit.profiles.get(self.name, 200)
+        if status != 200:
+            raise HTTPError(status)
+        return False
+
+
+class FakeReddit:
+    def __init__(self, accounts: dict, fail: bool = False, profiles: Optional[dict] = None) -> None:
+        self.accounts = accounts
+        self.fail = fail
+        # username -> status of its profile lookup, 200 when missing
+        self.profiles = profiles or {}
+        self.requests: List[List[str]] = []
+        self.lookups: List[str] = []
+
+    def redditor(self, name: str) -> FakeProfile:
+        return FakeProfile(self, name)
+
+    def request(self, method: str, path: str, params: dict) -> dict:
+        ids = params['ids'].split(',')
+        self.requests.append(ids)
+        if self.fail:
+            raise RuntimeError
+        return {i: self.accounts[i] for i in ids if i in self.accounts}
+
+
+class TestAuthorCache(unittest.TestCase):
+    def setUp(self) -> None:
+        self.now = 0.0
+        self.cache = AuthorCache(ttl=60, max_size=3, clock=lambda: self.now)
+        return super().setUp()
+
+    def test_ttl(self) -> None:
+        self.cache.set('john', AuthorStatus.ACTIVE)
+        self.assertEqual(self.cache.get('john'), AuthorStatus.ACTIVE)
+        self.now = 60
+        self.assertIsNone(self.cache.get('john'))
+        self.assertEqual(len(self.cache), 0)
+
+    def test_lru(self) -> None:
+        for name in ('a', 'b', 'c'):
+            self.cache.set(name, AuthorStatus.ACTIVE)
+        self.cache.get('a')
+        self.cache.set('d', AuthorStatus.ACTIVE)
+        self.assertIn('a', self.cache)
+        self.assertNotIn('b', self.cache)
+
+    def test_resolve(self) -> None:
+        reddit = FakeReddit({
+            't2_a': {'name': 'a'},
+            't2_b': {'name': 'b', 'is_suspended': True},
+        }, profiles={'c': 404, 'e': 500})
+        cache = AuthorCache(ttl=60, clock=lambda: self.now)
+        for name in ('a', 'b', 'c', 'e', 'f'):
+            cache.remember(name, f't2_{name}')
+        cache.remember('d', None)
+        unresolved = cache.resolve(reddit, ['a', 'b', 'a', 'c', 'd', 'e', 'f'])
+        self.assertEqual(unresolved, ['d', 'e'])
+        self.assertEqual(reddit.requests, [['t2_a', 't2_b', 't2_c', 't2_e', 't2_f']])
+        # only the accounts missing from the response are looked up one by one
+        self.assertEqual(reddit.lookups, ['c', 'e', 'f'])
+        self.assertEqual(cache.get('a'), AuthorStatus.ACTIVE)
+        self.assertEqual(cache.get('b'), AuthorStatus.SUSPENDED)
+        # deleted only once its profile is gone, not for missing from the batch
+        self.assertEqual(cache.get('c'), AuthorStatus.DELETED)
+        self.assertIsNone(cache.get('e'))
+        self.assertEqual(cache.get('f'), AuthorStatus.ACTIVE)
+
+        cache.resolve(reddit, ['a', 'b', 'c', 'f'])
+        self.assertEqual(len(reddit.requests), 1, msg="Cached usernames were requested again")
+
+    def test_resolve_batches_and_failures(self) -> None:
+        cache = AuthorCache(max_size=500)
+        names = [str(i) for i in range(250)]
+        for name in names:
+            cache.remember(name, f't2_{name}')
+        reddit = FakeReddit({}, fail=True)
+        self.assertEqual(cache.resolve(reddit, names), names)
+        self.assertEqual([len(r) for r in reddit.requests], [100, 100, 50])
+        self.assertEqual(len(cache), 0)
+
+
+class TestCycleCheckpoint(unittest.TestCase):
+    def setUp(self) -> None:
+        self.path = Path(__file__).parent / 'test.checkpoint'
+        return super().setUp()
+
+    def tearDown(self) -> None:
+        for suffix in ('', '.journal', '.lock', '.tmp'):
+            if os.path.exists(f"{self.path}{suffix}"):
+                os.remove(f"{self.path}{suffix}")
+        return super().tearDown()
+
+    def test_resume_after_crash(self) -> None:
+        checkpoint = CycleCheckpoint(self.path, every=2)
+        for post_id in ('a', 'b', 'c'):
+            checkpoint.at(post_id)
+        checkpoint.delete('b')
+        checkpoint.close()
+
+        # only every second post is written
+        restarted = CycleCheckpoint(self.path)
+        self.assertEqual(restarted.next, 'b')
+        self.assertEqual(restarted.pending, {'b'})
+        self.assertIsNone(restarted.start)
+
+    def test_flushed(self) -> None:
+        checkpoint = CycleCheckpoint(self.path)
+        checkpoint.at('c', force=True)
+        checkpoint.delete('a')
+        checkpoint.flushed('a', finished=False)
+        self.assertEqual(CycleCheckpoint(self.path).next, 'c')
+        self.assertEqual(CycleCheckpoint(self.path).pending, set())
+
+        checkpoint.flushed('b', finished=True)
+        restarted = CycleCheckpoint(self.path)
+        self.assertIsNone(restarted.next)
+        self.assertEqual(restarted.start, 'b')
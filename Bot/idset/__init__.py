@@ -0,0 +1 @@
+from .idset import *  # noqa
@@ -0,0 +1,161 @@
+from __future__ import annotations
+import os
+import sys
+from array import array
+from bisect import bisect_left
+from typing import (
+    Iterable,
+    Iterator,
+    Optional,
+    Any,
+)
+
+
+__all__ = (
+    'BloomFilter',
+    'SeenIds',
+    'decode_id',
+    'encode_id',
+)
+
+
+_DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+_MASK = (1 << 64) - 1
+_MAGIC = b'SEENIDS1'
+
+
+def decode_id(post_id: str) -> int:
+    """Reddit ids are base36 integers: `'1a2b3c'` -> `78429756`"""
+    return int(post_id, 36)
+
+
+def encode_id(number: int) -> str:
+    """The inverse of `decode_id`"""
+    if number == 0:
+        return '0'
+    digits = []
+    while number:
+        number, rem = divmod(number, 36)
+        digits.append(_DIGITS[rem])
+    return ''.join(reversed(digits))
+
+
+class BloomFilter:
+    """A fixed size Bloom filter over 64 bit integers. `might_contain` never
+    returns a false negative; with the defaults the false positive rate stays
+    around 1% up to 100k members
+    """
+    def __init__(self, bits: int = 1 << 20, hashes: int = 4) -> None:
+        if bits <= 0 or hashes <= 0:
+            raise ValueError(f"bits and hashes must be positive, not {bits} and {hashes}")
+        self.bits = bits
+        self.hashes = hashes
+        self._array = bytearray((bits + 7) // 8)
+
+    def _positions(self, number: int) -> Iterator[int]:
+        # Double hashing over two cheap 64 bit mixes of the number
+        h1 = (number * 0x9E3779B97F4A7C15) & _MASK
+        h2 = ((number ^ (number >> 31)) * 0xBF58476D1CE4E5B9 & _MASK) | 1
+        for i in range(self.hashes):
+            yield ((h1 + i * h2) & _MASK) % self.bits
+
+    def add(self, number: int) -> None:
+        for pos in self._positions(number):
+            self._array[pos >> 3] |= 1 << (pos & 7)
+
+    def might_contain(self, number: int) -> bool:
+        return all(self._array[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(number))
+
+
+class SeenIds:
+    """A set of Reddit ids stored as a sorted `array('Q')` of their decoded
+    integers, 8 bytes per id instead of a `str` inside a `set`. Membership
+    tests are a binary search, fronted by an optional `BloomFilter` that
+    answers most misses without touching the array. Ids cannot be removed.
+
+    If `file_path` is given, `load()` and `save()` persist the ids there
+    """
+    def __init__(self, file_path: Optional[os.PathLike[Any]] = None,
+                 bloom_bits: int = 1 << 20, bloom_hashes: int = 4) -> None:
+        self.file_path = file_path
+        self._ids = array('Q')
+        self._bloom = BloomFilter(bloom_bits, bloom_hashes) if bloom_bits else None
+        self.dirty = False
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __iter__(self) -> Iterator[str]:
+        return (encode_id(number) for number in self._ids)
+
+    def __contains__(self, post_id: Any) -> bool:
+        number = decode_id(post_id)
+        if self._bloom is not None and not self._bloom.might_contain(number):
+            return False
+        index = bisect_left(self._ids, number)
+        return index < len(self._ids) and self._ids[index] == number
+
+    def __str__(self) -> str:
+        return f"<{self.__class__.__name__}({len(self)} ids)>"
+
+    def __repr__(self) -> str:
+        return str(self)
+
+    def add(self, post_id: str) -> None:
+        number = decode_id(post_id)
+        ids = self._ids
+        # New posts have the highest ids, so this is almost always an append
+        if not ids or number > ids[-1]:
+            ids.append(number)
+        else:
+            index = bisect_left(ids, number)
+            if index < len(ids) and ids[index] == number:
+                return
+            ids.insert(index, number)
+        if self._bloom is not None:
+            self._bloom.add(number)
+        self.dirty = True
+
+    def update(self, post_ids: Iterable[str]) -> None:
+        for post_id in post_ids:
+            self.add(post_id)
+
+    def nbytes(self) -> int:
+        """Memory used by the ids and the Bloom filter, in bytes"""
+        bloom = len(self._bloom._array) if self._bloom is not None else 0
+        return self._ids.itemsize * len(self._ids) + bloom
+
+    def load(self) -> None:
+        """Replace the ids with the ones saved in `file_path`, if it exists"""
+        if self.file_path is None or not os.path.exists(self.file_path):
+            return
+        with open(self.file_path, mode='rb') as f:
+            if f.read(len(_MAGIC)) != _MAGIC:
+                raise ValueError(f"{self.file_path} is not a seen ids file")
+            ids = array('Q')
+            ids.frombytes(f.read())
+        if sys.byteorder != 'little':
+            ids.byteswap()
+
+        self._ids = ids
+        if self._bloom is not None:
+            self._bloom = BloomFilter(self._bloom.bits, self._bloom.hashes)
+            for number in ids:
+                self._bloom.add(number)
+        self.dirty = False
+
+    def save(self) -> None:
+        """Write the ids to `file_path` if they changed since the last
+        `load()`/`save()`. The file is replaced atomically
+        """
+        if self.file_path is None or not self.dirty:
+            return
+        ids = array('Q', self._ids)
+        if sys.byteorder != 'little':
+            ids.byteswap()
+        tmp_path = f"{self.file_path}.tmp"
+        with open(tmp_path, mode='wb') as f:
+            f.write(_MAGIC)
+            ids.tofile(f)
+        os.replace(tmp_path, self.file_path)
+        self.dirty = False
@@ -0,0 +1,71 @@
+import os
+import unittest
+from pathlib import Path
+from .idset import (
+    BloomFilter,
+    SeenIds,
+    decode_id,
+    encode_id,
+)
+
+
+BASE_DIR = Path(__file__).parent
+
+
+class TestIds(unittest.TestCase):
+    def test_decode_encode(self) -> None:
+        for post_id in ('0', 'z', '10', '18xk2ab'):
+            self.assertEqual(encode_id(decode_id(post_id)), post_id)
+        self.assertEqual(decode_id('10'), 36)
+
+
+class TestBloomFilter(unittest.TestCase):
+    def test_no_false_negatives(self) -> None:
+        bloom = BloomFilter(1 << 12, 3)
+        for number in range(0, 3000, 7):
+            bloom.add(number)
+        self.assertTrue(all(bloom.might_contain(n) for n in range(0, 3000, 7)))
+        misses = sum(bloom.might_contain(n) for n in range(10_000, 11_000))
+        self.assertLess(misses, 200)
+
+    def test_invalid_size(self) -> None:
+        with self.assertRaises(ValueError):
+            BloomFilter(0)
+
+
+class TestSeenIds(unittest.TestCase):
+    def setUp(self) -> None:
+        self.path = BASE_DIR / 'test.seen'
+        return super().setUp()
+
+    def tearDown(self) -> None:
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        return super().tearDown()
+
+    def test_add_and_contains(self) -> None:
+        for bloom_bits in (0, 1 << 10):
+            seen = SeenIds(bloom_bits=bloom_bits)
+            seen.update(['abc', '1zz', 'abd', 'abc', '0'])
+            self.assertEqual(len(seen), 4)
+            self.assertEqual(list(seen), ['0', '1zz', 'abc', 'abd'])
+            self.assertIn('abd', seen)
+            self.assertNotIn('abe', seen)
+
+    def test_save_and_load(self) -> None:
+        seen = SeenIds(self.path)
+        seen.update(['18xk2ab', '18xk2ac', '9'])
+        self.assertTrue(seen.dirty)
+        seen.save()
+        self.assertFalse(seen.dirty)
+
+        loaded = SeenIds(self.path)
+        loaded.load()
+        self.assertEqual(list(loaded), list(seen))
+        self.assertIn('18xk2ac', loaded)
+        self.assertNotIn('18xk2ad', loaded)
+
+    def test_load_rejects_other_files(self) -> None:
+        self.path.write_bytes(b'{"json": true}')
+        with self.assertRaises(ValueError):
+            SeenIds(self.path).load()
@@ -1 +1,2 @@
 from .autosavedict import *  # noqa
+from .journaldict import *  # noqa
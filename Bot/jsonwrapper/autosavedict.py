@@ -1,14 +1,21 @@
 from __future__ import annotations
 import os
 import json
+from contextlib import contextmanager
+try:
+    import fcntl
+except ImportError:  # Windows, where locking is skipped
+    fcntl = None  # type: ignore
 from typing import (
     Any,
     Dict,
+    List,
     Tuple,
     Mapping,
     Optional,
     Iterable,
-    MutableMapping,
+    Generator,
+    IO,
 )
 
 
@@ -17,46 +24,142 @@ __all__ = (
 )
 
 
+# ('set', key, value), ('del', key) or ('clear',)
+Operation = Tuple[Any, ...]
+# (st_ino, st_mtime_ns, st_size) of the file a cached content was read from
+FileKey = Tuple[int, int, int]
+
+
 class AutoSaveDict(dict[Any, Any]):
     def __init__(self,
                  file_path: Optional[os.PathLike[Any]] = None,
                  **pairs: Any):
         self.file_path = file_path
         self.__default = pairs
+        self._batch: Optional[List[Operation]] = None
+        self._cache: Optional[Tuple[FileKey, Dict[Any, Any]]] = None
+        self._lock_file: Optional[IO[Any]] = None
+        self._lock_depth = 0
 
         if self.file_path is None:
             self._pairs = pairs
-        elif not os.path.exists(self.file_path):
+        elif not self._exists():
             self._pairs = pairs
         else:
             self._pairs = self._read()
         super(AutoSaveDict, self).__init__(**self._pairs)
 
     def __setitem__(self, __key: Any, __value: Any) -> None:
-        data = self._read()
-        data[__key] = __value
-        self._write(data)
+        self._commit(('set', __key, __value))
         super().__setitem__(__key, __value)
 
     def __delitem__(self, __key: Any) -> None:
-        data = self._read()
-        del data[__key]
-        self._write(data)
-        return super().__delitem__(__key)
+        super().__delitem__(__key)
+        self._commit(('del', __key))
 
     def __or__(self, __value: Mapping[Any, Any]) -> AutoSaveDict:
         data = self._pairs | __value
         return AutoSaveDict(None, **data)
 
+    def _exists(self) -> bool:
+        return os.path.exists(self.file_path)  # type: ignore
+
+    @staticmethod
+    def _apply(data: Dict[Any, Any], ops: Iterable[Operation]) -> None:
+        for op in ops:
+            if op[0] == 'set':
+                data[op[1]] = op[2]
+            elif op[0] == 'del':
+                data.pop(op[1], None)
+            else:
+                data.clear()
+
+    def _commit(self, *ops: Operation) -> None:
+        """Apply `ops` to the file, or queue them while in `batch()`"""
+        if self._batch is not None:
+            self._batch.extend(ops)
+            return
+        with self._locked():
+            data = self._read()
+            self._apply(data, ops)
+            self._write(data)
+
+    @contextmanager
+    def _locked(self) -> Generator[None, None, None]:
+        """Hold an exclusive advisory lock on `{file_path}.lock`, so that
+        read-modify-write cycles of several processes do not interleave.
+        The data file itself cannot be locked since writes replace it
+        """
+        if fcntl is None or self.file_path is None:
+            yield
+            return
+        if self._lock_depth == 0:
+            self._lock_file = open(f"{self.file_path}.lock", mode='a')
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+        self._lock_depth += 1
+        try:
+            yield
+        finally:
+            self._lock_depth -= 1
+            if self._lock_depth == 0:
+                fcntl.flock(self._lock_file, fcntl.LOCK_UN)  # type: ignore
+                self._lock_file.close()  # type: ignore
+                self._lock_file = None
+
+    def _file_key(self) -> FileKey:
+        stat = os.stat(self.file_path)  # type: ignore
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    @contextmanager
+    def batch(self) -> Generator[AutoSaveDict, None, None]:
+        """Group mutations into a single read and write of the file,
+        done when the block exits. If the block raises, nothing is written
+        and the dict goes back to its content from before the block.
+        Nested batches join the outermost one. Example:
+        ```
+            >>> with asd.batch():
+            ...     asd['a'] = 1
+            ...     del asd['b']
+        ```
+        """
+        if self._batch is not None:
+            yield self
+            return
+        snapshot = dict(self)
+        self._batch = []
+        try:
+            yield self
+        except BaseException:
+            self._batch = None
+            super().clear()
+            super().update(snapshot)
+            raise
+        ops, self._batch = self._batch, None
+        if ops:
+            self._commit(*ops)
+
     def _write(self, content: Dict[Any, Any]) -> None:
-        with open(self.file_path, mode='w') as f:  # type: ignore
+        # Written next to the file and swapped in, so that a crash
+        # leaves either the old or the new content and never a mix
+        tmp_path = f"{self.file_path}.tmp"
+        with open(tmp_path, mode='w') as f:
             json.dump(content, f, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.file_path)  # type: ignore
         self._pairs = content
+        self._cache = (self._file_key(), dict(content))
 
     def _read(self) -> Dict[Any, Any]:
-        with open(self.file_path, mode='r') as f:  # type: ignore
-            data: Dict[Any, Any] = json.load(f)
-            return data
+        """The content of the file, parsed again only if it changed since
+        the last read or write. Every write replaces the file, so its inode
+        tells apart changes that keep the same mtime and size
+        """
+        key = self._file_key()
+        if self._cache is None or self._cache[0] != key:
+            with open(self.file_path, mode='r') as f:  # type: ignore
+                self._cache = (key, json.load(f))
+        return dict(self._cache[1])
 
     @classmethod
     def fromkeys(cls, __iterable: Iterable[Any], __value: Any = None,
@@ -87,8 +190,9 @@ class AutoSaveDict(dict[Any, Any]):
             self._pairs = self._read()
 
     def restore(self) -> None:
-        self.clear()
-        self.update(self.__default)
+        with self.batch():
+            self.clear()
+            self.update(self.__default)
         self.init()
 
     def copy(self,
@@ -99,22 +203,20 @@ class AutoSaveDict(dict[Any, Any]):
         return AutoSaveDict(file_path, **data)
 
     def pop(self, __key: Any) -> Any:  # type: ignore
-        data = self._read()
-        data.pop(__key)
-        self._write(data)
-        return super().pop(__key)
+        value = super().pop(__key)
+        self._commit(('del', __key))
+        return value
 
     def popitem(self) -> Tuple[Any, Any]:
-        key = tuple(self._read().keys())[-1]
-        value = self.pop(key)
-        super().popitem()
+        key, value = super().popitem()
+        self._commit(('del', key))
         return (key, value)
 
     def clear(self) -> None:
-        self._write({})
+        self._commit(('clear',))
         super().clear()
 
-    def update(self, __m: Mapping[Any, Any]) -> MutableMapping:  # type: ignore
-        for k, v in __m.items():
-            self[k] = v
-        super().update(__m)
+    def update(self, __m: Mapping[Any, Any] = {}, **kwargs: Any) -> None:  # type: ignore
+        with self.batch():
+            for k, v in dict(__m, **kwargs).items():
+                self[k] = v
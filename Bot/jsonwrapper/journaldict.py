@@ -0,0 +1,113 @@
+from __future__ import annotations
+import os
+import json
+from .autosavedict import AutoSaveDict, Operation
+from typing import (
+    Any,
+    Dict,
+    TextIO,
+    Optional,
+)
+
+
+__all__ = (
+    'JournalDict',
+)
+
+
+class JournalDict(AutoSaveDict):
+    """An `AutoSaveDict` that appends every change to a journal of JSON lines
+    (`{file_path}.journal`) instead of rewriting the whole file, so that a
+    change costs the same no matter how big the dict is. The journal is
+    replayed on top of the snapshot in `file_path` when reading, and folded
+    into it by `compact()` every `compact_every` operations.
+
+    Unlike `AutoSaveDict`, the file is not re-read before each change: a
+    journal has a single writer
+    """
+    def __init__(self,
+                 file_path: Optional[os.PathLike[Any]] = None,
+                 compact_every: int = 1000,
+                 sync: bool = False,
+                 **pairs: Any):
+        """Initializer of JournalDict object
+
+        :param file_path: The snapshot file, defaults to None
+        :type file_path: Optional[os.PathLike[Any]], optional
+        :param compact_every: Operations appended before the journal is\
+            folded into the snapshot, defaults to 1000
+        :type compact_every: int, optional
+        :param sync: fsync the journal after every change, defaults to False
+        :type sync: bool, optional
+        """
+        self.compact_every = compact_every
+        self.sync = sync
+        self._journal: Optional[TextIO] = None
+        self._journal_ops = 0
+        super().__init__(file_path, **pairs)
+        # Changes are applied to it in place, keep the defaults apart
+        self._pairs = dict(self._pairs)
+
+    @property
+    def journal_path(self) -> str:
+        return f"{self.file_path}.journal"
+
+    def _exists(self) -> bool:
+        # Until the first compaction there is only a journal
+        return super()._exists() or os.path.exists(self.journal_path)
+
+    def _read(self) -> Dict[Any, Any]:
+        data = super()._read() if os.path.exists(self.file_path) else {}  # type: ignore
+        if not os.path.exists(self.journal_path):
+            return data
+        with open(self.journal_path, mode='r') as f:
+            for line in f:
+                try:
+                    op = tuple(json.loads(line))
+                except ValueError:
+                    # The tail of an append cut short by a crash
+                    break
+                self._apply(data, (op,))
+        return data
+
+    def _commit(self, *ops: Operation) -> None:
+        if self._batch is not None:
+            self._batch.extend(ops)
+            return
+        with self._locked():
+            if self._journal is None:
+                # Start from a clean journal, dropping anything left torn
+                if os.path.exists(self.journal_path):
+                    self.compact()
+                elif not self._exists():
+                    # Nothing on disk yet, the defaults go in first
+                    ops = (*(('set', key, value) for key, value in self._pairs.items()), *ops)
+                self._journal = open(self.journal_path, mode='a')
+
+            self._journal.write(''.join(f"{json.dumps(op)}\n" for op in ops))
+            self._journal.flush()
+            if self.sync:
+                os.fsync(self._journal.fileno())
+            self._apply(self._pairs, ops)
+            self._journal_ops += len(ops)
+            if self._journal_ops >= self.compact_every:
+                self.compact()
+
+    def compact(self) -> None:
+        """Write the current content as the snapshot and empty the journal.
+        A crash in between is harmless: replaying the journal again on top
+        of the new snapshot gives the same content
+        """
+        with self._locked():
+            self._write(self._read() if self._exists() else self._pairs)
+            if self._journal is not None:
+                self._journal.truncate(0)
+            elif os.path.exists(self.journal_path):
+                os.remove(self.journal_path)
+            self._journal_ops = 0
+
+    def close(self) -> None:
+        """Close the journal. Changes made afterwards reopen it"""
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
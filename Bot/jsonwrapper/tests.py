@@ -1,8 +1,15 @@
 import os
 import json
 import unittest
+import unittest.mock
 from pathlib import Path
+from typing import Any, Dict
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # type: ignore
 from .autosavedict import AutoSaveDict
+from .journaldict import JournalDict
 
 
 BASE_DIR = f'{os.sep}'.join(__file__.split(os.sep)[:-1])
@@ -18,6 +25,8 @@ class TestAutoSaveDict(unittest.TestCase):
 
     def tearDown(self) -> None:
         os.remove(self.path)
+        if os.path.exists(f"{self.path}.lock"):
+            os.remove(f"{self.path}.lock")
         return super().tearDown()
 
     def test_init(self) -> None:
@@ -144,3 +153,140 @@ class TestAutoSaveDict(unittest.TestCase):
         self.assertEqual(asd, config)
         self.assertEqual(asd._read(), config)
         self.assertEqual(asd._pairs, config)
+
+    def test_update_writes_once(self) -> None:
+        asd = AutoSaveDict(self.path, **self.default)
+        with unittest.mock.patch.object(asd, '_write', wraps=asd._write) as write:
+            asd.update({'b': 3, 'c': 4}, d=5)
+        self.assertEqual(write.call_count, 1)
+        expected = {**self.default, 'b': 3, 'c': 4, 'd': 5}
+        self.assertEqual(asd, expected)
+        self.assertEqual(asd._read(), expected)
+
+    def test_batch(self) -> None:
+        asd = AutoSaveDict(self.path, **self.default)
+        with unittest.mock.patch.object(asd, '_write', wraps=asd._write) as write:
+            with asd.batch():
+                asd['c'] = 3
+                del asd['a']
+                with asd.batch():
+                    asd.pop('b')
+                self.assertEqual(asd, {'c': 3})
+                self.assertEqual(asd._read(), self.default)
+        self.assertEqual(write.call_count, 1)
+        self.assertEqual(asd._read(), {'c': 3})
+        self.assertFalse(os.path.exists(f"{self.path}.tmp"))
+
+    def test_read_cache(self) -> None:
+        asd = AutoSaveDict(self.path, **self.default)
+        asd['c'] = 3
+        with unittest.mock.patch('json.load', wraps=json.load) as load:
+            self.assertEqual(asd._read(), {**self.default, 'c': 3})
+            asd['d'] = 4
+            self.assertEqual(load.call_count, 0)
+
+            # Another writer with the same size and mtime
+            stat = os.stat(self.path)
+            other = AutoSaveDict(self.path)
+            other['d'] = 5
+            os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+            self.assertEqual(load.call_count, 1)
+            self.assertEqual(asd._read()['d'], 5)
+            self.assertEqual(load.call_count, 2)
+
+    @unittest.skipIf(fcntl is None, "fcntl is not available")
+    def test_lock(self) -> None:
+        asd = AutoSaveDict(self.path, **self.default)
+        with asd._locked():
+            with asd._locked():
+                pass
+            with open(f"{self.path}.lock", mode='a') as f:
+                with self.assertRaises(BlockingIOError):
+                    fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        with open(f"{self.path}.lock", mode='a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+    def test_batch_rollback(self) -> None:
+        asd = AutoSaveDict(self.path, **self.default)
+        with self.assertRaises(KeyError):
+            with asd.batch():
+                asd['c'] = 3
+                del asd['missing']
+        self.assertEqual(asd, self.default)
+        self.assertEqual(asd._read(), self.default)
+
+
+class TestJournalDict(unittest.TestCase):
+    def setUp(self) -> None:
+        self.path = Path(BASE_DIR) / 'test_journal.json'
+        self.journal = Path(f"{self.path}.journal")
+        self.default: Dict[str, Any] = {'a': 1, 'b': 2}
+        return super().setUp()
+
+    def tearDown(self) -> None:
+        for path in (self.path, self.journal, Path(f"{self.path}.lock")):
+            if path.exists():
+                os.remove(path)
+        return super().tearDown()
+
+    def test_appends_and_replays(self) -> None:
+        jd = JournalDict(self.path, **self.default)
+        jd.init()
+        with unittest.mock.patch.object(jd, '_write', wraps=jd._write) as write:
+            jd['c'] = 3
+            del jd['a']
+            jd.update({'d': 4})
+        jd.close()
+        self.assertEqual(write.call_count, 0)
+        self.assertEqual(len(self.journal.read_text().splitlines()), 3)
+        self.assertEqual(json.loads(self.path.read_text()), self.default)
+
+        expected = {'b': 2, 'c': 3, 'd': 4}
+        self.assertEqual(jd, expected)
+        self.assertEqual(jd._pairs, expected)
+        self.assertEqual(JournalDict(self.path), expected)
+
+    def test_replays_without_snapshot(self) -> None:
+        jd = JournalDict(self.path, **self.default)
+        jd['c'] = 3
+        jd.close()
+        self.assertFalse(self.path.exists())
+        self.assertEqual(JournalDict(self.path), {**self.default, 'c': 3})
+
+    def test_compacts_defaults_without_snapshot(self) -> None:
+        JournalDict(self.path, **self.default).compact()
+        self.assertEqual(json.loads(self.path.read_text()), self.default)
+
+    def test_compaction(self) -> None:
+        jd = JournalDict(self.path, compact_every=3)
+        jd.init()
+        for i in range(4):
+            jd[str(i)] = i
+        self.assertEqual(json.loads(self.path.read_text()), {str(i): i for i in range(3)})
+        self.assertEqual(len(self.journal.read_text().splitlines()), 1)
+        self.assertEqual(JournalDict(self.path), {str(i): i for i in range(4)})
+
+        jd.clear()
+        jd['x'] = 1
+        self.assertEqual(json.loads(self.path.read_text()), {'x': 1})
+        self.assertEqual(self.journal.read_text(), '')
+
+        jd.close()
+        jd.compact()
+        self.assertFalse(self.journal.exists())
+        self.assertEqual(json.loads(self.path.read_text()), {'x': 1})
+
+    def test_torn_journal(self) -> None:
+        jd = JournalDict(self.path, **self.default)
+        jd.init()
+        jd['c'] = 3
+        jd.close()
+        with open(self.journal, mode='a') as f:
+            f.write('["set", "d", ')
+
+        reloaded = JournalDict(self.path)
+        self.assertEqual(reloaded, {**self.default, 'c': 3})
+        reloaded['e'] = 5
+        reloaded.close()
+        self.assertEqual(JournalDict(self.path), {**self.default, 'c': 3, 'e': 5})
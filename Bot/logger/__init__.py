@@ -1 +1,2 @@
 from .logger import *  # noqa
+from .sink import *  # noqa
@@ -1,8 +1,9 @@
 from __future__ import annotations
-import os
-import sys
+import json
+import datetime as dt
 from enum import Enum
 from inspect import currentframe
+from .sink import FileSink
 from typing import (
     Optional,
     Tuple,
@@ -67,7 +68,11 @@ def get_color(color: str) -> str:
         )
     ```
     """
-    return {i.name: i.value for i in Color}[color.upper()]
+    return _COLORS[color.upper()]
+
+
+_COLORS = {i.name: i.value for i in Color}
+_RESET = Color.RESET.value
 
 
 class Config:
@@ -84,6 +89,7 @@ class Config:
             'error': 1,
             'debug': 2,
         }
+        self._enabled: Dict[str, bool] = {}
         self.level = level
         self._iter = 0
 
@@ -140,6 +146,13 @@ class Config:
         if not 0 < v <= 5:
             raise ValueError(f"Level must be between `0-5` not `{v}`")
         self._level = v
+        self._refresh()
+
+    def _refresh(self) -> None:
+        """Precompute which logs are shown so the check costs a dict lookup"""
+        self._enabled = {
+            key: self._level <= value for key, value in self._settings.items()
+        }
 
     def items(self):  # type: ignore
         yield self._settings.items()
@@ -159,6 +172,7 @@ class Config:
         if all(key in self.settings for key in settings) and\
            all(0 < settings[key] <= 5 for key in settings):
             self._settings.update(settings)
+            self._refresh()
         else:
             raise ValueError(f"Invalid key or value in {settings}. Remember,\
  key has to exists in {self.settings} and all values have to be between (1-5)")
@@ -190,7 +204,7 @@ class MetaLogger(type):
 
         log_functions = 0
         target_log_functions = len(Config(1))
-        dismiss_attrs = ('settings', 'get_line_info')
+        dismiss_attrs = ('settings', 'get_line_info', 'flush', 'close', 'record')
         for log in attrs:
             if not log.startswith('_') and log not in dismiss_attrs:
                 log_functions += 1
@@ -205,15 +219,43 @@ class Logger(metaclass=MetaLogger):
     user can change independently through `self.settings.update()`.
     Mind that level 1 will print evetything and level 5 less
     """
-    def __init__(self, level: int = 2, log_path: Optional[str] = None):
+    def __init__(self, level: int = 2, log_path: Optional[str] = None,
+                 buffered: bool = False, flush_interval: float = 1.0,
+                 buffer_size: int = 100, structured: bool = False,
+                 max_bytes: int = 0, max_age: float = 0,
+                 backup_count: int = 5, compress: bool = True):
         """Initializer of Logger object
 
         :param level: The level of debugging. Based on that, some informations\
             can be configured to not show up thus lowering the verbosity, defaults to 2
         :type level: int, optional
+        :param log_path: File every log is also appended to, defaults to None
+        :type log_path: Optional[str], optional
+        :param buffered: Write to `log_path` from a background thread instead\
+            of the calling one, defaults to False
+        :type buffered: bool, optional
+        :param flush_interval: Seconds between flushes when buffered, defaults to 1.0
+        :type flush_interval: float, optional
+        :param buffer_size: Lines buffered before an early flush, defaults to 100
+        :type buffer_size: int, optional
+        :param structured: Output JSON lines instead of colored text, defaults to False
+        :type structured: bool, optional
+        :param max_bytes: Rotate `log_path` once it grows past this size, 0 never does, defaults to 0
+        :type max_bytes: int, optional
+        :param max_age: Rotate `log_path` after this many seconds, 0 never does, defaults to 0
+        :type max_age: float, optional
+        :param backup_count: Rotated files kept around, defaults to 5
+        :type backup_count: int, optional
+        :param compress: Gzip rotated files in the background, defaults to True
+        :type compress: bool, optional
         """
         self._settings = Config(level)
         self._log_path = log_path
+        self._structured = structured
+        self._sink = None if log_path is None else FileSink(
+            log_path, buffered, flush_interval, buffer_size,
+            max_bytes, max_age, backup_count, compress,
+        )
 
     def __str__(self) -> str:
         return f"<{self.__class__.__name__}Object-{self._settings._INSTANCE}>"
@@ -238,11 +280,18 @@ class Logger(metaclass=MetaLogger):
         :param msg: The message to be logged
         :type msg: str
         """
-        if self._log_path is not None:
-            if not os.path.exists(self._log_path):
-                with open(self._log_path, mode='w') as _: ...
-            with open(self._log_path, mode='a') as f:
-                f.write(f"[{header.upper()}]: {msg}\n")
+        if self._sink is not None:
+            self._sink.write(f"[{header.upper()}]: {msg}\n")
+
+    def flush(self) -> None:
+        """Make sure every log so far has reached the `log_path` file"""
+        if self._sink is not None:
+            self._sink.flush()
+
+    def close(self) -> None:
+        """Flush and close the `log_path` file. Happens at exit anyway"""
+        if self._sink is not None:
+            self._sink.close()
 
     def _runner(self, func_name: str) -> bool:
         """Use to check the `self.level` before printing the log
@@ -252,7 +301,58 @@ class Logger(metaclass=MetaLogger):
         :return: Wheather the settings allow this certain function to print
         :rtype: bool
         """
-        return self.settings.level <= self.settings[func_name]
+        return self._settings._enabled[func_name]
+
+    def _emit(self, func_name: str, header: str, color: str,
+              msg: Any, args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> None:
+        """Render and output a log. `msg` may be a `%`-style format string
+        for `args` or a callable returning the message; either way it is only
+        rendered when the log is shown or written to a file
+        """
+        shown = self._settings._enabled[func_name]
+        if not shown and self._sink is None:
+            return
+        if callable(msg):
+            msg = msg()
+        if args:
+            msg = msg % args
+        if self._structured:
+            self._write_json(shown, {'level': func_name, 'header': header, 'msg': str(msg)})
+            return
+        if shown:
+            print(f"{color}[{header.upper()}]: {msg}", end='', **kwargs)
+            print(_RESET)
+        self._log(header, msg)
+
+    def _write_json(self, shown: bool, fields: Dict[str, Any]) -> None:
+        line = json.dumps(
+            {'ts': dt.datetime.now(dt.timezone.utc).isoformat(), **fields},
+            default=str,
+        )
+        if shown:
+            print(line)
+        if self._sink is not None:
+            self._sink.write(f"{line}\n")
+
+    def record(self, event: str, **fields: Any) -> None:
+        """Log a structured record at the `info` level. In structured mode it
+        is one JSON object with `event` and `fields` as typed values. Example:
+        ```
+            >>> logger.record('cycle', cycle=3, new=2, duration=1.5)
+            {"ts": "...", "level": "info", "event": "cycle", "cycle": 3, "new": 2, "duration": 1.5}
+        ```
+
+        :param event: Name of the record
+        :type event: str
+        """
+        shown = self._settings._enabled['info']
+        if not shown and self._sink is None:
+            return
+        if self._structured:
+            self._write_json(shown, {'level': 'info', 'event': event, **fields})
+        else:
+            msg = ' '.join(f"{key}={value}" for key, value in fields.items())
+            self._emit('info', event, Color.YELLOW.value, msg, (), {})
 
     def get_line_info(self, file: str, prompt: str) -> str:
         """Get the file and the line of where this function is called
@@ -271,50 +371,24 @@ class Logger(metaclass=MetaLogger):
         return msg
 
     # ONLY LOGGING FUNCTIONS AFTER THIS
-    def custom(self, msg: str, header: str = 'custom',
+    # `msg` is either a string, formatted with `args` if any are given
+    # (`logger.debug("found %d posts", n)`), or a callable returning the
+    # message. Both are skipped entirely when the log is not emitted
+    def custom(self, msg: Any, header: str = 'custom',
                *args: Any, color: str = get_color('reset'), **kwargs: Any) -> None:
-        func_name = sys._getframe().f_code.co_name
-        if self._runner(func_name):
-            print(f"{color}[{header.upper()}]: {msg}{get_color('reset')}", *args, end='', **kwargs)
-            print(get_color('reset'))
-        self._log(header, msg)
+        self._emit('custom', header, color, msg, args, kwargs)
+
+    def info(self, msg: Any, *args: Any, **kwargs: Any) -> None:
+        self._emit('info', 'info', Color.YELLOW.value, msg, args, kwargs)
+
+    def success(self, msg: Any, *args: Any, **kwargs: Any) -> None:
+        self._emit('success', 'success', Color.GREEN.value, msg, args, kwargs)
+
+    def warning(self, msg: Any, *args: Any, **kwargs: Any) -> None:
+        self._emit('warning', 'warning', Color.RED.value, msg, args, kwargs)
+
+    def error(self, msg: Any, *args: Any, **kwargs: Any) -> None:
+        self._emit('error', 'error', Color.RED_BOLD.value, msg, args, kwargs)
 
-    def info(self, msg: str, *args: Any, **kwargs: Any) -> None:
-        func_name = sys._getframe().f_code.co_name
-        if self._runner(func_name):
-            print(f"{Color.YELLOW.value}[{func_name.upper()}]: {msg}",
-                  *args, end='', **kwargs)
-        print(get_color('reset'))
-        self._log(func_name, msg)
-
-    def success(self, msg: str, *args: Any, **kwargs: Any) -> None:
-        func_name = sys._getframe().f_code.co_name
-        if self._runner(func_name):
-            print(f"{Color.GREEN.value}[{func_name.upper()}]: {msg}",
-                  *args, end='', **kwargs)
-            print(get_color('reset'))
-        self._log(func_name, msg)
-
-    def warning(self, msg: str, *args: Any, **kwargs: Any) -> None:
-        func_name = sys._getframe().f_code.co_name
-        if self._runner(func_name):
-            print(f"{Color.RED.value}[{func_name.upper()}]: {msg}",
-                  *args, end='', **kwargs)
-            print(get_color('reset'))
-        self._log(func_name, msg)
-
-    def error(self, msg: str, *args: Any, **kwargs: Any) -> None:
-        func_name = sys._getframe().f_code.co_name
-        if self._runner(func_name):
-            print(f"{Color.RED_BOLD.value}[{func_name.upper()}]: {msg}",
-                  *args, end='', **kwargs)
-            print(get_color('reset'))
-        self._log(func_name, msg)
-
-    def debug(self, msg: str, *args: Any, **kwargs: Any) -> None:
-        func_name = sys._getframe().f_code.co_name
-        if self._runner(func_name):
-            print(f"{Color.BLUE.value}[{func_name.upper()}]: {msg}",
-                  *args, end='', **kwargs)
-            print(get_color('reset'))
-        self._log(func_name, msg)
+    def debug(self, msg: Any, *args: Any, **kwargs: Any) -> None:
+        self._emit('debug', 'debug', Color.BLUE.value, msg, args, kwargs)
@@ -0,0 +1,189 @@
+from __future__ import annotations
+import os
+import gzip
+import time
+import queue
+import atexit
+import shutil
+import threading
+from typing import (
+    Optional,
+    TextIO,
+    Union,
+    List,
+)
+
+
+__all__ = [
+    'FileSink',
+]
+
+
+class _Flush:
+    """Queue marker asking the writer thread to flush and report back"""
+    def __init__(self) -> None:
+        self.done = threading.Event()
+
+
+_STOP = object()
+
+
+class FileSink:
+    """Appends lines to a file through a single handle that stays open.
+
+    Unbuffered, every `write()` goes straight to the file. Buffered, lines are
+    put on a queue and a background thread writes them in batches, flushing
+    every `flush_interval` seconds or once `buffer_size` lines are waiting,
+    so callers never wait on the disk. Either way `close()` runs at exit.
+
+    The file is rotated once it grows past `max_bytes` or, if `max_age` is
+    set, once it is `max_age` seconds old, a file left by an earlier run
+    being as old as its last change. The rotated file is renamed to
+    `{path}.1` (older ones shift to `.2`, `.3`..., keeping `backup_count` of
+    them) so readers never see a truncated file, and gzipped to
+    `{path}.1.gz` by a separate thread when `compress` is set
+    """
+    def __init__(self, path: str, buffered: bool = False,
+                 flush_interval: float = 1.0, buffer_size: int = 100,
+                 max_bytes: int = 0, max_age: float = 0,
+                 backup_count: int = 5, compress: bool = True) -> None:
+        self.path = path
+        self.buffered = buffered
+        self.flush_interval = flush_interval
+        self.buffer_size = buffer_size
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.backup_count = backup_count
+        self.compress = compress
+        self._size = 0
+        self._started_at = 0.0
+        self._compressor: Optional[threading.Thread] = None
+        self._file: Optional[TextIO] = None
+        self._queue: queue.SimpleQueue[Union[str, _Flush, object]] = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._closed = False
+        atexit.register(self.close)
+
+    def __str__(self) -> str:
+        return f"<{self.__class__.__name__}({self.path!r}, buffered={self.buffered})>"
+
+    def __repr__(self) -> str:
+        return str(self)
+
+    def _open(self) -> TextIO:
+        if self._file is None:
+            self._file = open(self.path, mode='a')
+            self._size = self._file.tell()
+            self._started_at = time.time()
+            if self._size:
+                self._started_at = os.fstat(self._file.fileno()).st_mtime
+        return self._file
+
+    def _backup(self, n: int) -> str:
+        return f"{self.path}.{n}.gz" if self.compress else f"{self.path}.{n}"
+
+    def _rotate(self) -> TextIO:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        # `{path}.1` may still be being compressed
+        if self._compressor is not None:
+            self._compressor.join()
+
+        if self.backup_count <= 0:
+            os.remove(self.path)
+            return self._open()
+        for n in range(self.backup_count - 1, 0, -1):
+            if os.path.exists(self._backup(n)):
+                os.replace(self._backup(n), self._backup(n + 1))
+        rotated = f"{self.path}.1"
+        os.replace(self.path, rotated)
+        if self.compress:
+            self._compressor = threading.Thread(
+                target=self._compress, args=(rotated,), name='logger-compress', daemon=True
+            )
+            self._compressor.start()
+        return self._open()
+
+    def _compress(self, src: str) -> None:
+        tmp = f"{src}.gz.tmp"
+        with open(src, mode='rb') as f_in, gzip.open(tmp, mode='wb') as f_out:
+            shutil.copyfileobj(f_in, f_out)
+        os.replace(tmp, f"{src}.gz")
+        os.remove(src)
+
+    def _write(self, text: str) -> TextIO:
+        f = self._open()
+        size = len(text.encode(f.encoding))
+        if self._size and (
+            self.max_bytes and self._size + size > self.max_bytes
+            or self.max_age and time.time() - self._started_at >= self.max_age
+        ):
+            f = self._rotate()
+        f.write(text)
+        self._size += size
+        return f
+
+    def write(self, line: str) -> None:
+        if self._closed:
+            raise ValueError(f"{self} is closed")
+        if not self.buffered:
+            with self._lock:
+                self._write(line).flush()
+            return
+
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._run, name='logger-sink', daemon=True
+                    )
+                    self._thread.start()
+        self._queue.put(line)
+
+    def _run(self) -> None:
+        f = self._open()
+        pending: List[str] = []
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                item = None
+
+            if isinstance(item, str):
+                pending.append(item)
+                if len(pending) < self.buffer_size:
+                    continue
+            if pending:
+                f = self._write(''.join(pending))
+                pending.clear()
+            f.flush()
+            if isinstance(item, _Flush):
+                item.done.set()
+            elif item is _STOP:
+                return
+
+    def flush(self) -> None:
+        """Block until every line written so far is on disk"""
+        if self._thread is not None and self._thread.is_alive():
+            marker = _Flush()
+            self._queue.put(marker)
+            marker.done.wait()
+        elif self._file is not None:
+            self._file.flush()
+
+    def close(self) -> None:
+        """Flush the remaining lines and close the file. Safe to call twice"""
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._compressor is not None:
+            self._compressor.join()
+        atexit.unregister(self.close)
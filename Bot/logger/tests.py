@@ -1,11 +1,16 @@
 import os
 import io
 import sys
+import gzip
+import json
+import locale
 import unittest
 import unittest.mock
+import time
 from pathlib import Path
 from logger import Logger
 from .logger import Config
+from .sink import FileSink
 from typing import Any
 
 
@@ -87,7 +92,7 @@ class TestLogger(unittest.TestCase):
         self.assertFalse(mock_stdout.getvalue())
 
         self.logger.info(msg)
-        self.assertTrue(mock_stdout.getvalue())
+        self.assertFalse(mock_stdout.getvalue())
 
         self.logger.settings.level = 1
         self.logger.success(msg)
@@ -96,6 +101,27 @@ class TestLogger(unittest.TestCase):
         self.logger.info(msg)
         self.assertTrue(mock_stdout.getvalue())
 
+    @unittest.mock.patch('sys.stdout', new_callable=io.StringIO)
+    def test_lazy_messages(self, mock_stdout: Any) -> None:
+        calls = []
+
+        def expensive() -> str:
+            calls.append(1)
+            return "expensive"
+
+        self.logger.settings.level = 5
+        self.logger.debug(expensive)
+        self.logger.debug("%s %d", object(), 'not a number')  # Would raise if formatted
+        self.assertEqual(calls, [])
+        self.assertFalse(mock_stdout.getvalue())
+
+        self.logger.settings.update(debug=5)
+        self.logger.debug(expensive)
+        self.logger.debug("%d posts in %.1fs", 3, 1.25)
+        self.assertEqual(calls, [1])
+        self.assertIn("[DEBUG]: expensive", mock_stdout.getvalue())
+        self.assertIn("[DEBUG]: 3 posts in 1.2s", mock_stdout.getvalue())
+
     def test_iter_next(self) -> None:
         for i2 in self.logger.settings: ...
 
@@ -121,3 +147,131 @@ class TestLogger(unittest.TestCase):
         with open(file, mode='r') as f:
             self.assertEqual(f"[INFO]: {msg}", f.read()[:-1])  # Slice to remove '\n' from the file
         os.remove(file)
+
+    def test_buffered_log_to_file(self) -> None:
+        file = BASE_DIR / 'tests_buffered.txt'
+        logger = Logger(5, str(file), buffered=True, flush_interval=60, buffer_size=1000)
+        for i in range(3):
+            logger.debug(f"line {i}")
+        logger.flush()
+        with open(file, mode='r') as f:
+            self.assertEqual(f.read(), ''.join(f"[DEBUG]: line {i}\n" for i in range(3)))
+
+        logger.debug("last line")
+        logger.close()
+        logger.close()
+        with open(file, mode='r') as f:
+            self.assertTrue(f.read().endswith("[DEBUG]: last line\n"))
+        with self.assertRaises(ValueError):
+            logger.debug("after close")
+        os.remove(file)
+
+    def test_buffered_flushes_when_full(self) -> None:
+        file = BASE_DIR / 'tests_full.txt'
+        sink = FileSink(str(file), buffered=True, flush_interval=60, buffer_size=2)
+        sink.write("a\n")
+        sink.write("b\n")
+        for _ in range(100):
+            if os.path.exists(file) and os.path.getsize(file) == 4:
+                break
+            time.sleep(0.01)
+        with open(file, mode='r') as f:
+            self.assertEqual(f.read(), "a\nb\n")
+        sink.close()
+        os.remove(file)
+
+    @unittest.mock.patch('sys.stdout', new_callable=io.StringIO)
+    def test_structured(self, mock_stdout: Any) -> None:
+        file = BASE_DIR / 'tests_structured.txt'
+        logger = Logger(1, str(file), structured=True)
+        logger.info("found %d posts", 3)
+        logger.record('cycle', cycle=1, phases={'listing': 0.5}, deleted=2)
+        logger.settings.level = 5
+        logger.debug("not shown")
+        logger.close()
+
+        printed = [json.loads(line) for line in mock_stdout.getvalue().splitlines()]
+        self.assertEqual(printed[0]['level'], 'info')
+        self.assertEqual(printed[0]['msg'], 'found 3 posts')
+        self.assertEqual(printed[1]['event'], 'cycle')
+        self.assertEqual(printed[1]['phases'], {'listing': 0.5})
+        self.assertEqual(printed[1]['deleted'], 2)
+        self.assertEqual(len(printed), 2)
+
+        with open(file, mode='r') as f:
+            written = [json.loads(line) for line in f]
+        self.assertEqual(written[:2], printed)
+        self.assertEqual(written[2]['msg'], 'not shown')
+        os.remove(file)
+
+    @unittest.mock.patch('sys.stdout', new_callable=io.StringIO)
+    def test_record_as_text(self, mock_stdout: Any) -> None:
+        self.logger.record('cycle', cycle=1, deleted=2)
+        self.assertIn("[CYCLE]: cycle=1 deleted=2", mock_stdout.getvalue())
+
+    def test_rotation(self) -> None:
+        file = BASE_DIR / 'tests_rotated.txt'
+        backups = [Path(f"{file}.{n}.gz") for n in (1, 2, 3)]
+        sink = FileSink(str(file), max_bytes=10, backup_count=2)
+        for line in ("aaaaaaaa\n", "bbbbbbbb\n", "cccccccc\n", "dddddddd\n"):
+            sink.write(line)
+        sink.close()
+
+        with open(file, mode='r') as f:
+            self.assertEqual(f.read(), "dddddddd\n")
+        with gzip.open(backups[0], mode='rt') as f:
+            self.assertEqual(f.read(), "cccccccc\n")
+        with gzip.open(backups[1], mode='rt') as f:
+            self.assertEqual(f.read(), "bbbbbbbb\n")
+        self.assertFalse(backups[2].exists())
+        self.assertFalse(os.path.exists(f"{file}.1"))
+        for path in (file, *backups[:2]):
+            os.remove(path)
+
+    def test_rotation_counts_bytes(self) -> None:
+        if locale.getpreferredencoding(False).lower().replace('-', '') != 'utf8':
+            self.skipTest("Needs a UTF-8 locale")
+        file = BASE_DIR / 'tests_bytes.txt'
+        sink = FileSink(str(file), max_bytes=10, compress=False)
+        # 3 characters but 5 bytes each
+        for line in ("\u00e9\u00e9\n", "\u00e8\u00e8\n", "\u00ea\u00ea\n"):
+            sink.write(line)
+        sink.close()
+
+        with open(file, mode='r') as f:
+            self.assertEqual(f.read(), "\u00ea\u00ea\n")
+        with open(f"{file}.1", mode='r') as f:
+            self.assertEqual(f.read(), "\u00e9\u00e9\n\u00e8\u00e8\n")
+        os.remove(file)
+        os.remove(f"{file}.1")
+
+    def test_rotation_by_age_of_existing_file(self) -> None:
+        file = BASE_DIR / 'tests_aged_existing.txt'
+        file.write_text("old\n")
+        an_hour_ago = time.time() - 3600
+        os.utime(file, (an_hour_ago, an_hour_ago))
+        sink = FileSink(str(file), max_age=60, compress=False)
+        sink.write("new\n")
+        sink.close()
+
+        with open(file, mode='r') as f:
+            self.assertEqual(f.read(), "new\n")
+        with open(f"{file}.1", mode='r') as f:
+            self.assertEqual(f.read(), "old\n")
+        os.remove(file)
+        os.remove(f"{file}.1")
+
+    def test_rotation_by_age(self) -> None:
+        file = BASE_DIR / 'tests_aged.txt'
+        sink = FileSink(str(file), max_age=0.05, compress=False)
+        sink.write("old\n")
+        time.sleep(0.06)
+        sink.write("new\n")
+        sink.close()
+
+        with open(file, mode='r') as f:
+            self.assertEqual(f.read(), "new\n")
+        with open(f"{file}.1", mode='r') as f:
+            self.assertEqual(f.read(), "old\n")
+        os.remove(file)
+        os.remove(f"{file}.1")
@@ -1,37 +1,52 @@
 # mypy: disable-error-code=attr-defined
-import os
+from __future__ import annotations
 import sys
-import praw  # type: ignore
 import time
+import signal
 import utils
-import prawcore  # type: ignore
 import traceback
 import datetime as dt
 from pathlib import Path
 from logger import Logger
+from idset import SeenIds
+from tracing import (
+    JsonlExporter,
+    Tracer,
+)
+from metrics import (
+    BotMetrics,
+    MetricsServer,
+    instrumented_requestor,
+)
 from typing import (
+    TYPE_CHECKING,
     Optional,
     Callable,
+    Iterator,
     Tuple,
     List,
+    Dict,
     Set,
     Any,
+    cast,
 )
-
-import importlib
-import importlib.util
 from bot import (
+    CycleCheckpoint,
+    TrackedPost,
+    AuthorStatus,
+    AuthorCache,
     Datatype,
     Posts,
     Row,
 )
 
-# configuration will be loaded later once we have ensured the package is
-# in place.  this avoids import errors when the ``config`` directory is
-# provided via a volume mount that is initially empty.
+if TYPE_CHECKING:
+    import praw  # type: ignore
 
-cfg = None  # type: ignore
-TEMPLATE = None  # type: ignore
+# importing this module has no side effects: the configuration is read, and
+# praw, the database and the logger are set up, only once the bot runs (see
+# ``main()``). command line operations never import praw nor touch the
+# network
 
 # fallback template used when the config module cannot yet be imported
 DEFAULT_TEMPLATE = """# configuration for DeletedPosts bot
@@ -53,55 +68,35 @@ config = {
 
 
 # the old JSON-based interactive configuration helper has been removed.  the
-# values are now stored in ``config/config.py``.  ``cfg`` above is a simple
+# values are now stored in ``config/config.py``.  ``Engine.cfg`` is a simple
 # dict containing the settings; callers should treat numeric entries as
 # integers.
 
 
-
-config_dir = Path(utils.BASE_DIR, 'config')
-config_dir.mkdir(parents=True, exist_ok=True)
-# make config a package so it can be imported later; if __init__.py is missing
-# (for example a freshly mounted empty volume), create a minimal one.
-init_file = config_dir / "__init__.py"
-if not init_file.exists():
-    init_file.write_text("# config package\n")
-
-config_path = config_dir / 'config.py'
-# if the config file itself is missing, write the template and exit. we need to
-# import the template name from the module, but since the file was just created
-# we'll import once below after ensuring the package exists.
-if not config_path.exists():
-    # write fallback template if we haven't yet imported the module
-    fallback = TEMPLATE or DEFAULT_TEMPLATE
-    config_path.write_text(fallback)
-    print(f"Created new configuration template at {config_path!r}.\n"
-          "Please populate the values and restart the bot.")
-    sys.exit(0)
-
-# now that the package structure exists and config file is present, import it
-import importlib
-spec = importlib.util.spec_from_file_location("config", str(config_path))
-config_mod = importlib.util.module_from_spec(spec)
-# insert into sys.modules so conventional imports work
-sys.modules["config"] = config_mod
-if spec.loader:
-    spec.loader.exec_module(config_mod)  # type: ignore
-cfg = config_mod.config
-# older config files may not define TEMPLATE (previous bug); fall back
-TEMPLATE = getattr(config_mod, 'TEMPLATE', DEFAULT_TEMPLATE)
-
-posts = Posts('deleted_posts', config_dir)
-logger = Logger(1)
+CONFIG_DIR = Path(utils.BASE_DIR, 'config')
 untracked_flairs = (utils.Flair.SOLVED, utils.Flair.ABANDONED)
-posts.init()
-reddit = praw.Reddit(
-    client_id=cfg['client_id'],
-    client_secret=cfg['client_secret'],
-    user_agent=cfg['user_agent'],
-    username=cfg['username'],
-    password=cfg['password'],
-)
+# submissions fetched per ``reddit.info`` request, the API maximum
+INFO_BATCH = 100
+
+
+def prepare_config_dir(config_dir: Path) -> Path:
+    """Make sure ``config_dir`` is a package holding ``config.py``. If the
+    config file itself is missing, write the template and exit
+    """
+    config_dir.mkdir(parents=True, exist_ok=True)
+    # make config a package so it can be imported later; if __init__.py is missing
+    # (for example a freshly mounted empty volume), create a minimal one.
+    init_file = config_dir / "__init__.py"
+    if not init_file.exists():
+        init_file.write_text("# config package\n")
+
+    config_path = config_dir / 'config.py'
+    if not config_path.exists():
+        config_path.write_text(DEFAULT_TEMPLATE)
+        print(f"Created new configuration template at {config_path!r}.\n"
+              "Please populate the values and restart the bot.")
+        sys.exit(0)
+    return config_path
 
 
 def remove_method(submission: praw.reddit.Submission) -> Optional[str]:
@@ -140,11 +135,11 @@ def send_modmail(reddit: praw.Reddit, subreddit: str, subject: str, msg: str) ->
 
 
 def notify_if_error(func: Callable[..., int]) -> Callable[..., int]:
-    def wrapper(*args: Any, **kwargs: Any) -> int:
+    def wrapper(engine: Engine, *args: Any, **kwargs: Any) -> int:
         try:
-            return func(*args, **kwargs)
+            return func(engine, *args, **kwargs)
         except KeyboardInterrupt:
-            logger.debug("\nProgram interrupted by user")
+            engine.logger.debug("\nProgram interrupted by user")
             return 0
         except:
             author = 'https://www.reddit.com/user/kaerfkeerg'
@@ -152,8 +147,8 @@ def notify_if_error(func: Callable[..., int]) -> Callable[..., int]:
             bot_name = utils.BOT_NAME
             msg = f"Error with '{bot_name}':\n\n{full_error}\n\nPlease report to author ({author})"
             send_modmail(
-                reddit,
-                cfg['sub_name'],
+                engine.reddit,
+                engine.cfg['sub_name'],
                 f'An error has occured with {utils.BOT_NAME} msg',
                 msg
             )
@@ -167,119 +162,578 @@ def should_be_tracked(
     return flair not in untracked_flairs
 
 
-def user_is_deleted(submission: praw.reddit.Submission) -> bool:
-    return submission.author is None
-
-
-def check_submission(submission: praw.reddit.Submission, saved_submission_ids: Set[Row]) -> None:
-    if not user_is_deleted(submission) and submission.id not in saved_submission_ids:
-        flair = utils.get_flair(submission.link_flair_text)
-        method = remove_method(submission)
-        if should_be_tracked(flair, untracked_flairs):
-            if method is None and submission.author is not None:
-                original_post = Row(
-                    username=submission.author.name,
-                    title=submission.title,
-                    text=submission.selftext,
-                    post_id=submission.id,
-                    deletion_method=Datatype.NULL,
-                    post_last_edit=Datatype.NULL,
-                    record_created=str(dt.datetime.now()),
-                    record_edited=str(dt.datetime.now()),
-                )
-                posts.save(original_post)
-
-
-@notify_if_error
-def main() -> int:
-    # announce startup and interval
-    sleep_minutes = int(cfg.get('sleep_minutes', 5))
-    logger.info(f"{utils.BOT_NAME} starting; will sleep {sleep_minutes} minutes between cycles")
-
-    # run indefinitely, sleeping between iterations
-    while True:
-        posts_to_delete: Set[Row] = set()
-        ignore_methods = ['Removed by mod',]
-
-        if utils.parse_cmd_line_args(sys.argv, logger, config_path, posts):
-            return 0
-
-        saved_submission_ids = {row.post_id for row in posts.fetch_all()}
-        max_posts = cfg.get('max_posts')
-        limit = int(max_posts) if max_posts else None
-        sub_name = cfg['sub_name']
-
-        for submission in reddit.subreddit(sub_name).new(limit=limit):
-            try:
-                check_submission(submission, saved_submission_ids)
-            except prawcore.exceptions.TooManyRequests:
-                time.sleep(60)
-                check_submission(submission, saved_submission_ids)
-
-        for stored_post in posts.fetch_all():
-            try:
-                submission = reddit.submission(id=stored_post.post_id)
-                max_days = int(cfg['max_days'])
-                created = utils.string_to_dt(stored_post.record_created).date()
+class Engine:
+    """The bot itself. The Reddit client, the database and the set of seen
+    posts are created on first use, so constructing an engine only reads
+    the configuration. A ``reddit`` client and a ``clock`` (anything with
+    the ``sleep``, ``monotonic`` and ``time`` functions of the ``time`` module) can be
+    given instead of the real ones, e.g. to run against a simulated subreddit
+    """
+    def __init__(self, config_dir: Path, reddit: Optional[praw.Reddit] = None, clock: Any = time) -> None:
+        self.config_dir = config_dir
+        self.clock = clock
+        self.config_path = config_dir / 'config.py'
+        # keys of the optional ``override.json`` take precedence
+        self.override_path = config_dir / 'override.json'
+        self.cfg = utils.load_config(self.config_path, self.override_path)
+        utils.validate_config(self.cfg)
+        # both files are checked for changes between cycles
+        self.config_watcher = utils.ConfigWatcher(self.config_path, self.override_path)
+
+        cfg = self.cfg
+        # logs are also appended to ``log_path`` when set, from a background thread.
+        # ``log_format: json`` switches to JSON lines with one summary per cycle.
+        # the file is rotated by size and/or age and old ones are gzipped
+        self.logger = Logger(
+            1,
+            cfg.get('log_path') or None,
+            buffered=True,
+            structured=cfg.get('log_format', 'text') == 'json',
+            max_bytes=int(cfg.get('log_max_bytes', 10 * 1024 * 1024)),
+            max_age=float(cfg.get('log_max_days', 0)) * 24 * 60 * 60,
+            backup_count=int(cfg.get('log_backup_count', 5)),
+        )
+        self.authors = AuthorCache(
+            int(cfg.get('author_cache_ttl', 3600)),
+            int(cfg.get('author_cache_size', 10_000)),
+            clock=clock.monotonic,
+        )
+        self.metrics = BotMetrics()
+        # ``trace_path`` records spans of every post checked, revalidated, written
+        # or notified about, as OpenTelemetry JSON lines
+        trace_path = cfg.get('trace_path')
+        self.tracer = Tracer(JsonlExporter(
+            trace_path,
+            max_bytes=int(cfg.get('log_max_bytes', 10 * 1024 * 1024)),
+            backup_count=int(cfg.get('log_backup_count', 5)),
+        ) if trace_path else None)
+        # ``profile_every`` profiles one cycle out of that many
+        self.profiler = utils.CycleProfiler(config_dir / 'profiles')
+        # bounds and targets are read from the config every cycle
+        self.scheduler = utils.PollScheduler(60, 60)
+        self.metrics_server: Optional[MetricsServer] = None
+        self._reddit: Optional[praw.Reddit] = reddit
+        self._posts: Optional[Posts] = None
+        self._seen_ids: Optional[SeenIds] = None
+        self._checkpoint: Optional[CycleCheckpoint] = None
+        # set by ``stop()``: the post being checked is finished, the cycle's
+        # writes flushed and ``run()`` returns
+        self.stopping = False
+        # the cycle being run, its API calls are counted in it
+        self._stats: Optional[utils.CycleStats] = None
+        # called with the stats of every cycle once it ran
+        self.on_cycle: Optional[Callable[[utils.CycleStats], None]] = None
+        # the first post left unchecked when the last cycle ran out of budget
+        self._resume_from: Optional[str] = None
+
+    def __str__(self) -> str:
+        return f"<{self.__class__.__name__}({str(self.config_dir)!r})>"
+
+    def __repr__(self) -> str:
+        return str(self)
+
+    @property
+    def reddit(self) -> praw.Reddit:
+        if self._reddit is None:
+            import praw  # type: ignore
+            cfg = self.cfg
+            self._reddit = praw.Reddit(
+                client_id=cfg['client_id'],
+                client_secret=cfg['client_secret'],
+                user_agent=cfg['user_agent'],
+                username=cfg['username'],
+                password=cfg['password'],
+                # reports every HTTP request to the metrics
+                requestor_class=instrumented_requestor(self.on_request),
+            )
+        return self._reddit
+
+    @property
+    def posts(self) -> Posts:
+        if self._posts is None:
+            posts = Posts('deleted_posts', self.config_dir, self.cfg.get('db_backend', 'sqlite'))
+            posts.on_query = self.metrics.observe_query
+            posts.init()
+            self._posts = posts
+        return self._posts
+
+    @property
+    def seen_ids(self) -> SeenIds:
+        """Every post the bot has ever tracked, including the ones it dropped"""
+        if self._seen_ids is None:
+            seen_ids = SeenIds(
+                self.config_dir / '.deleted_posts.seen',
+                int(self.cfg.get('seen_bloom_bits', 1 << 20)),
+            )
+            seen_ids.load()
+            seen_ids.update(self.posts.index)
+            self._seen_ids = seen_ids
+        return self._seen_ids
+
+    @property
+    def checkpoint(self) -> CycleCheckpoint:
+        """How far the running cycle got, so that a restarted bot finishes it"""
+        if self._checkpoint is None:
+            self._checkpoint = CycleCheckpoint(self.config_dir / '.deleted_posts.checkpoint')
+        return self._checkpoint
+
+    def stop(self, *args: Any) -> None:
+        """Make ``run()`` return once the post being checked is done and the
+        cycle's writes are flushed. Takes the arguments of a signal handler
+        """
+        self.stopping = True
+
+    def pause(self, seconds: float) -> None:
+        """Sleep ``seconds``, or until the bot is stopped"""
+        end = self.clock.monotonic() + seconds
+        while not self.stopping:
+            remaining = end - self.clock.monotonic()
+            if remaining <= 0:
+                return
+            self.clock.sleep(min(remaining, 1.0))
+
+    def user_is_deleted(self, submission: praw.reddit.Submission, username: Optional[str] = None) -> bool:
+        """Whether the author's account is gone: the submission lost its author,
+        or, with a ``username``, an account lookup found the account deleted.
+        The author of one submission says nothing about the author's other
+        posts, a post deleted by its author loses it too, so it is never cached
+        """
+        if submission.author is None:
+            return True
+        if username is None:
+            return False
+        # listing data includes the fullname, reading it never fetches
+        self.authors.remember(username, vars(submission).get('author_fullname'))
+        return self.authors.get(username) is AuthorStatus.DELETED
+
+    def check_submission(self, submission: praw.reddit.Submission, seen: SeenIds) -> bool:
+        """Start tracking ``submission`` if it qualifies; returns whether it did"""
+        with self.tracer.span('check_submission', **{'post.id': submission.id}) as span:
+            if not self.user_is_deleted(submission) and submission.id not in seen:
                 flair = utils.get_flair(submission.link_flair_text)
-
-                if utils.submission_is_older(created, max_days) or flair in untracked_flairs:
-                    posts_to_delete.add(stored_post)
-                    continue
-
-                submission = reddit.submission(id=stored_post.post_id)
                 method = remove_method(submission)
-                if user_is_deleted(submission):
-                    if method not in ignore_methods:
-                        send_modmail(
-                            reddit,
-                            cfg['sub_name'],
-                            "User's account has been deleted",
-                            utils.modmail_removal_notification(stored_post, 'Account has been deleted')
-                        )
-                    posts_to_delete.add(stored_post)
-
-                elif method is not None and not stored_post.deletion_method:
-                    if method not in ignore_methods:
-                        stored_post.deletion_method = method
-                        stored_post.record_edited = str(dt.datetime.now())
-                        posts.edit(stored_post)
-                        msg = utils.modmail_removal_notification(stored_post, method)
-                        send_modmail(
-                            reddit,
-                            cfg['sub_name'],
-                            'A post has been deleted',
-                            msg
+                if should_be_tracked(flair, untracked_flairs):
+                    if method is None and submission.author is not None:
+                        original_post = Row(
+                            username=submission.author.name,
+                            title=submission.title,
+                            text=submission.selftext,
+                            post_id=submission.id,
+                            deletion_method=Datatype.NULL,
+                            post_last_edit=Datatype.NULL,
+                            record_created=str(dt.datetime.now()),
+                            record_edited=str(dt.datetime.now()),
+                            reddit_edited=float(submission.edited or 0),
+                            text_hash=utils.fingerprint(submission.selftext),
                         )
-                    posts_to_delete.add(stored_post)
-                    time.sleep(utils.MSG_AWAIT_THRESHOLD)
-
-                if submission.selftext != stored_post.text\
-                        or submission.selftext != stored_post.post_last_edit\
-                            and not stored_post.deletion_method:
-                    stored_post.post_last_edit = submission.selftext
-                    stored_post.record_edited = str(dt.datetime.now())
-                    posts.edit(stored_post)
-            except prawcore.exceptions.TooManyRequests:
-                time.sleep(60)
-
-        for row in posts_to_delete:
-            posts.delete(post_id=row.post_id)
-
-        posts_to_delete.clear()
-        logger.info("Program finished successfully")
-        logger.info(f"Total posts deleted: {len(posts_to_delete)}")
-
-        # wait before the next cycle
-        sleep_minutes = int(cfg.get('sleep_minutes', 5))
-        logger.info(f"Sleeping for {sleep_minutes} minutes...")
-        time.sleep(sleep_minutes * 60)
-
-    # end of while True
-    return 0
+                        with self.tracer.span('db.save', **{'post.id': submission.id}):
+                            self.posts.save(original_post)
+                        seen.add(submission.id)
+                        self.authors.remember(submission.author.name, vars(submission).get('author_fullname'))
+                        span.set(tracked=True, **{'post.text_length': len(submission.selftext)})
+                        return True
+            span.set(tracked=False)
+            return False
+
+    def update_text(self, stored_post: Row, selftext: str, edited: float) -> bool:
+        """Record an edit of a tracked post, comparing fingerprints rather than
+        whole bodies. The row is only rewritten when something changed. Returns
+        whether the text changed
+        """
+        text_hash = utils.fingerprint(selftext)
+        known_hash = stored_post.text_hash
+        if known_hash is None:
+            # stored before fingerprints existed
+            last_text = stored_post.post_last_edit
+            known_hash = utils.fingerprint(stored_post.text if last_text is None else last_text)
+
+        if text_hash != known_hash:
+            stored_post.post_last_edit = selftext
+            stored_post.record_edited = str(dt.datetime.now())
+        if text_hash != stored_post.text_hash or edited != stored_post.reddit_edited:
+            stored_post.text_hash = text_hash
+            stored_post.reddit_edited = edited
+            with self.tracer.span('db.edit', **{'post.id': stored_post.post_id}):
+                self.posts.edit(stored_post)
+        return text_hash != known_hash
+
+    def run_maintenance(self) -> None:
+        archive_days = int(self.cfg.get('archive_days', 365))
+        pruned = self.posts.prune_archive(archive_days) if archive_days > 0 else 0
+        before, after = self.posts.maintain()
+        self.logger.info(f"Database maintenance: pruned {pruned} archived posts, {before:,} -> {after:,} bytes")
+
+    def reload_config(self) -> None:
+        """Swap in the configuration files' new content if they changed. A
+        config that fails to load or validate is ignored and the current one
+        kept. Settings read once at startup are reported as needing a restart
+        """
+        if not self.config_watcher.changed():
+            return
+        try:
+            new_cfg = utils.load_config(self.config_path, self.override_path)
+            utils.validate_config(new_cfg)
+        except Exception as e:
+            self.logger.warning(f"Configuration not reloaded, keeping the current one: {e}")
+            return
+
+        changed = utils.changed_keys(self.cfg, new_cfg)
+        if not changed:
+            return
+        restart = [key for key in changed if key in utils.RESTART_KEYS]
+        if restart:
+            # values are left out, some of these are credentials
+            self.logger.warning(f"Restart the bot to apply: {', '.join(restart)}")
+        self.authors.ttl = int(new_cfg.get('author_cache_ttl', 3600))
+        self.authors.max_size = int(new_cfg.get('author_cache_size', 10_000))
+        self.cfg = new_cfg
+        self.logger.info(f"Configuration reloaded: {', '.join(changed)}")
+
+    def start_metrics_server(self) -> None:
+        # ``metrics_port`` serves the metrics in the Prometheus text format
+        port = int(self.cfg.get('metrics_port') or 0)
+        if not port or self.metrics_server is not None:
+            return
+        self.metrics_server = MetricsServer(
+            self.metrics.registry, port, self.cfg.get('metrics_host', '127.0.0.1')
+        )
+        self.metrics_server.start()
+        host, port = self.metrics_server.address
+        self.logger.info(f"Serving metrics at http://{host}:{port}/metrics")
+
+    def on_request(self, method: str, endpoint: str, status: int, seconds: float) -> None:
+        """Called by the Reddit requestor after every HTTP request"""
+        self.metrics.observe_request(method, endpoint, status, seconds)
+        if self._stats is not None:
+            self._stats.count_call()
+        # a child of whatever span made the request
+        attributes: Dict[str, Any] = {'http.method': method, 'http.route': endpoint, 'http.status_code': status}
+        self.tracer.record(
+            f"{method} {endpoint}", seconds,
+            f"HTTP {status}" if status >= 400 else None,
+            **attributes,
+        )
+
+    def budget_exhausted(self, stats: utils.CycleStats) -> bool:
+        # ``api_budget`` caps the requests of a cycle, 0 means no cap
+        budget = int(self.cfg.get('api_budget') or 0)
+        return budget > 0 and stats.counts['api_calls'] >= budget
+
+    def fetch_submissions(self, post_ids: List[str],
+                          exhausted: Callable[[], bool]) -> Iterator[praw.reddit.Submission]:
+        """The submissions of ``post_ids`` in order, fetched ``INFO_BATCH`` at
+        a time with a single request each. Posts the batch lookup misses are
+        loaded on their own. A rate limited batch request is retried once
+        after a minute; if it is limited again the posts left are deferred to
+        the next cycle rather than loaded one by one. Stops before any of
+        these requests once ``exhausted()``
+        """
+        from prawcore.exceptions import TooManyRequests  # type: ignore
+        for i in range(0, len(post_ids), INFO_BATCH):
+            batch = post_ids[i:i + INFO_BATCH]
+            found: Optional[Dict[str, praw.reddit.Submission]] = None
+            for attempt in range(2):
+                if exhausted():
+                    return
+                try:
+                    with self.tracer.span('fetch_submissions', batch=len(batch), attempt=attempt):
+                        # only t3_ fullnames are asked for, so only submissions come back
+                        found = {
+                            s.id: cast('praw.reddit.Submission', s)
+                            for s in self.reddit.info(fullnames=[f"t3_{post_id}" for post_id in batch])
+                        }
+                    break
+                except TooManyRequests:
+                    if attempt == 0:
+                        self.clock.sleep(60)
+            if found is None:
+                self.logger.warning(f"Rate limited, {len(post_ids) - i} posts deferred to the next cycle")
+                return
+            for post_id in batch:
+                submission = found.get(post_id)
+                if submission is None:
+                    if exhausted():
+                        return
+                    submission = self.reddit.submission(id=post_id)
+                yield submission
+
+    def run_cycle(self, stats: utils.CycleStats) -> bool:
+        """Returns whether the cycle ran to its end, rather than being stopped"""
+        from prawcore.exceptions import TooManyRequests  # type: ignore
+        # deletions a stopped run notified about but did not write
+        posts_to_delete: Set[str] = self.checkpoint.pending
+
+        # posts found in this cycle are revalidated from the next one on; they
+        # only reach the database when the cycle's writes are flushed
+        tracked_posts = list(self.posts.index.values())
+        max_posts = self.cfg.get('max_posts')
+        limit = int(max_posts) if max_posts else None
+        sub_name = self.cfg['sub_name']
+
+        created: List[float] = []
+        with stats.phase('listing'):
+            for submission in self.reddit.subreddit(sub_name).new(limit=limit):
+                if self.budget_exhausted(stats):
+                    # whatever is left is listed again next cycle
+                    self.logger.warning("API budget reached while listing new posts")
+                    break
+                if self.stopping:
+                    break
+                created.append(float(submission.created_utc))
+                try:
+                    tracked_now = self.check_submission(submission, self.seen_ids)
+                except TooManyRequests:
+                    self.clock.sleep(60)
+                    tracked_now = self.check_submission(submission, self.seen_ids)
+                if tracked_now:
+                    stats.count('new')
+
+        self.scheduler.observe_listing(created, self.clock.time())
+
+        with stats.phase('revalidation'):
+            finished = self.revalidate(tracked_posts, posts_to_delete, stats)
+
+        for post_id in posts_to_delete:
+            with self.tracer.span('db.delete', **{'post.id': post_id}):
+                self.posts.delete(post_id=post_id)
+        return finished
+
+    def revalidate(self, tracked_posts: List[TrackedPost], posts_to_delete: Set[str],
+                   stats: utils.CycleStats) -> bool:
+        """Check the tracked posts for deletions and edits. Returns whether
+        every post was checked or deferred, rather than the bot being stopped
+        """
+        from prawcore.exceptions import TooManyRequests  # type: ignore
+        ignore_methods = ['Removed by mod',]
+        reddit = self.reddit
+        posts = self.posts
+        checkpoint = self.checkpoint
+
+        def exhausted() -> bool:
+            return self.stopping or self.budget_exhausted(stats)
+
+        # one batched lookup for every author whose cached state expired, so
+        # accounts deleted since are known before their posts are checked
+        if not exhausted():
+            with stats.phase('authors'):
+                self.authors.resolve(reddit, (tracked.username for tracked in tracked_posts))
+        # start where the previous cycle ran out of budget, if it did
+        tracked_posts = self._resume_order(tracked_posts)
+        # and skip the posts a run stopped during this cycle already checked
+        if checkpoint.next is not None:
+            position = next((i for i, t in enumerate(tracked_posts) if t.post_id == checkpoint.next), 0)
+            if position:
+                self.logger.info(f"Resuming the interrupted cycle, {position} posts were already checked")
+            tracked_posts = tracked_posts[position:]
+        submissions = self.fetch_submissions([t.post_id for t in tracked_posts], exhausted)
+        done = 0
+        for tracked, submission in zip(tracked_posts, submissions):
+            if self.stopping:
+                break
+            checkpoint.at(tracked.post_id)
+            done += 1
+            if tracked.post_id in posts_to_delete:
+                # notified about before a restart
+                continue
+            with self.tracer.span('revalidate', **{'post.id': tracked.post_id}) as span:
+                try:
+                    max_days = int(self.cfg['max_days'])
+                    created = utils.string_to_dt(tracked.record_created).date()
+                    flair = utils.get_flair(submission.link_flair_text)
+
+                    if utils.submission_is_older(created, max_days) or flair in untracked_flairs:
+                        posts_to_delete.add(tracked.post_id)
+                        stats.count('expired')
+                        span.set(outcome='expired')
+                        continue
+
+                    method = remove_method(submission)
+                    edited = float(submission.edited or 0)
+                    # fast path: not removed and not edited since the last check, so
+                    # there is no row to load, compare or rewrite
+                    if method is None and not tracked.deletion_method\
+                            and edited == tracked.reddit_edited\
+                            and not self.user_is_deleted(submission, tracked.username):
+                        span.set(outcome='unchanged')
+                        continue
+
+                    with self.tracer.span('db.get', **{'post.id': tracked.post_id}):
+                        stored_post = posts.get(post_id=tracked.post_id)
+                    if self.user_is_deleted(submission, tracked.username):
+                        if method not in ignore_methods:
+                            self.notify(
+                                stats,
+                                stored_post.post_id,
+                                "User's account has been deleted",
+                                utils.modmail_removal_notification(stored_post, 'Account has been deleted')
+                            )
+                        posts_to_delete.add(stored_post.post_id)
+                        checkpoint.delete(stored_post.post_id)
+                        stats.count('deleted')
+                        span.set(outcome='account_deleted')
+
+                    elif method is not None and not stored_post.deletion_method:
+                        if method not in ignore_methods:
+                            stored_post.deletion_method = method
+                            stored_post.record_edited = str(dt.datetime.now())
+                            with self.tracer.span('db.edit', **{'post.id': stored_post.post_id}):
+                                posts.edit(stored_post)
+                            msg = utils.modmail_removal_notification(stored_post, method)
+                            self.notify(stats, stored_post.post_id, 'A post has been deleted', msg)
+                        posts_to_delete.add(stored_post.post_id)
+                        checkpoint.delete(stored_post.post_id)
+                        stats.count('deleted')
+                        span.set(outcome='removed', method=method)
+                        self.clock.sleep(utils.MSG_AWAIT_THRESHOLD)
+
+                    if stored_post.post_id not in posts_to_delete:
+                        changed = self.update_text(stored_post, submission.selftext, edited)
+                        if changed:
+                            stats.count('edited')
+                        span.set(outcome='edited' if changed else 'checked',
+                                 **{'post.text_length': len(submission.selftext)})
+                except TooManyRequests:
+                    span.set(rate_limited=True)
+                    self.clock.sleep(60)
+
+        if self.stopping and done < len(tracked_posts):
+            # the next run carries on from here
+            checkpoint.at(tracked_posts[done].post_id, force=True)
+            self.logger.info(f"Stopping, {len(tracked_posts) - done} posts left to check after a restart")
+            return False
+
+        self._resume_from = None
+        if done < len(tracked_posts):
+            self._resume_from = tracked_posts[done].post_id
+            stats.count('deferred', len(tracked_posts) - done)
+            # ``fetch_submissions`` reports deferrals of its own
+            if self.budget_exhausted(stats):
+                self.logger.warning(f"API budget reached, {len(tracked_posts) - done} posts deferred to the next cycle")
+        return True
+
+    def notify(self, stats: utils.CycleStats, post_id: str, subject: str, msg: str) -> None:
+        """Send a modmail about ``post_id``, counted in the cycle's modmail phase"""
+        with stats.phase('modmail'), self.tracer.span('send_modmail', **{'post.id': post_id}):
+            send_modmail(self.reddit, self.cfg['sub_name'], subject, msg)
+        stats.count('modmail')
+
+    def _resume_order(self, tracked_posts: List[TrackedPost]) -> List[TrackedPost]:
+        for i, tracked in enumerate(tracked_posts):
+            if tracked.post_id == self._resume_from:
+                return tracked_posts[i:] + tracked_posts[:i]
+        return tracked_posts
+
+    def next_sleep(self, stats: utils.CycleStats) -> float:
+        """Seconds to wait after the cycle of ``stats``: ``sleep_minutes``, or
+        between ``min_sleep_minutes`` and ``max_sleep_minutes`` depending on
+        how fast posts arrive and get deleted when the latter is set
+        """
+        cfg = self.cfg
+        scheduler = self.scheduler
+        scheduler.observe_cycle(stats.counts['deleted'], self.clock.monotonic())
+        max_sleep = int(cfg.get('max_sleep_minutes') or 0)
+        if not max_sleep:
+            return int(cfg.get('sleep_minutes', 5)) * 60.0
+        scheduler.min_sleep = min(max_sleep, int(cfg.get('min_sleep_minutes', 1))) * 60.0
+        scheduler.max_sleep = max_sleep * 60.0
+        # half a listing of new posts between cycles, so none are missed
+        max_posts = cfg.get('max_posts')
+        scheduler.target_posts = max(1, int(max_posts) // 2) if max_posts else 50
+        return scheduler.next_sleep()
+
+    @notify_if_error
+    def run(self, cycles: Optional[int] = None) -> int:
+        """Run ``cycles`` cycles, or forever"""
+        # announce startup and interval
+        if self.cfg.get('max_sleep_minutes'):
+            interval = f"{self.cfg.get('min_sleep_minutes', 1)} to {self.cfg['max_sleep_minutes']}"
+        else:
+            interval = str(self.cfg.get('sleep_minutes', 5))
+        self.logger.info(f"{utils.BOT_NAME} starting; will sleep {interval} minutes between cycles")
+        self.start_metrics_server()
+        # carry on with the cycle order of the previous run, and with its last
+        # cycle if it was stopped in the middle of it
+        self._resume_from = self.checkpoint.start
+
+        cycle = 0
+        # run indefinitely, sleeping between iterations
+        while (cycles is None or cycle < cycles) and not self.stopping:
+            cycle += 1
+            # new settings take effect from the start of a cycle
+            self.reload_config()
+
+            stats = self._stats = utils.CycleStats(cycle)
+            self.profiler.every = int(self.cfg.get('profile_every', 0))
+            self.profiler.top = int(self.cfg.get('profile_top', 15))
+            with self.profiler.profile(cycle) as profile, self.tracer.span('cycle', cycle=cycle):
+                # every database write of the cycle is applied in one transaction
+                # at the end of it, or not at all if the cycle fails
+                with self.posts.unit_of_work(int(self.cfg.get('write_buffer_size', 500))) as uow:
+                    finished = self.run_cycle(stats)
+                    with stats.phase('db'), self.tracer.span('db.flush', writes=len(uow)):
+                        uow.flush()
+                with stats.phase('db'), self.tracer.span('db.seen_ids'):
+                    self.seen_ids.save()
+                    self.checkpoint.flushed(self._resume_from, finished)
+            if profile is not None:
+                self.logger.info(profile.summary())
+
+            self._stats = None
+            self.logger.info("Program finished successfully")
+            self.logger.info(f"Total posts deleted: {stats.counts['deleted'] + stats.counts['expired']}")
+            calls = ', '.join(f"{phase}={n}" for phase, n in stats.calls.items())
+            self.logger.info(f"API calls: {stats.counts['api_calls']} ({calls or 'none'})")
+            summary = stats.summary()
+            self.logger.record('cycle', **summary)
+            self.metrics.observe_cycle(summary)
+            self.metrics.tracked.set(len(self.posts.index))
+            remaining = self.reddit.auth.limits.get('remaining')
+            if remaining is not None:
+                self.metrics.ratelimit_remaining.set(float(remaining))
+            if self.on_cycle is not None:
+                self.on_cycle(stats)
+            if self.stopping:
+                self.logger.info("Stopped")
+                break
+
+            # wait before the next cycle, using the start of the sleep window
+            # for database upkeep every ``maintenance_cycles`` cycles
+            sleep = self.next_sleep(stats)
+            self.metrics.sleep.set(sleep)
+            self.logger.info(f"Sleeping for {sleep / 60:.1f} minutes...")
+            started = self.clock.monotonic()
+            maintenance_cycles = int(self.cfg.get('maintenance_cycles', 12))
+            if maintenance_cycles and cycle % maintenance_cycles == 0:
+                self.run_maintenance()
+            self.pause(max(0.0, sleep - (self.clock.monotonic() - started)))
+
+        # end of while
+        return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    argv = sys.argv if argv is None else argv
+    config_dir = CONFIG_DIR
+    # command line operations come first and only need the database file
+    if len(argv) > 1:
+        config_dir.mkdir(parents=True, exist_ok=True)
+        posts = Posts('deleted_posts', config_dir)
+        utils.parse_cmd_line_args(argv, Logger(1), config_dir / 'config.py', posts)
+        return 0
+
+    prepare_config_dir(config_dir)
+    try:
+        engine = Engine(config_dir)
+    except ValueError as e:
+        print(f"Invalid configuration in {str(config_dir)!r}: {e}")
+        return 1
+    # ``docker stop`` sends SIGTERM: finish the post being checked, write
+    # what the cycle did and exit
+    signal.signal(signal.SIGTERM, engine.stop)
+    return engine.run()
 
 
 if __name__ == '__main__':
     sys.exit(
         main()
-    )
\ No newline at end of file
+    )
@@ -0,0 +1,4 @@
+from .metrics import *  # noqa
+from .server import *  # noqa
+from .requestor import *  # noqa
+from .bot import *  # noqa
@@ -0,0 +1,77 @@
+from __future__ import annotations
+from .metrics import Registry
+from typing import (
+    Optional,
+    Dict,
+    Any,
+)
+
+
+__all__ = (
+    'BotMetrics',
+)
+
+
+class BotMetrics:
+    """The bot's metrics, fed from the cycle summaries of `CycleStats`, the
+    instrumented Reddit requestor and `Model.on_query`
+    """
+    PREFIX = 'deletedposts'
+    POST_EVENTS = ('new', 'edited', 'deleted', 'expired', 'deferred')
+
+    def __init__(self, registry: Optional[Registry] = None) -> None:
+        self.registry = Registry() if registry is None else registry
+        p = self.PREFIX
+        r = self.registry
+        self.cycles = r.counter(f"{p}_cycles_total", "Cycles completed")
+        self.cycle_duration = r.histogram(f"{p}_cycle_duration_seconds", "Duration of a cycle")
+        self.phase_duration = r.histogram(
+            f"{p}_phase_duration_seconds", "Duration of a phase of a cycle", ('phase',)
+        )
+        self.sleep = r.gauge(f"{p}_sleep_seconds", "Configured sleep between cycles")
+        self.posts = r.counter(f"{p}_posts_total", "Posts by what happened to them", ('event',))
+        self.modmail = r.counter(f"{p}_modmail_sent_total", "Modmails sent about deleted posts")
+        self.tracked = r.gauge(f"{p}_tracked_posts", "Posts currently tracked")
+        self.requests = r.counter(
+            f"{p}_reddit_requests_total", "Reddit API requests", ('method', 'endpoint', 'status')
+        )
+        self.request_duration = r.histogram(
+            f"{p}_reddit_request_duration_seconds", "Duration of Reddit API requests", ('endpoint',)
+        )
+        self.phase_calls = r.counter(
+            f"{p}_reddit_phase_calls_total", "Reddit API requests by cycle phase", ('phase',)
+        )
+        self.rate_limited = r.counter(f"{p}_reddit_rate_limited_total", "Requests answered with 429")
+        self.ratelimit_remaining = r.gauge(
+            f"{p}_reddit_ratelimit_remaining", "Requests left in the current rate limit window"
+        )
+        self.db_duration = r.histogram(
+            f"{p}_db_operation_duration_seconds", "Duration of database operations", ('operation',)
+        )
+
+    def __str__(self) -> str:
+        return f"<{self.__class__.__name__}({self.registry})>"
+
+    def __repr__(self) -> str:
+        return str(self)
+
+    def observe_cycle(self, summary: Dict[str, Any]) -> None:
+        """Record a `CycleStats.summary()`"""
+        self.cycles.inc()
+        self.cycle_duration.observe(summary['duration'])
+        for phase, seconds in summary['phases'].items():
+            self.phase_duration.observe(seconds, phase=phase)
+        for event in self.POST_EVENTS:
+            self.posts.inc(summary.get(event, 0), event=event)
+        self.modmail.inc(summary.get('modmail', 0))
+        for phase, calls in summary.get('calls', {}).items():
+            self.phase_calls.inc(calls, phase=phase)
+
+    def observe_request(self, method: str, endpoint: str, status: int, seconds: float) -> None:
+        self.requests.inc(method=method, endpoint=endpoint, status=status)
+        self.request_duration.observe(seconds, endpoint=endpoint)
+        if status == 429:
+            self.rate_limited.inc()
+
+    def observe_query(self, operation: str, seconds: float) -> None:
+        self.db_duration.observe(seconds, operation=operation)
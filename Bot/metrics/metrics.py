@@ -0,0 +1,183 @@
+from __future__ import annotations
+import math
+import bisect
+import threading
+from typing import (
+    Iterable,
+    Tuple,
+    List,
+    Dict,
+    Any,
+)
+
+
+__all__ = (
+    'Counter',
+    'Gauge',
+    'Histogram',
+    'Registry',
+)
+
+
+# seconds, from a fast sqlite query to a slow cycle
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+class Metric:
+    """A named family of values, one per combination of label values.
+    Label values are given as keyword arguments of the update methods
+    """
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def __str__(self) -> str:
+        return f"<{self.__class__.__name__}({self.name!r}, labels={self.labels})>"
+
+    def __repr__(self) -> str:
+        return str(self)
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        if labels.keys() != set(self.labels):
+            raise ValueError(f"{self.name} takes the labels {self.labels}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def _label_text(self, key: Tuple[str, ...], **extra: Any) -> str:
+        pairs = [*zip(self.labels, key), *extra.items()]
+        if not pairs:
+            return ''
+        return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            return [
+                f"{self.name}{self._label_text(key)} {_format_value(value)}"
+                for key, value in self._values.items()
+            ]
+
+    def value(self, **labels: Any) -> Any:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+            *self._samples(),
+        ]
+        return '\n'.join(lines) + '\n'
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        if amount < 0:
+            raise ValueError("Counters can only go up")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def set(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Histogram(Metric):
+    """Counts observations in cumulative buckets by their upper bound, and
+    keeps their sum and count
+    """
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = (),
+                 buckets: Iterable[float] = DEFAULT_BUCKETS) -> None:
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                # per bucket counts (the last one is +Inf), sum
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][bisect.bisect_left(self.buckets, value)] += 1
+            entry[1] += value
+
+    def value(self, **labels: Any) -> Tuple[int, float]:
+        """The number and sum of the observations"""
+        with self._lock:
+            entry = self._values.get(self._key(labels))
+            return (0, 0.0) if entry is None else (sum(entry[0]), entry[1])
+
+    def _samples(self) -> List[str]:
+        lines = []
+        with self._lock:
+            for key, (counts, total) in self._values.items():
+                cumulative = 0
+                for bound, count in zip((*self.buckets, math.inf), counts):
+                    cumulative += count
+                    labels = self._label_text(key, le=_format_value(bound))
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                lines.append(f"{self.name}_sum{self._label_text(key)} {_format_value(total)}")
+                lines.append(f"{self.name}_count{self._label_text(key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    """The metrics exposed together, rendered in the Prometheus text format"""
+    def __init__(self) -> None:
+        self._metrics: Dict[str, Metric] = {}
+
+    def __str__(self) -> str:
+        return f"<{self.__class__.__name__}({list(self._metrics)})>"
+
+    def __repr__(self) -> str:
+        return str(self)
+
+    def __contains__(self, name: Any) -> bool:
+        return name in self._metrics
+
+    def _add(self, metric: Metric) -> Any:
+        if metric.name in self._metrics:
+            raise ValueError(f"A metric named {metric.name!r} already exists")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labels: Iterable[str] = ()) -> Counter:
+        return self._add(Counter(name, documentation, labels))  # type: ignore
+
+    def gauge(self, name: str, documentation: str, labels: Iterable[str] = ()) -> Gauge:
+        return self._add(Gauge(name, documentation, labels))  # type: ignore
+
+    def histogram(self, name: str, documentation: str, labels: Iterable[str] = (),
+                  buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, documentation, labels, buckets))  # type: ignore
+
+    def render(self) -> str:
+        return ''.join(metric.render() for metric in self._metrics.values())
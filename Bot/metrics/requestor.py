@@ -0,0 +1,67 @@
+from __future__ import annotations
+import time
+from urllib.parse import urlsplit
+from typing import (
+    Callable,
+    Type,
+    Any,
+)
+
+
+__all__ = (
+    'endpoint',
+    'instrumented_requestor',
+)
+
+
+# path segments followed by a name or id, which would make every post,
+# user and subreddit a label of its own
+_PLACEHOLDERS = {
+    'r': '{subreddit}',
+    'u': '{user}',
+    'user': '{user}',
+    'comments': '{id}',
+    'by_id': '{id}',
+}
+
+
+def endpoint(url: str) -> str:
+    """The API endpoint of `url`, with names and ids replaced by placeholders.
+    Example:
+    ```
+        >>> endpoint('https://oauth.reddit.com/r/MinecraftHelp/new?limit=100')
+        '/r/{subreddit}/new'
+    ```
+    """
+    segments = [s for s in urlsplit(url).path.split('/') if s]
+    for i in range(len(segments) - 1):
+        placeholder = _PLACEHOLDERS.get(segments[i])
+        if placeholder is not None:
+            segments[i + 1] = placeholder
+    if segments and segments[-1].endswith('.json'):
+        segments[-1] = segments[-1][:-len('.json')]
+    return '/' + '/'.join(segments)
+
+
+def instrumented_requestor(on_request: Callable[[str, str, int, float], None]) -> Type[Any]:
+    """A `prawcore.Requestor` subclass, to pass to `praw.Reddit` as
+    `requestor_class`, that reports every HTTP request to `on_request` with
+    its method, `endpoint()`, status code (0 if it failed) and duration in
+    seconds. prawcore is only imported when this is called
+    """
+    from prawcore import Requestor  # type: ignore
+
+    class InstrumentedRequestor(Requestor):  # type: ignore
+        def request(self, *args: Any, **kwargs: Any) -> Any:
+            method = args[0] if args else kwargs.get('method', '')
+            url = args[1] if len(args) > 1 else kwargs.get('url', '')
+            status = 0
+            started = time.perf_counter()
+            try:
+                response = super().request(*args, **kwargs)
+                status = response.status_code
+                return response
+            finally:
+                on_request(str(method).upper(), endpoint(url), status, time.perf_counter() - started)
+
+    return InstrumentedRequestor
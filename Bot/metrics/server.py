@@ -0,0 +1,84 @@
+from __future__ import annotations
+import threading
+from http.server import (
+    BaseHTTPRequestHandler,
+    ThreadingHTTPServer,
+)
+from .metrics import Registry
+from typing import (
+    Optional,
+    Tuple,
+    Type,
+    Any,
+)
+
+
+__all__ = (
+    'MetricsServer',
+)
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class MetricsServer:
+    """Serves `registry` at `/metrics` over HTTP from a daemon thread. Port
+    0 picks a free one, see `address` once started
+    """
+    def __init__(self, registry: Registry, port: int, host: str = '127.0.0.1') -> None:
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def __str__(self) -> str:
+        return f"<{self.__class__.__name__}({self.host}:{self.port})>"
+
+    def __repr__(self) -> str:
+        return str(self)
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        if self._server is None:
+            return (self.host, self.port)
+        return self._server.server_address[:2]  # type: ignore
+
+    def _handler(self) -> Type[BaseHTTPRequestHandler]:
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = registry.render().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args: Any) -> None:
+                # Scrapes would otherwise flood stderr
+                pass
+
+        return Handler
+
+    def start(self) -> None:
+        if self._server is not None:
+            return
+        self._server = ThreadingHTTPServer((self.host, self.port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name='metrics-server', daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._server = None
+        self._thread = None
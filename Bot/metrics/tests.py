@@ -0,0 +1,116 @@
+import unittest
+import urllib.error
+import urllib.request
+from .metrics import Registry
+from .server import MetricsServer
+from .bot import BotMetrics
+from .requestor import endpoint
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self) -> None:
+        self.registry = Registry()
+        return super().setUp()
+
+    def test_counter_and_gauge(self) -> None:
+        requests = self.registry.counter('requests_total', "Requests", ('method',))
+        requests.inc(method='GET')
+        requests.inc(2, method='GET')
+        requests.inc(method='POST')
+        tracked = self.registry.gauge('tracked', "Tracked posts")
+        tracked.set(12)
+        tracked.inc(-2)
+
+        self.assertEqual(requests.value(method='GET'), 3)
+        self.assertEqual(tracked.value(), 10)
+        self.assertEqual(self.registry.render(), (
+            '# HELP requests_total Requests\n'
+            '# TYPE requests_total counter\n'
+            'requests_total{method="GET"} 3\n'
+            'requests_total{method="POST"} 1\n'
+            '# HELP tracked Tracked posts\n'
+            '# TYPE tracked gauge\n'
+            'tracked 10\n'
+        ))
+
+    def test_histogram(self) -> None:
+        duration = self.registry.histogram('duration_seconds', "Duration", ('phase',), buckets=(0.1, 1))
+        for value in (0.05, 0.1, 0.5, 3):
+            duration.observe(value, phase='db')
+        self.assertEqual(duration.value(phase='db'), (4, 3.65))
+        lines = self.registry.render().splitlines()
+        self.assertEqual(lines[2:], [
+            'duration_seconds_bucket{phase="db",le="0.1"} 2',
+            'duration_seconds_bucket{phase="db",le="1"} 3',
+            'duration_seconds_bucket{phase="db",le="+Inf"} 4',
+            'duration_seconds_sum{phase="db"} 3.65',
+            'duration_seconds_count{phase="db"} 4',
+        ])
+
+    def test_invalid_use(self) -> None:
+        counter = self.registry.counter('calls_total', "Calls", ('endpoint',))
+        with self.assertRaises(ValueError):
+            counter.inc()
+        with self.assertRaises(ValueError):
+            counter.inc(-1, endpoint='/api/info')
+        with self.assertRaises(ValueError):
+            self.registry.gauge('calls_total', "Duplicate")
+
+    def test_label_escaping(self) -> None:
+        counter = self.registry.counter('calls_total', "Calls", ('endpoint',))
+        counter.inc(endpoint='a"b\\c')
+        self.assertIn('calls_total{endpoint="a\\"b\\\\c"} 1', self.registry.render())
+
+
+class TestBotMetrics(unittest.TestCase):
+    def test_observe(self) -> None:
+        metrics = BotMetrics()
+        metrics.observe_cycle({
+            'cycle': 1, 'duration': 2.5, 'phases': {'listing': 1.0, 'db': 0.1},
+            'new': 3, 'edited': 1, 'deleted': 0, 'expired': 2, 'modmail': 1,
+            'calls': {'listing': 2, 'revalidation': 5},
+        })
+        metrics.observe_request('GET', '/r/{subreddit}/new', 200, 0.2)
+        metrics.observe_request('GET', '/api/info', 429, 0.1)
+        metrics.observe_query('select', 0.001)
+
+        self.assertEqual(metrics.cycles.value(), 1)
+        self.assertEqual(metrics.posts.value(event='new'), 3)
+        self.assertEqual(metrics.modmail.value(), 1)
+        self.assertEqual(metrics.phase_calls.value(phase='revalidation'), 5)
+        self.assertEqual(metrics.phase_duration.value(phase='listing'), (1, 1.0))
+        self.assertEqual(metrics.rate_limited.value(), 1)
+        self.assertEqual(metrics.requests.value(method='GET', endpoint='/api/info', status=429), 1)
+        self.assertEqual(metrics.db_duration.value(operation='select')[0], 1)
+
+
+class TestMetricsServer(unittest.TestCase):
+    def test_serves_metrics(self) -> None:
+        registry = Registry()
+        registry.counter('cycles_total', "Cycles").inc()
+        server = MetricsServer(registry, 0)
+        server.start()
+        try:
+            host, port = server.address
+            with urllib.request.urlopen(f"http://{host}:{port}/metrics", timeout=5) as response:
+                self.assertEqual(response.status, 200)
+                self.assertIn('text/plain', response.headers['Content-Type'])
+                self.assertIn('cycles_total 1', response.read().decode())
+            with self.assertRaises(urllib.error.HTTPError):
+                urllib.request.urlopen(f"http://{host}:{port}/other", timeout=5)
+        finally:
+            server.stop()
+
+
+class TestEndpoint(unittest.TestCase):
+    def test_endpoint(self) -> None:
+        cases = {
+            'https://oauth.reddit.com/r/MinecraftHelp/new?limit=100': '/r/{subreddit}/new',
+            'https://oauth.reddit.com/comments/18xk2ab/': '/comments/{id}',
+            'https://oauth.reddit.com/api/info/': '/api/info',
+            'https://www.reddit.com/api/v1/access_token': '/api/v1/access_token',
+            'https://oauth.reddit.com/user/someone/about.json': '/user/{user}/about',
+            'https://oauth.reddit.com/': '/',
+        }
+        for url, expected in cases.items():
+            self.assertEqual(endpoint(url), expected)
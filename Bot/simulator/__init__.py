@@ -0,0 +1,4 @@
+from .clock import *  # noqa
+from .load import *  # noqa
+from .reddit import *  # noqa
+from .simulator import *  # noqa
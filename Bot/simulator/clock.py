@@ -0,0 +1,29 @@
+__all__ = (
+    'SimClock',
+)
+
+
+class SimClock:
+    """Virtual time for the `sleep`, `monotonic` and `time` functions of the
+    `time` module: `sleep()` returns at once and moves the clock forward, so
+    hours of the bot's life run in seconds
+    """
+    def __init__(self, start: float = 1_700_000_000.0) -> None:
+        self.now = start
+
+    def __str__(self) -> str:
+        return f"<{self.__class__.__name__}({self.now})>"
+
+    def __repr__(self) -> str:
+        return str(self)
+
+    def time(self) -> float:
+        return self.now
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        if seconds < 0:
+            raise ValueError("sleep length must be non-negative")
+        self.now += seconds
@@ -0,0 +1,238 @@
+from __future__ import annotations
+import heapq
+import random
+from idset import encode_id
+from typing import (
+    Optional,
+    Tuple,
+    List,
+    Dict,
+    Set,
+)
+
+
+__all__ = (
+    'LoadProfile',
+    'FakeRedditor',
+    'FakeSubmission',
+    'Subreddit',
+)
+
+
+_WORDS = (
+    'minecraft server world crash java bedrock mod forge fabric launcher '
+    'chunk lag memory texture shader creeper villager redstone nether end '
+    'backup save corrupted login account realm update version error help'
+).split()
+
+
+class LoadProfile:
+    """How busy the simulated subreddit is. Rates are fractions of the posts
+    submitted; a post's deletion, edits and flair change happen on average
+    `lifetime_minutes` after it was submitted
+
+    :param posts_per_minute: Average arrival rate of new posts, defaults to 50
+    :type posts_per_minute: float, optional
+    :param deletion_rate: Posts later deleted or removed, defaults to 0.05
+    :type deletion_rate: float, optional
+    :param removal_mix: Relative weights of the `removed_by_category` values of\
+        those, defaults to mostly `author`
+    :type removal_mix: Optional[Dict[str, float]], optional
+    :param purge_rate: Posts whose author then deletes their account, which\
+        takes every post of theirs with it, defaults to 0.005
+    :type purge_rate: float, optional
+    :param edit_rate: Posts edited at least once, defaults to 0.1
+    :type edit_rate: float, optional
+    :param edit_storm_minutes: Every that many minutes `edit_storm_size`\
+        random live posts are edited at once, 0 for no storms, defaults to 0
+    :type edit_storm_minutes: float, optional
+    :param edit_storm_size: Posts edited by a storm, defaults to 50
+    :type edit_storm_size: int, optional
+    :param flair_rate: Posts later flaired `Solved` or `Abandoned`, defaults to 0.05
+    :type flair_rate: float, optional
+    :param lifetime_minutes: Mean delay of the events above, defaults to 30
+    :type lifetime_minutes: float, optional
+    :param authors: Number of accounts posting, defaults to 2000
+    :type authors: int, optional
+    """
+    def __init__(self, posts_per_minute: float = 50, deletion_rate: float = 0.05,
+                 removal_mix: Optional[Dict[str, float]] = None, purge_rate: float = 0.005,
+                 edit_rate: float = 0.1, edit_storm_minutes: float = 0, edit_storm_size: int = 50,
+                 flair_rate: float = 0.05, lifetime_minutes: float = 30, authors: int = 2000) -> None:
+        self.posts_per_minute = posts_per_minute
+        self.deletion_rate = deletion_rate
+        self.removal_mix = removal_mix or {'author': 0.6, 'deleted': 0.2, 'moderator': 0.2}
+        self.purge_rate = purge_rate
+        self.edit_rate = edit_rate
+        self.edit_storm_minutes = edit_storm_minutes
+        self.edit_storm_size = edit_storm_size
+        self.flair_rate = flair_rate
+        self.lifetime_minutes = lifetime_minutes
+        self.authors = authors
+
+    def __str__(self) -> str:
+        return f"<{self.__class__.__name__}({vars(self)})>"
+
+    def __repr__(self) -> str:
+        return str(self)
+
+
+class FakeRedditor:
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def __str__(self) -> str:
+        return self.name
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__}({self.name!r})>"
+
+
+class FakeSubmission:
+    """The attributes of a `praw.reddit.Submission` the bot reads"""
+    def __init__(self, post_id: str, author: FakeRedditor, author_fullname: str,
+                 title: str, selftext: str, created_utc: float) -> None:
+        self.id = post_id
+        self.author: Optional[FakeRedditor] = author
+        self.author_fullname = author_fullname
+        self.title = title
+        self.selftext = selftext
+        self.created_utc = created_utc
+        self.link_flair_text: Optional[str] = None
+        self.removed_by_category: Optional[str] = None
+        self.edited: float = 0
+
+    def __str__(self) -> str:
+        return f"<{self.__class__.__name__}({self.id!r})>"
+
+    def __repr__(self) -> str:
+        return str(self)
+
+
+class Subreddit:
+    """The simulated subreddit. Posts arrive as a Poisson process and the
+    events of their life are queued at random delays; `advance()` plays
+    everything due up to a point in time. When every post left or was
+    flaired is recorded, to measure how long the bot took to notice
+    """
+    def __init__(self, profile: LoadProfile, start: float, seed: int = 0) -> None:
+        self.profile = profile
+        self.now = start
+        self._rng = random.Random(seed)
+        self.posts: Dict[str, FakeSubmission] = {}
+        # post ids, oldest first
+        self.order: List[str] = []
+        # username -> account fullname
+        self.accounts = {f"user{i}": f"t2_{encode_id(36 ** 4 + i)}" for i in range(profile.authors)}
+        self._names = list(self.accounts)
+        self._posts_by: Dict[str, List[str]] = {}
+        self.purged: Set[str] = set()
+        # post id -> (when it went, removed_by_category or None for a purge)
+        self.gone: Dict[str, Tuple[float, Optional[str]]] = {}
+        self.flaired: Dict[str, float] = {}
+        self.edits = 0
+        self._events: List[Tuple[float, int, str, str]] = []
+        self._seq = 0
+        self._next_post = start + self._arrival()
+        if profile.edit_storm_minutes:
+            self._schedule(start + profile.edit_storm_minutes * 60, 'storm', '')
+
+    def __str__(self) -> str:
+        return f"<{self.__class__.__name__}(posts={len(self.posts)}, gone={len(self.gone)})>"
+
+    def __repr__(self) -> str:
+        return str(self)
+
+    def _arrival(self) -> float:
+        rate = self.profile.posts_per_minute / 60
+        return self._rng.expovariate(rate) if rate > 0 else float('inf')
+
+    def _delay(self) -> float:
+        return self._rng.expovariate(1 / (self.profile.lifetime_minutes * 60))
+
+    def _schedule(self, when: float, kind: str, key: str) -> None:
+        self._seq += 1
+        heapq.heappush(self._events, (when, self._seq, kind, key))
+
+    def _text(self, low: int, high: int) -> str:
+        return ' '.join(self._rng.choices(_WORDS, k=self._rng.randint(low, high)))
+
+    def advance(self, until: float) -> None:
+        """Play every arrival and event due by `until`, in order"""
+        while True:
+            event_at = self._events[0][0] if self._events else float('inf')
+            when = min(self._next_post, event_at)
+            if when > until:
+                break
+            self.now = when
+            if when == self._next_post:
+                self._submit()
+                self._next_post = when + self._arrival()
+            else:
+                _, _, kind, key = heapq.heappop(self._events)
+                getattr(self, f"_on_{kind}")(key)
+        self.now = until
+
+    def _submit(self) -> None:
+        profile, rng = self.profile, self._rng
+        name = rng.choice(self._names)
+        post = FakeSubmission(
+            encode_id(36 ** 6 + len(self.posts)), FakeRedditor(name), self.accounts[name],
+            self._text(3, 12), self._text(20, 400), self.now,
+        )
+        self.posts[post.id] = post
+        self.order.append(post.id)
+        self._posts_by.setdefault(name, []).append(post.id)
+        if rng.random() < profile.deletion_rate:
+            self._schedule(self.now + self._delay(), 'delete', post.id)
+        if rng.random() < profile.purge_rate:
+            self._schedule(self.now + self._delay(), 'purge', name)
+        if rng.random() < profile.edit_rate:
+            self._schedule(self.now + self._delay(), 'edit', post.id)
+        if rng.random() < profile.flair_rate:
+            self._schedule(self.now + self._delay(), 'flair', post.id)
+
+    def _leave(self, post: FakeSubmission, category: Optional[str]) -> None:
+        if post.id not in self.gone:
+            self.gone[post.id] = (self.now, category)
+
+    def _on_delete(self, post_id: str) -> None:
+        post = self.posts[post_id]
+        mix = self.profile.removal_mix
+        category = self._rng.choices(list(mix), weights=list(mix.values()))[0]
+        if post.removed_by_category is None:
+            post.removed_by_category = category
+            if category == 'author':
+                post.author = None
+                post.selftext = '[deleted]'
+            self._leave(post, category)
+
+    def _on_purge(self, name: str) -> None:
+        if name in self.purged:
+            return
+        self.purged.add(name)
+        # a new account takes its place among the posters
+        newcomer = f"user{len(self.accounts)}"
+        self.accounts[newcomer] = f"t2_{encode_id(36 ** 4 + len(self.accounts))}"
+        self._names[self._names.index(name)] = newcomer
+        for post_id in self._posts_by.get(name, ()):
+            post = self.posts[post_id]
+            post.author = None
+            self._leave(post, None)
+
+    def _on_edit(self, post_id: str) -> None:
+        post = self.posts[post_id]
+        if post.removed_by_category is None and post.author is not None:
+            post.selftext += f"\n\nEdit: {self._text(5, 30)}"
+            post.edited = self.now
+            self.edits += 1
+
+    def _on_flair(self, post_id: str) -> None:
+        self.posts[post_id].link_flair_text = self._rng.choice(('Solved', 'Abandoned'))
+        self.flaired.setdefault(post_id, self.now)
+
+    def _on_storm(self, _: str) -> None:
+        live = [post_id for post_id, post in self.posts.items() if post.removed_by_category is None]
+        for post_id in self._rng.sample(live, min(len(live), self.profile.edit_storm_size)):
+            self._on_edit(post_id)
+        self._schedule(self.now + self.profile.edit_storm_minutes * 60, 'storm', '')
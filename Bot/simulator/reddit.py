@@ -0,0 +1,161 @@
+from __future__ import annotations
+import copy
+from .clock import SimClock
+from .load import (
+    FakeSubmission,
+    Subreddit,
+)
+from typing import (
+    Optional,
+    Callable,
+    Iterator,
+    Iterable,
+    Tuple,
+    List,
+    Dict,
+    Any,
+)
+
+
+__all__ = (
+    'FakeReddit',
+)
+
+
+# a page of a listing, an info lookup
+PAGE_SIZE = 100
+RequestCallback = Callable[[str, str, int, float], None]
+
+
+class _Auth:
+    def __init__(self) -> None:
+        self.limits: Dict[str, Optional[float]] = {'remaining': 600.0, 'used': 0}
+
+
+class _Response:
+    def __init__(self, status_code: int) -> None:
+        self.status_code = status_code
+
+
+class NotFound(Exception):
+    """Raised like `prawcore.NotFound`, with the response that caused it"""
+    def __init__(self) -> None:
+        super().__init__("received 404 HTTP response")
+        self.response = _Response(404)
+
+
+class _Profile:
+    """A lazy account like praw's `Redditor`, fetched when it is read"""
+    def __init__(self, reddit: FakeReddit, name: str) -> None:
+        self._reddit = reddit
+        self.name = name
+
+    @property
+    def is_suspended(self) -> bool:
+        model = self._reddit.subreddit_model
+        gone = self.name in model.purged or self.name not in model.accounts
+        self._reddit._call('GET', '/user/{username}/about', 404 if gone else 200)
+        if gone:
+            raise NotFound
+        return False
+
+
+class _Listing:
+    def __init__(self, reddit: FakeReddit, name: str) -> None:
+        self._reddit = reddit
+        self.display_name = name
+
+    def new(self, limit: Optional[int] = 100) -> Iterator[FakeSubmission]:
+        """Newest first, one request per page like praw's listing generator"""
+        reddit = self._reddit
+        model = reddit.subreddit_model
+        listed = 0
+        # later pages continue after the last post listed, as with `after`
+        end: Optional[int] = None
+        while limit is None or listed < limit:
+            if listed % PAGE_SIZE == 0:
+                reddit._call('GET', '/r/{subreddit}/new')
+                if end is None:
+                    end = len(model.order)
+                    reddit.listings.append(reddit.clock.time())
+                # a page holds what the subreddit looks like once it is fetched
+                page = [copy.copy(model.posts[post_id]) for post_id in
+                        model.order[max(0, end - listed - PAGE_SIZE):end - listed][::-1]]
+            if listed % PAGE_SIZE >= len(page):
+                return
+            post = page[listed % PAGE_SIZE]
+            reddit.listed.setdefault(post.id, reddit.clock.time())
+            listed += 1
+            yield post
+
+
+class FakeReddit:
+    """Stands in for `praw.Reddit` with the calls the bot makes, answered from
+    a simulated subreddit. Every request takes `latency` seconds of the clock,
+    plays the subreddit up to the time it returns and is reported to
+    `on_request` the way the instrumented requestor reports real ones.
+    Submissions are copies taken at request time, like fetched ones.
+    When each post was first listed, every listing and every modmail sent
+    are recorded
+    """
+    def __init__(self, subreddit: Subreddit, clock: SimClock, latency: float = 0.2,
+                 on_request: Optional[RequestCallback] = None) -> None:
+        self.subreddit_model = subreddit
+        self.clock = clock
+        self.latency = latency
+        self.on_request = on_request
+        self.auth = _Auth()
+        self.requests = 0
+        self.listed: Dict[str, float] = {}
+        # when each listing started
+        self.listings: List[float] = []
+        # (sent at, subject, text)
+        self.modmails: List[Tuple[float, str, str]] = []
+
+    def __str__(self) -> str:
+        return f"<{self.__class__.__name__}({self.subreddit_model}, requests={self.requests})>"
+
+    def __repr__(self) -> str:
+        return str(self)
+
+    def _call(self, method: str, endpoint: str, status: int = 200) -> None:
+        self.clock.sleep(self.latency)
+        self.subreddit_model.advance(self.clock.time())
+        self.requests += 1
+        self.auth.limits['used'] = self.requests
+        if self.on_request is not None:
+            self.on_request(method, endpoint, status, self.latency)
+
+    def subreddit(self, name: str) -> _Listing:
+        return _Listing(self, name)
+
+    def info(self, fullnames: Iterable[str]) -> Iterator[FakeSubmission]:
+        fullnames = list(fullnames)
+        posts = self.subreddit_model.posts
+        for i in range(0, len(fullnames), PAGE_SIZE):
+            self._call('GET', '/api/info')
+            found = [posts.get(fullname.split('_', 1)[-1]) for fullname in fullnames[i:i + PAGE_SIZE]]
+            yield from [copy.copy(post) for post in found if post is not None]
+
+    def submission(self, id: str) -> FakeSubmission:
+        self._call('GET', '/comments/{id}')
+        return copy.copy(self.subreddit_model.posts[id])
+
+    def redditor(self, name: str) -> _Profile:
+        return _Profile(self, name)
+
+    def request(self, method: str, path: str, params: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        self._call(method, path)
+        model = self.subreddit_model
+        wanted = set((params or {}).get('ids', '').split(','))
+        return {
+            fullname: {'name': name}
+            for name, fullname in model.accounts.items()
+            if fullname in wanted and name not in model.purged
+        }
+
+    def post(self, path: str, data: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        self._call('POST', f"/{path.strip('/')}")
+        data = data or {}
+        self.modmails.append((self.clock.time(), data.get('subject', ''), data.get('text', '')))
+        return {}
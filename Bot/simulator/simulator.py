@@ -0,0 +1,321 @@
+from __future__ import annotations
+import os
+import re
+import json
+import argparse
+import tempfile
+import contextlib
+import tracemalloc
+from pathlib import Path
+from utils import CycleStats
+from .clock import SimClock
+from .reddit import FakeReddit
+from .load import (
+    LoadProfile,
+    Subreddit,
+)
+from typing import (
+    Optional,
+    Tuple,
+    List,
+    Dict,
+    Any,
+)
+
+
+__all__ = (
+    'Simulation',
+    'SimulationReport',
+    'main',
+)
+
+
+SEED = 1729
+POST_LINK = re.compile(r'/comments/(\w+)')
+OWN_DIR = os.path.dirname(__file__) + os.sep
+# what the bot is configured with unless `settings` say otherwise
+DEFAULT_SETTINGS: Dict[str, Any] = {
+    'client_id': 'simulated',
+    'client_secret': 'simulated',
+    'user_agent': 'simulated',
+    'username': 'simulated',
+    'password': 'simulated',
+    'sub_name': 'simulated',
+    'max_days': 180,
+    'max_posts': 180,
+    'sleep_minutes': 5,
+}
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest rank percentile, 0 for no values"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))]
+
+
+class SimulationReport:
+    """What a `Simulation` measured. Times are simulated seconds, except
+    the wall time the cycles took
+    """
+    def __init__(self, profile: LoadProfile, cycles: int) -> None:
+        self.profile = profile
+        self.cycles = cycles
+        self.exit_code = 0
+        self.error: Optional[str] = None
+        self.simulated_seconds = 0.0
+        self.posts = 0
+        self.gone = 0
+        self.edits = 0
+        self.tracked = 0
+        self.api_calls = 0
+        # from a post's submission to the listing the bot first saw it in
+        self.lags: List[float] = []
+        # posts submitted before the last listing that no listing returned
+        self.unlisted = 0
+        # from a tracked post's deletion or its author's purge to the modmail
+        self.latencies: List[float] = []
+        # not notified when the run ended
+        self.unnotified = 0
+        # modmails about posts that were still up when they were sent
+        self.false_alarms = 0
+        self.modmails = 0
+        # (cycle, bytes the bot holds after it) every `memory_every` cycles, and
+        # the most traced at any point, the simulated subreddit included
+        self.memory: List[Tuple[int, int]] = []
+        self.peak_memory = 0
+        self.durations: List[float] = []
+
+    def __str__(self) -> str:
+        return f"<{self.__class__.__name__}(cycles={self.cycles}, posts={self.posts})>"
+
+    def __repr__(self) -> str:
+        return str(self)
+
+    @property
+    def memory_growth(self) -> float:
+        """Bytes per cycle from the first cycle to the last"""
+        if len(self.memory) < 2:
+            return 0.0
+        (first_cycle, first), (last_cycle, last) = self.memory[0], self.memory[-1]
+        return (last - first) / (last_cycle - first_cycle)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'cycles': self.cycles,
+            'exit_code': self.exit_code,
+            'simulated_seconds': round(self.simulated_seconds, 1),
+            'posts': self.posts,
+            'gone': self.gone,
+            'edits': self.edits,
+            'tracked': self.tracked,
+            'api_calls': self.api_calls,
+            'modmails': self.modmails,
+            'lag': {f'p{q}': round(percentile(self.lags, q), 1) for q in (50, 95, 100)},
+            'unlisted': self.unlisted,
+            'notification_latency': {
+                f'p{q}': round(percentile(self.latencies, q), 1) for q in (50, 95, 100)
+            },
+            'unnotified': self.unnotified,
+            'false_alarms': self.false_alarms,
+            'memory': {
+                'samples': self.memory,
+                'growth_per_cycle': round(self.memory_growth),
+                'peak': self.peak_memory,
+            },
+            'cycle_wall_seconds': {f'p{q}': round(percentile(self.durations, q), 4) for q in (50, 100)},
+        }
+
+    def summary(self) -> str:
+        def minutes(values: List[float]) -> str:
+            p50, p95, top = (percentile(values, q) / 60 for q in (50, 95, 100))
+            return f"p50 {p50:.1f} min, p95 {p95:.1f} min, max {top:.1f} min"
+
+        (first_cycle, first), (last_cycle, last) = (self.memory[0], self.memory[-1]) if self.memory else ((0, 0),) * 2
+        lines = [
+            f"Simulated {self.cycles} cycles ({self.simulated_seconds / 3600:.1f} hours) at "
+            f"{self.profile.posts_per_minute:g} posts/minute: {self.posts:,} posts, "
+            f"{self.gone:,} deleted, removed or purged, {self.edits:,} edits",
+            f"Capture lag: {minutes(self.lags)}; {self.unlisted:,} posts never listed",
+            f"Notification latency: {minutes(self.latencies)}; {self.modmails:,} modmails, "
+            f"{self.unnotified:,} tracked posts gone without one by the end, "
+            f"{self.false_alarms:,} about posts still up",
+            f"Memory (traced): {first / 1024:,.0f} KiB after cycle {first_cycle}, "
+            f"{last / 1024:,.0f} KiB after cycle {last_cycle} "
+            f"({self.memory_growth / 1024:+,.1f} KiB/cycle), {self.peak_memory / 1024:,.0f} KiB peak "
+            f"with the simulated subreddit",
+            f"Cycles: p50 {percentile(self.durations, 50):.3f} s, max {percentile(self.durations, 100):.3f} s "
+            f"of wall time; {self.api_calls:,} API calls, {self.tracked:,} posts tracked at the end",
+        ]
+        if self.exit_code:
+            lines.append(f"The bot stopped with exit code {self.exit_code}:\n{self.error}")
+        return '\n'.join(lines)
+
+
+class Simulation:
+    """Runs the bot's engine for `cycles` cycles against a simulated
+    subreddit under `profile`, in simulated time. The engine is the real
+    one, with a fresh database in a temporary directory and the fake
+    Reddit client and clock swapped in. Measuring the bot's memory takes
+    a while, so it is only done every `memory_every` cycles. Example:
+    ```
+        >>> report = Simulation(LoadProfile(posts_per_minute=50), cycles=100).run()
+        >>> print(report.summary())
+    ```
+    """
+    def __init__(self, profile: LoadProfile, cycles: int = 100,
+                 settings: Optional[Dict[str, Any]] = None, seed: int = SEED,
+                 latency: float = 0.2, memory_every: int = 5, quiet: bool = True) -> None:
+        self.profile = profile
+        self.cycles = cycles
+        self.settings = {**DEFAULT_SETTINGS, **(settings or {})}
+        self.seed = seed
+        self.latency = latency
+        self.memory_every = memory_every
+        self.quiet = quiet
+
+    def __str__(self) -> str:
+        return f"<{self.__class__.__name__}(cycles={self.cycles}, profile={self.profile})>"
+
+    def __repr__(self) -> str:
+        return str(self)
+
+    def run(self) -> SimulationReport:
+        # the engine's module reads no configuration until an engine is made
+        from main import Engine
+
+        report = SimulationReport(self.profile, self.cycles)
+        with tempfile.TemporaryDirectory() as tmp:
+            config_dir = Path(tmp)
+            (config_dir / 'config.py').write_text(f"config = {self.settings!r}\n")
+            clock = SimClock()
+            started = clock.time()
+            subreddit = Subreddit(self.profile, started, self.seed)
+            reddit = FakeReddit(subreddit, clock, self.latency)
+            # FakeReddit implements the part of praw.Reddit the engine uses
+            engine = Engine(config_dir, reddit=reddit, clock=clock)  # type: ignore[arg-type]
+            reddit.on_request = engine.on_request
+
+            def on_cycle(stats: CycleStats) -> None:
+                report.durations.append(stats.summary()['duration'])
+                if stats.cycle == 1 or stats.cycle % self.memory_every == 0 or stats.cycle == self.cycles:
+                    # the bot's memory, without the simulated subreddit's
+                    report.memory.append((stats.cycle, sum(
+                        stat.size for stat in tracemalloc.take_snapshot().statistics('filename')
+                        if not stat.traceback[0].filename.startswith(OWN_DIR)
+                    )))
+
+            engine.on_cycle = on_cycle
+            tracemalloc.start()
+            try:
+                with open(os.devnull, 'w') as devnull, \
+                        contextlib.redirect_stdout(devnull if self.quiet else None):  # type: ignore
+                    report.exit_code = engine.run(self.cycles)
+                # this one counts the simulated subreddit too
+                report.peak_memory = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+                report.tracked = len(engine.posts.index)
+                engine.posts.close()
+
+        report.simulated_seconds = clock.time() - started
+        self._measure(report, subreddit, reddit)
+        return report
+
+    def _measure(self, report: SimulationReport, subreddit: Subreddit, reddit: FakeReddit) -> None:
+        report.posts = len(subreddit.posts)
+        report.gone = len(subreddit.gone)
+        report.edits = subreddit.edits
+        report.api_calls = reddit.requests
+        report.modmails = len(reddit.modmails)
+        if report.exit_code and reddit.modmails:
+            # the engine reports the error it stopped on by modmail
+            report.error = reddit.modmails[-1][2]
+
+        posts = subreddit.posts
+        report.lags = [listed_at - posts[post_id].created_utc for post_id, listed_at in reddit.listed.items()]
+        last_listing = reddit.listings[-1] if reddit.listings else 0.0
+        report.unlisted = sum(
+            1 for post in posts.values() if post.created_utc < last_listing and post.id not in reddit.listed
+        )
+
+        notified: Dict[str, float] = {}
+        for sent_at, _, text in reddit.modmails:
+            match = POST_LINK.search(text)
+            if match is not None:
+                notified.setdefault(match.group(1), sent_at)
+        report.false_alarms = sum(
+            1 for post_id, sent_at in notified.items()
+            if post_id not in subreddit.gone or subreddit.gone[post_id][0] > sent_at
+        )
+        for post_id, (gone_at, category) in subreddit.gone.items():
+            listed_at = reddit.listed.get(post_id)
+            flaired_at = subreddit.flaired.get(post_id, float('inf'))
+            # the bot ignores removals by moderators, never tracks posts gone or
+            # flaired before it saw them, and may not have looked since the end
+            if category == 'moderator' or listed_at is None or listed_at >= gone_at\
+                    or flaired_at < gone_at or gone_at >= last_listing:
+                continue
+            if post_id in notified:
+                report.latencies.append(notified[post_id] - gone_at)
+            else:
+                report.unnotified += 1
+
+
+def _mix(text: str) -> Dict[str, float]:
+    pairs = (pair.split('=', 1) for pair in text.split(',') if pair)
+    return {category: float(weight) for category, weight in pairs}
+
+
+def _setting(text: str) -> Tuple[str, Any]:
+    key, _, value = text.partition('=')
+    try:
+        return key, json.loads(value)
+    except ValueError:
+        return key, value
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    defaults = LoadProfile()
+    parser = argparse.ArgumentParser(description="Run the bot against a simulated subreddit")
+    parser.add_argument('--cycles', type=int, default=100)
+    parser.add_argument('--posts-per-minute', type=float, default=defaults.posts_per_minute)
+    parser.add_argument('--deletion-rate', type=float, default=defaults.deletion_rate,
+                        help="fraction of the posts later deleted or removed")
+    parser.add_argument('--removal-mix', type=_mix, default=defaults.removal_mix,
+                        help="weights of the removed_by_category values, e.g. author=6,deleted=2,moderator=2")
+    parser.add_argument('--purge-rate', type=float, default=defaults.purge_rate,
+                        help="fraction of the posts whose author then deletes their account")
+    parser.add_argument('--edit-rate', type=float, default=defaults.edit_rate)
+    parser.add_argument('--edit-storm-minutes', type=float, default=defaults.edit_storm_minutes)
+    parser.add_argument('--edit-storm-size', type=int, default=defaults.edit_storm_size)
+    parser.add_argument('--flair-rate', type=float, default=defaults.flair_rate,
+                        help="fraction of the posts later flaired Solved or Abandoned")
+    parser.add_argument('--lifetime-minutes', type=float, default=defaults.lifetime_minutes)
+    parser.add_argument('--authors', type=int, default=defaults.authors)
+    parser.add_argument('--latency', type=float, default=0.2, help="simulated seconds per API request")
+    parser.add_argument('--seed', type=int, default=SEED)
+    parser.add_argument('--memory-every', type=int, default=5, help="measure memory every that many cycles")
+    parser.add_argument('--set', type=_setting, action='append', default=[], metavar='KEY=VALUE',
+                        help="a bot setting, e.g. --set sleep_minutes=2")
+    parser.add_argument('--output', type=Path, help="write the report to this JSON file")
+    args = parser.parse_args(argv)
+
+    profile = LoadProfile(
+        posts_per_minute=args.posts_per_minute,
+        deletion_rate=args.deletion_rate,
+        removal_mix=args.removal_mix,
+        purge_rate=args.purge_rate,
+        edit_rate=args.edit_rate,
+        edit_storm_minutes=args.edit_storm_minutes,
+        edit_storm_size=args.edit_storm_size,
+        flair_rate=args.flair_rate,
+        lifetime_minutes=args.lifetime_minutes,
+        authors=args.authors,
+    )
+    report = Simulation(profile, args.cycles, dict(args.set), args.seed, args.latency, args.memory_every).run()
+    print(report.summary())
+    if args.output is not None:
+        args.output.write_text(json.dumps(report.as_dict(), indent=4))
+    return report.exit_code
@@ -0,0 +1,245 @@
+import copy
+import tempfile
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Tuple, List
+try:
+    import prawcore  # type: ignore
+    import prawcore.exceptions  # type: ignore
+except ImportError:
+    prawcore = None  # type: ignore
+from .clock import SimClock
+from .reddit import FakeReddit
+from .load import (
+    LoadProfile,
+    Subreddit,
+)
+from .simulator import (
+    DEFAULT_SETTINGS,
+    Simulation,
+    percentile,
+)
+
+
+class TestSubreddit(unittest.TestCase):
+    def test_arrivals(self) -> None:
+        subreddit = Subreddit(LoadProfile(posts_per_minute=60), 0, seed=1)
+        subreddit.advance(3600)
+        # a Poisson process of 3600 expected arrivals
+        self.assertTrue(3300 < len(subreddit.posts) < 3900, msg=len(subreddit.posts))
+        self.assertEqual(subreddit.order, list(subreddit.posts))
+        created = [post.created_utc for post in subreddit.posts.values()]
+        self.assertEqual(created, sorted(created))
+        self.assertTrue(all(0 < when <= 3600 for when in created))
+
+        again = Subreddit(LoadProfile(posts_per_minute=60), 0, seed=1)
+        again.advance(3600)
+        self.assertEqual(
+            [post.selftext for post in again.posts.values()],
+            [post.selftext for post in subreddit.posts.values()],
+        )
+
+    def test_events(self) -> None:
+        profile = LoadProfile(
+            posts_per_minute=30, deletion_rate=1, removal_mix={'author': 1}, purge_rate=0,
+            edit_rate=0, flair_rate=0, lifetime_minutes=1,
+        )
+        subreddit = Subreddit(profile, 0)
+        subreddit.advance(600)
+        post = next(iter(subreddit.posts.values()))
+        self.assertEqual(post.removed_by_category, 'author')
+        self.assertIsNone(post.author)
+        self.assertEqual(subreddit.gone[post.id][1], 'author')
+        self.assertGreater(subreddit.gone[post.id][0], post.created_utc)
+
+    def test_storm(self) -> None:
+        profile = LoadProfile(
+            posts_per_minute=30, deletion_rate=0, purge_rate=0, edit_rate=0, flair_rate=0,
+            edit_storm_minutes=5, edit_storm_size=10,
+        )
+        subreddit = Subreddit(profile, 0)
+        subreddit.advance(299)
+        self.assertEqual(subreddit.edits, 0)
+        subreddit.advance(301)
+        self.assertEqual(subreddit.edits, 10)
+        subreddit.advance(601)
+        self.assertEqual(subreddit.edits, 20)
+
+    def test_purge(self) -> None:
+        profile = LoadProfile(
+            posts_per_minute=30, deletion_rate=0, purge_rate=1, edit_rate=0, flair_rate=0, authors=5,
+        )
+        subreddit = Subreddit(profile, 0)
+        subreddit.advance(4 * 3600)
+        # purged accounts are replaced by new ones
+        self.assertGreater(len(subreddit.purged), 5)
+        self.assertEqual(len(subreddit.accounts), 5 + len(subreddit.purged))
+        self.assertTrue(all(post.author is None for post in subreddit.posts.values() if post.created_utc < 3600))
+        self.assertTrue(all(category is None for _, category in subreddit.gone.values()))
+
+
+class TestFakeReddit(unittest.TestCase):
+    def setUp(self) -> None:
+        self.clock = SimClock(0)
+        profile = LoadProfile(posts_per_minute=60, deletion_rate=0, purge_rate=0, edit_rate=0, flair_rate=0)
+        self.subreddit = Subreddit(profile, 0)
+        self.subreddit.advance(300)
+        self.clock.sleep(300)
+        self.requests: List[Tuple[Any, ...]] = []
+        self.reddit = FakeReddit(
+            self.subreddit, self.clock, latency=1,
+            on_request=lambda *request: self.requests.append(request),
+        )
+        return super().setUp()
+
+    def test_listing(self) -> None:
+        listed = [post.id for post in self.reddit.subreddit('simulated').new(limit=150)]
+        # pages continue from the first one, whatever was submitted since
+        posts = self.subreddit.posts
+        newest = [post_id for post_id in self.subreddit.order[::-1] if posts[post_id].created_utc <= 301]
+        self.assertEqual(listed, newest[:150])
+        self.assertEqual(len(self.requests), 2)
+        self.assertEqual(self.requests[0], ('GET', '/r/{subreddit}/new', 200, 1))
+        self.assertEqual(self.clock.time(), 302)
+        self.assertEqual(self.reddit.listings, [301])
+        self.assertEqual(self.reddit.listed[newest[0]], 301)
+
+    def test_lookups(self) -> None:
+        ids = self.subreddit.order[:150]
+        found = list(self.reddit.info(fullnames=[f"t3_{post_id}" for post_id in ids] + ['t3_missing']))
+        self.assertEqual([post.id for post in found], ids)
+        self.assertEqual(len(self.requests), 2)
+        submission = self.reddit.submission(id=ids[0])
+        submission.selftext = 'changed'
+        self.assertNotEqual(self.subreddit.posts[ids[0]].selftext, 'changed')
+
+        post = self.subreddit.posts[ids[0]]
+        assert post.author is not None
+        self.subreddit.purged.add(post.author.name)
+        accounts = self.reddit.request('GET', '/api/user_data_by_account_ids', {'ids': post.author_fullname})
+        self.assertEqual(accounts, {})
+
+        self.reddit.post('api/compose/', data={'subject': 'Hi', 'text': 'Post ID: /comments/abc'})
+        self.assertEqual(self.reddit.modmails, [(self.clock.time(), 'Hi', 'Post ID: /comments/abc')])
+        self.assertEqual(self.requests[-1][:2], ('POST', '/api/compose'))
+
+
+class TestEngine(unittest.TestCase):
+    def setUp(self) -> None:
+        from main import Engine
+        from bot import AuthorStatus
+        self.status = AuthorStatus
+        self.tmp = tempfile.TemporaryDirectory()
+        config_dir = Path(self.tmp.name)
+        (config_dir / 'config.py').write_text(f"config = {DEFAULT_SETTINGS!r}\n")
+        self.clock = SimClock(0)
+        profile = LoadProfile(posts_per_minute=60, deletion_rate=0, purge_rate=0, edit_rate=0,
+                              flair_rate=0, authors=1)
+        self.subreddit = Subreddit(profile, 0)
+        self.subreddit.advance(300)
+        self.requests: List[Tuple[Any, ...]] = []
+        self.reddit = FakeReddit(
+            self.subreddit, self.clock,
+            on_request=lambda *request: self.requests.append(request),
+        )
+        self.engine = Engine(config_dir, reddit=self.reddit, clock=self.clock)  # type: ignore[arg-type]
+        return super().setUp()
+
+    def tearDown(self) -> None:
+        self.engine.logger.close()
+        self.tmp.cleanup()
+        return super().tearDown()
+
+    def test_post_deleted_by_author(self) -> None:
+        first, second = (copy.copy(post) for post in list(self.subreddit.posts.values())[:2])
+        assert first.author is not None
+        name = first.author.name
+        first.author, first.removed_by_category = None, 'author'
+
+        self.assertTrue(self.engine.user_is_deleted(first, name))  # type: ignore[arg-type]
+        # the same author's other posts are not taken down with it
+        self.assertFalse(self.engine.user_is_deleted(second, name))  # type: ignore[arg-type]
+        self.assertIsNone(self.engine.authors.get(name))
+
+    def test_cached_active_author(self) -> None:
+        post = copy.copy(next(iter(self.subreddit.posts.values())))
+        assert post.author is not None
+        name = post.author.name
+        self.engine.authors.set(name, self.status.ACTIVE)
+        post.author = None
+        self.assertTrue(self.engine.user_is_deleted(post, name))  # type: ignore[arg-type]
+
+    def test_deleted_account(self) -> None:
+        post = copy.copy(next(iter(self.subreddit.posts.values())))
+        assert post.author is not None
+        self.subreddit.purged.add(post.author.name)
+        self.engine.authors.remember(post.author.name, post.author_fullname)
+        self.assertEqual(self.engine.authors.resolve(self.reddit, [post.author.name]), [])
+        self.assertEqual(self.engine.authors.get(post.author.name), self.status.DELETED)
+        self.assertTrue(self.engine.user_is_deleted(post, post.author.name))  # type: ignore[arg-type]
+
+
+    def rate_limit_info(self, times: int) -> None:
+        info = self.reddit.info
+
+        def limited(fullnames: Any) -> Any:
+            if len([r for r in self.requests if r[1] == '/api/info']) < times:
+                self.requests.append(('GET', '/api/info', 429, 0))
+                # only the parts of a requests.Response the exception reads
+                response = SimpleNamespace(status_code=429, headers={}, text='')
+                raise prawcore.exceptions.TooManyRequests(response)  # type: ignore[arg-type]
+            return info(fullnames)
+        self.reddit.info = limited  # type: ignore[method-assign]
+
+    @unittest.skipIf(prawcore is None, "prawcore is not installed")
+    def test_rate_limited_batch_is_retried(self) -> None:
+        post_ids = self.subreddit.order[:150]
+        self.rate_limit_info(1)
+        fetched = [s.id for s in self.engine.fetch_submissions(post_ids, lambda: False)]
+        self.assertEqual(fetched, post_ids)
+        # 429, retried, and the second page
+        self.assertEqual([r[2] for r in self.requests], [429, 200, 200])
+        self.assertFalse(any(r[1] == '/comments/{id}' for r in self.requests))
+
+    @unittest.skipIf(prawcore is None, "prawcore is not installed")
+    def test_rate_limited_batch_is_deferred(self) -> None:
+        post_ids = self.subreddit.order[:150]
+        self.rate_limit_info(2)
+        self.assertEqual(list(self.engine.fetch_submissions(post_ids, lambda: False)), [])
+        # no single fetches for the posts of the batch
+        self.assertEqual([r[1:3] for r in self.requests], [('/api/info', 429)] * 2)
+
+
+class TestSimulation(unittest.TestCase):
+    def test_percentile(self) -> None:
+        self.assertEqual(percentile([], 50), 0)
+        self.assertEqual(percentile([4, 1, 3, 2], 50), 2)
+        self.assertEqual(percentile([4, 1, 3, 2], 100), 4)
+
+    @unittest.skipIf(prawcore is None, "prawcore is not installed")
+    def test_run(self) -> None:
+        profile = LoadProfile(posts_per_minute=10, deletion_rate=0.5, removal_mix={'author': 1},
+                              purge_rate=0, lifetime_minutes=1)
+        report = Simulation(profile, cycles=6, settings={'sleep_minutes': 2}, memory_every=3).run()
+        self.assertEqual(report.exit_code, 0, msg=report.error)
+        self.assertGreater(report.posts, 0)
+        self.assertTrue(all(lag >= 0 for lag in report.lags))
+        self.assertGreater(report.modmails, 0)
+        self.assertEqual(len(report.latencies), report.modmails)
+        self.assertEqual([cycle for cycle, _ in report.memory], [1, 3, 6])
+        self.assertEqual(len(report.durations), 6)
+        self.assertIn('Capture lag', report.summary())
+
+    @unittest.skipIf(prawcore is None, "prawcore is not installed")
+    def test_posts_deleted_by_their_author(self) -> None:
+        profile = LoadProfile(posts_per_minute=5, deletion_rate=0.3, removal_mix={'author': 1},
+                              purge_rate=0, authors=40)
+        report = Simulation(profile, cycles=20, settings={'author_cache_ttl': 3600}, memory_every=20).run()
+        self.assertEqual(report.exit_code, 0, msg=report.error)
+        self.assertGreater(report.modmails, 0)
+        self.assertEqual(report.false_alarms, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1 +1,2 @@
 from .model import *  # noqa
+from .backends import *  # noqa
@@ -0,0 +1,557 @@
+# mypy: disable-error-code=attr-defined
+from __future__ import annotations
+import os
+import re
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from sqlite3 import (
+    OperationalError,
+    Connection,
+    connect,
+)
+from typing import (
+    TYPE_CHECKING,
+    Generator,
+    Optional,
+    Tuple,
+    List,
+    Dict,
+    Type,
+    Set,
+    Any,
+)
+
+if TYPE_CHECKING:
+    from .model import Model
+
+
+__all__ = (
+    'RawSQLNotSupported',
+    'Backend',
+    'SQLiteBackend',
+    'MemoryBackend',
+    'DictBackend',
+    'BACKENDS',
+    'get_backend',
+)
+
+
+class ConnectionManager:
+    def __init__(self, db: str, connection: Optional[Connection] = None,
+                 commit: bool = True) -> None:
+        self.db = db
+        self._owned = connection is None
+        self._commit = commit
+        self._connection = connect(self.db) if connection is None else connection
+
+    def __enter__(self) -> Connection:
+        return self._connection
+
+    def __exit__(self, *args: Any) -> None:
+        if self._commit:
+            self._connection.commit()
+        if self._owned:
+            self._connection.close()
+
+
+class RawSQLNotSupported(NotImplementedError): ...
+
+
+class Backend(ABC):
+    """Storage engine behind a `Model`. Backends receive and return plain
+    values; rows are tuples ordered like `model.table` and conditions are
+    `column=value` mappings combined with `AND`
+    """
+    def __init__(self, model: Model) -> None:
+        self.model = model
+        self.columns = tuple(model.table.keys())
+        self.fts_enabled = False
+
+    @abstractmethod
+    def execute(self, query: str, values: Optional[Tuple[Any, ...]] = None) -> Any:
+        """Run a raw SQL query
+
+        :raises RawSQLNotSupported: If the backend does not speak SQL
+        """
+
+    @abstractmethod
+    def init(self) -> None: ...
+
+    @abstractmethod
+    def insert(self, values: Dict[str, Any]) -> None: ...
+
+    def update(self, values: Dict[str, Any]) -> None:
+        """Replace the row with `values['id']`, or insert it if it is gone"""
+        self.delete({'id': values['id']})
+        self.insert(values)
+
+    @abstractmethod
+    def delete(self, where: Dict[str, Any]) -> None: ...
+
+    @abstractmethod
+    def select(self, where: Dict[str, Any]) -> List[Tuple[Any, ...]]: ...
+
+    @contextmanager
+    def transaction(self) -> Generator[None, None, None]:
+        """Apply every write made inside the block at once, or none of
+        them if the block raises
+        """
+        yield
+
+    @abstractmethod
+    def search(self, query: str, limit: int) -> List[Tuple[Any, ...]]:
+        """Rows of `fts_columns + fts_stored + ('id', 'archived')`, best
+        matches first. `archived` is true for rows deleted from the table
+        """
+
+    @abstractmethod
+    def prune_search(self, column: str, before: Any) -> int: ...
+
+    def size(self) -> int:
+        return 0
+
+    def free_pages(self) -> int:
+        return 0
+
+    def vacuum(self, pages: Optional[int] = None) -> None: ...
+
+    def optimize(self) -> None: ...
+
+    def compact(self) -> None: ...
+
+    def close(self) -> None: ...
+
+
+class SQLiteBackend(Backend):
+    """The default backend, a sqlite database file at `model.path`. Every
+    query opens its own short lived connection, except inside `transaction()`
+    where they all share one
+    """
+    def __init__(self, model: Model) -> None:
+        super().__init__(model)
+        self._transaction: Optional[Connection] = None
+        self.path = model.path
+        self.name = model.name
+        self.fts_name = model.fts_name
+        self.table_values = ' '.join(
+            f"{name} {datatype}," for (name, datatype) in model.table.items()
+        )[:-1]
+
+    def connection(self) -> ConnectionManager:
+        if self._transaction is not None:
+            return ConnectionManager(self.path, self._transaction, commit=False)
+        return ConnectionManager(self.path)
+
+    @contextmanager
+    def transaction(self) -> Generator[None, None, None]:
+        with self.connection() as con:
+            self._transaction = con
+            # sqlite3 only opens a transaction by itself before DML, schema
+            # changes would be committed as they run
+            if not con.in_transaction:
+                con.execute("BEGIN")
+            try:
+                yield
+            except BaseException:
+                con.rollback()
+                raise
+            else:
+                con.commit()
+            finally:
+                self._transaction = None
+
+    def _get_conditions(self, **where: Any) -> str:
+        keys = tuple(where.keys())
+
+        condition = ""
+        for index, key in enumerate(keys):
+            condition += f"{key} = ?"
+            if index != len(keys) - 1:
+                condition += " AND "
+
+        return condition
+
+    def execute(self, query: str, values: Optional[Tuple[Any, ...]] = None) -> Any:
+        with self.connection() as cur:
+            if values is None:
+                data = cur.execute(query)
+            else:
+                data = cur.execute(query, values)
+            return data.fetchall()
+
+    def init(self) -> None:
+        self._init_auto_vacuum()
+        query = f"""
+        CREATE TABLE IF NOT EXISTS {self.name} (
+            {self.table_values}
+        )
+        """
+        self.execute(query)
+        self._add_missing_columns()
+        for column in self.model.indexes:
+            self.execute(f"CREATE INDEX IF NOT EXISTS {self.name}_{column} ON {self.name} ({column})")
+        if self.model.fts_columns:
+            self._init_fts()
+
+    def _add_missing_columns(self) -> None:
+        """Bring a table created by an older schema up to date. New columns
+        are `NULL` for the rows that already exist
+        """
+        existing = {info[1] for info in self.execute(f"PRAGMA table_info({self.name})")}
+        for name, datatype in self.model.table.items():
+            if name not in existing:
+                self.execute(f"ALTER TABLE {self.name} ADD COLUMN {name} {datatype}")
+
+    def _init_auto_vacuum(self) -> None:
+        """Switch the database to `auto_vacuum=INCREMENTAL` so pages freed by
+        deletes can be handed back to the filesystem through `vacuum()`.
+        Databases created before this setting existed are converted once
+        with a full `VACUUM`
+        """
+        mode = self.execute("PRAGMA auto_vacuum")[0][0]
+        if mode != 2:  # 2 == INCREMENTAL
+            self.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            self.execute("VACUUM")
+
+    def _init_fts(self) -> None:
+        """Create the FTS5 table for `model.fts_columns` and the triggers that
+        keep it in sync with the main table. Rows are never removed from the
+        index when they are deleted from the main table, so deleted entries
+        stay searchable. If the sqlite build lacks FTS5, `search()` falls
+        back to a plain `LIKE` scan.
+
+        A live row is indexed under its own `id`. Once it is deleted its
+        entry moves to the next free negative rowid, because sqlite hands
+        the `id` of the newest row out again and the entry of the next row
+        saved would overwrite it. `row_id` keeps the original `id`
+        """
+        if not self._fts5_available():
+            self.fts_enabled = False
+            return
+        fts_columns, fts_stored = self.model.fts_columns, self.model.fts_stored
+        columns = fts_columns + fts_stored
+        exists = self.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name = ?",
+            (self.fts_name,),
+        )
+        # One transaction, so a crash halfway through a migration leaves the
+        # old index in place
+        with self.transaction():
+            legacy = exists and 'row_id' not in {
+                info[1] for info in self.execute(f"PRAGMA table_info({self.fts_name})")
+            }
+            if legacy:
+                # Indexes created before `row_id` existed are copied over below
+                for event in ('insert', 'update'):
+                    self.execute(f"DROP TRIGGER {self.fts_name}_{event}")
+                self.execute(f"ALTER TABLE {self.fts_name} RENAME TO {self.fts_name}_old")
+            definition = ', '.join(
+                fts_columns + tuple(f"{col} UNINDEXED" for col in fts_stored + ('row_id',))
+            )
+            self.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.fts_name} USING fts5({definition})")
+
+            names = ', '.join(columns)
+            new_values = ', '.join(f"new.{col}" for col in columns)
+            index_new = f"""
+            INSERT INTO {self.fts_name} (rowid, {names}, row_id)
+            VALUES (new.id, {new_values}, new.id);
+            """
+            self.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {self.fts_name}_insert
+            AFTER INSERT ON {self.name} BEGIN {index_new} END
+            """)
+            self.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {self.fts_name}_update
+            AFTER UPDATE ON {self.name} BEGIN
+                DELETE FROM {self.fts_name} WHERE rowid = old.id;
+                {index_new}
+            END
+            """)
+            self.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {self.fts_name}_delete
+            AFTER DELETE ON {self.name} BEGIN
+                UPDATE {self.fts_name} SET rowid = min(0, coalesce(
+                    (SELECT rowid FROM {self.fts_name} ORDER BY rowid LIMIT 1), 0
+                )) - 1
+                WHERE rowid = old.id;
+            END
+            """)
+            if legacy:
+                self.execute(f"""
+                INSERT INTO {self.fts_name} (rowid, {names}, row_id)
+                SELECT CASE WHEN rowid IN (SELECT id FROM {self.name}) THEN rowid ELSE -rowid END,
+                       {names}, rowid
+                FROM {self.fts_name}_old
+                """)
+                self.execute(f"DROP TABLE {self.fts_name}_old")
+            elif not exists:
+                # Index whatever was stored before full-text search was enabled
+                self.execute(f"""
+                INSERT INTO {self.fts_name} (rowid, {names}, row_id)
+                SELECT id, {names}, id FROM {self.name}
+                """)
+        self.fts_enabled = True
+
+    def _fts5_available(self) -> bool:
+        """Whether this sqlite build has FTS5. Checked before the migration
+        starts, so that an error creating the index is never mistaken for
+        a missing module halfway through it
+        """
+        try:
+            # one connection for both, temp tables go away with theirs
+            with self.transaction():
+                self.execute(f"CREATE VIRTUAL TABLE temp.{self.fts_name}_probe USING fts5(probe)")
+                self.execute(f"DROP TABLE temp.{self.fts_name}_probe")
+        except OperationalError:
+            return False
+        return True
+
+    def insert(self, values: Dict[str, Any]) -> None:
+        marks = ', '.join('?' for _ in values)
+        query = f"""
+        INSERT INTO {self.name} ({', '.join(values.keys())})
+        VALUES (
+            {marks}
+        )
+        """
+        self.execute(query, tuple(values.values()))
+
+    def update(self, values: Dict[str, Any]) -> None:
+        # An upsert rather than a delete and insert, so the search index
+        # does not archive the version being replaced
+        marks = ', '.join('?' for _ in values)
+        changes = ', '.join(f"{col} = excluded.{col}" for col in values if col != 'id')
+        query = f"""
+        INSERT INTO {self.name} ({', '.join(values.keys())})
+        VALUES (
+            {marks}
+        )
+        ON CONFLICT (id) DO UPDATE SET {changes}
+        """
+        self.execute(query, tuple(values.values()))
+
+    def delete(self, where: Dict[str, Any]) -> None:
+        condition = self._get_conditions(**where)
+
+        query = f"""
+        DELETE FROM {self.name}
+        WHERE
+            {condition}
+        """
+        self.execute(query, tuple(where.values()))
+
+    def select(self, where: Dict[str, Any]) -> List[Tuple[Any, ...]]:
+        query = f"SELECT {', '.join(self.columns)} FROM {self.name}"
+        if not where:
+            return self.execute(query)  # type: ignore
+
+        condition = self._get_conditions(**where)
+        query += f"""
+        WHERE
+            {condition}
+        """
+        return self.execute(query, tuple(where.values()))  # type: ignore
+
+    def search(self, query: str, limit: int) -> List[Tuple[Any, ...]]:
+        fts_columns = self.model.fts_columns
+        columns = ', '.join(fts_columns + self.model.fts_stored)
+        if self.fts_enabled:
+            sql = f"""
+            SELECT {columns}, row_id, rowid < 0 FROM {self.fts_name}
+            WHERE {self.fts_name} MATCH ?
+            ORDER BY rank
+            LIMIT ?
+            """
+            values: Tuple[Any, ...] = (query, limit)
+        else:
+            condition = ' OR '.join(f"{col} LIKE ?" for col in fts_columns)
+            sql = f"""
+            SELECT {columns}, id, 0 FROM {self.name}
+            WHERE {condition}
+            LIMIT ?
+            """
+            values = (*(f"%{query}%" for _ in fts_columns), limit)
+        return self.execute(sql, values)  # type: ignore
+
+    def prune_search(self, column: str, before: Any) -> int:
+        if not self.fts_enabled:
+            return 0
+        # Entries of deleted rows are the ones with a negative rowid
+        where = f"WHERE {column} < ? AND rowid < 0"
+        count = self.execute(f"SELECT COUNT(*) FROM {self.fts_name} {where}", (before,))[0][0]
+        if count:
+            self.execute(f"DELETE FROM {self.fts_name} {where}", (before,))
+        return int(count)
+
+    def size(self) -> int:
+        try:
+            return os.path.getsize(self.path)
+        except FileNotFoundError:
+            return 0
+
+    def free_pages(self) -> int:
+        return int(self.execute("PRAGMA freelist_count")[0][0])
+
+    def vacuum(self, pages: Optional[int] = None) -> None:
+        # The pragma frees a single page per step, `executescript` runs it
+        # to completion where `execute` would stop after the first one
+        with self.connection() as con:
+            con.executescript(f"PRAGMA incremental_vacuum({int(pages or 0)})")
+
+    def optimize(self) -> None:
+        self.execute("PRAGMA optimize")
+
+    def compact(self) -> None:
+        self.execute("VACUUM")
+
+
+class MemoryBackend(SQLiteBackend):
+    """A sqlite database that only lives in memory. Models with the same
+    name share it (shared cache) until the last of them is closed
+    """
+    def __init__(self, model: Model) -> None:
+        super().__init__(model)
+        self.uri = f"file:{self.name}?mode=memory&cache=shared"
+        self._connection: Optional[Connection] = connect(self.uri, uri=True, check_same_thread=False)
+
+    def connection(self) -> ConnectionManager:
+        if self._connection is None:
+            raise OperationalError(f"In-memory database {self.name!r} is closed")
+        return ConnectionManager(self.uri, self._connection, commit=self._transaction is None)
+
+    def size(self) -> int:
+        page_count = self.execute("PRAGMA page_count")[0][0]
+        page_size = self.execute("PRAGMA page_size")[0][0]
+        return int(page_count * page_size)
+
+    def close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+class DictBackend(Backend):
+    """A pure Python backend keeping rows in a dict keyed by `id`, with a
+    hash index per column for `select()`. Nothing is persisted. `search()`
+    only understands plain words, all of which must match
+    """
+    def __init__(self, model: Model) -> None:
+        super().__init__(model)
+        self._rows: Dict[int, Tuple[Any, ...]] = {}
+        self._indexes: Dict[str, Dict[Any, Set[int]]] = {col: {} for col in self.columns}
+        self._archive: Dict[int, Tuple[Any, ...]] = {}
+        self._last_id = 0
+
+    def execute(self, query: str, values: Optional[Tuple[Any, ...]] = None) -> Any:
+        raise RawSQLNotSupported("raw SQL is not supported by the dict backend")
+
+    def init(self) -> None:
+        self.fts_enabled = bool(self.model.fts_columns)
+
+    def _ids(self, where: Dict[str, Any]) -> Set[int]:
+        ids: Optional[Set[int]] = None
+        for column, value in where.items():
+            if column not in self._indexes:
+                raise OperationalError(f"no such column: {column}")
+            matches = self._indexes[column].get(value, set())
+            ids = set(matches) if ids is None else ids & matches
+            if not ids:
+                break
+        return set(self._rows) if ids is None else ids
+
+    @contextmanager
+    def transaction(self) -> Generator[None, None, None]:
+        rows, archive, last_id = dict(self._rows), dict(self._archive), self._last_id
+        try:
+            yield
+        except BaseException:
+            self._rows, self._archive, self._last_id = rows, archive, last_id
+            self._indexes = {col: {} for col in self.columns}
+            for id, row in self._rows.items():
+                for column, value in zip(self.columns, row):
+                    self._indexes[column].setdefault(value, set()).add(id)
+            raise
+
+    def insert(self, values: Dict[str, Any]) -> None:
+        for column in values:
+            if column not in self._indexes:
+                raise OperationalError(f"table {self.model.name} has no column named {column}")
+        id = values.get('id')
+        if id is None:
+            id = self._last_id + 1
+        elif id in self._rows:
+            raise ValueError(f"A row with id={id} already exists")
+        self._last_id = max(self._last_id, id)
+
+        row = tuple(id if col == 'id' else values.get(col) for col in self.columns)
+        self._rows[id] = row
+        for column, value in zip(self.columns, row):
+            self._indexes[column].setdefault(value, set()).add(id)
+        if self.fts_enabled:
+            self._archive[id] = self._fts_values(row)
+
+    def delete(self, where: Dict[str, Any]) -> None:
+        for id in self._ids(where):
+            row = self._rows.pop(id)
+            for column, value in zip(self.columns, row):
+                ids = self._indexes[column][value]
+                ids.discard(id)
+                if not ids:
+                    del self._indexes[column][value]
+
+    def select(self, where: Dict[str, Any]) -> List[Tuple[Any, ...]]:
+        return [self._rows[id] for id in sorted(self._ids(where))]
+
+    def _fts_values(self, row: Tuple[Any, ...]) -> Tuple[Any, ...]:
+        names = self.model.fts_columns + self.model.fts_stored + ('id',)
+        return tuple(row[self.columns.index(name)] for name in names)
+
+    def search(self, query: str, limit: int) -> List[Tuple[Any, ...]]:
+        terms = [term.lower() for term in re.findall(r'\w+', query)]
+        width = len(self.model.fts_columns)
+        scored = []
+        for values in self._archive.values():
+            words = re.findall(r'\w+', ' '.join(str(v or '') for v in values[:width]).lower())
+            counts = [words.count(term) for term in terms]
+            if terms and all(counts):
+                scored.append((-sum(counts) / len(words), values[-1], values))
+        scored.sort()
+        return [(*values, values[-1] not in self._rows) for *_, values in scored[:limit]]
+
+    def prune_search(self, column: str, before: Any) -> int:
+        index = (self.model.fts_columns + self.model.fts_stored).index(column)
+        stale = [
+            id for id, values in self._archive.items()
+            if id not in self._rows and values[index] is not None and values[index] < before
+        ]
+        for id in stale:
+            del self._archive[id]
+        return len(stale)
+
+    def close(self) -> None:
+        self._rows.clear()
+        self._archive.clear()
+        for index in self._indexes.values():
+            index.clear()
+
+
+BACKENDS: Dict[str, Type[Backend]] = {
+    'sqlite': SQLiteBackend,
+    'memory': MemoryBackend,
+    'dict': DictBackend,
+}
+
+
+def get_backend(name: str) -> Type[Backend]:
+    """Look up a backend class by its configuration name
+
+    :param name: One of `BACKENDS`
+    :type name: str
+    :raises ValueError: If there is no such backend
+    :return: The backend class
+    :rtype: Type[Backend]
+    """
+    try:
+        return BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown database backend {name!r}, choose one of {tuple(BACKENDS)}")
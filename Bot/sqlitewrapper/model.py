@@ -1,13 +1,13 @@
 # mypy: disable-error-code=attr-defined
 from __future__ import annotations
+import time
 from pathlib import Path
-from sqlite3 import (
-    Connection,
-    connect,
-)
+from contextlib import contextmanager
+from .backends import get_backend
 from typing import (
     Generator,
     Optional,
+    Callable,
     Tuple,
     List,
     Dict,
@@ -19,6 +19,7 @@ __all__ = (
     'Row',
     'Model',
     'Datatype',
+    'UnitOfWork',
 )
 
 
@@ -70,29 +71,101 @@ class Datatype:
     BLOB = 'BLOB'
 
 
-class ConnectionManager:
-    def __init__(self, db: str) -> None:
-        self.db = db
-        self._connection = connect(self.db)
-
-    def __enter__(self) -> Connection:
-        return self._connection
+class UnitOfWork:
+    """Collects the writes (`save`, `edit`, `delete`) made to a `Model` and
+    applies them in a single transaction when the block exits, or earlier
+    once `max_pending` writes are queued. Consecutive edits of the same row
+    are collapsed into one. If the block raises, the queued writes are
+    dropped. Reads inside the block only see flushed writes. Example:
+    ```
+        >>> with model.unit_of_work():
+        ...     model.save(row)
+        ...     model.edit(other_row)
+    ```
+    """
+    def __init__(self, model: Model, max_pending: int = 500) -> None:
+        self.model = model
+        self.max_pending = max_pending
+        self.pending: List[Tuple[str, Dict[str, Any]]] = []
+        self._edits: Dict[Any, int] = {}
+        self._depth = 0
+
+    def __len__(self) -> int:
+        return len(self.pending)
+
+    def __enter__(self) -> UnitOfWork:
+        self._depth += 1
+        self.model._unit_of_work = self
+        return self
 
-    def __exit__(self, *args: Any) -> None:
-        self._connection.commit()
-        self._connection.close()
+    def __exit__(self, exc_type: Any, *args: Any) -> None:
+        self._depth -= 1
+        if self._depth:
+            return
+        self.model._unit_of_work = None
+        if exc_type is None:
+            self.flush()
+        else:
+            self.discard()
+            self.model._discarded()
+
+    def add(self, action: str, values: Dict[str, Any]) -> None:
+        if action == 'edit' and values['id'] in self._edits:
+            self.pending[self._edits[values['id']]] = (action, values)
+            return
+        if action == 'edit':
+            self._edits[values['id']] = len(self.pending)
+        elif action == 'delete':
+            # An edit queued before a delete must not absorb later edits
+            self._edits.clear()
+        self.pending.append((action, values))
+        if len(self.pending) >= self.max_pending:
+            self.flush()
+
+    def flush(self) -> None:
+        """Apply the queued writes in one transaction"""
+        if not self.pending:
+            return
+        with self.model._timed('flush'), self.model.backend.transaction():
+            for action, values in self.pending:
+                self.model._apply(action, values)
+        self.discard()
+
+    def discard(self) -> None:
+        """Forget the queued writes without applying them"""
+        self.pending.clear()
+        self._edits.clear()
 
 
 class Model:
-    def __init__(self, db_name: str, save_path: Path, **table: Any) -> None:
+    # Columns mirrored into a full-text index (`{name}_fts`) for `search()`.
+    # Leave empty to disable full-text search for a model
+    fts_columns: Tuple[str, ...] = ()
+    # Extra columns stored, but not indexed, in the full-text index
+    fts_stored: Tuple[str, ...] = ()
+    # Columns that get an index for faster `get`/`filter`/`delete` lookups
+    indexes: Tuple[str, ...] = ()
+    # Called with the operation ('execute', 'save', 'edit', 'delete',
+    # 'select' or 'flush') and its duration in seconds, e.g. for metrics
+    on_query: Optional[Callable[[str, float], None]] = None
+
+    def __init__(self, db_name: str, save_path: Path,
+                 backend: str = 'sqlite', **table: Any) -> None:
+        """
+        :param db_name: Name of the database and its table
+        :type db_name: str
+        :param save_path: Directory of the database file
+        :type save_path: Path
+        :param backend: Storage engine, one of `BACKENDS`, defaults to 'sqlite'
+        :type backend: str, optional
+        """
         self.name = db_name
         self.path = str(Path(f"{save_path}/.{db_name}.sqlite"))
         self.table = table
         self.table['id'] = Datatype.ID
-
-        self.table_values = ' '.join(
-            f"{name} {datatype}," for (name, datatype) in table.items()
-        )[:-1]
+        self.fts_name = f"{db_name}_fts"
+        self.backend = get_backend(backend)(self)
+        self._unit_of_work: Optional[UnitOfWork] = None
 
     def __str__(self) -> str:
         data = list(self.fetch_all())
@@ -104,16 +177,9 @@ class Model:
     def __hash__(self) -> int:
         return hash(self.path)
 
-    def _get_conditions(self, **where: Any) -> str:
-        keys = tuple(where.keys())
-
-        condition = ""
-        for index, key in enumerate(keys):
-            condition += f"{key} = ?"
-            if index != len(keys) - 1:
-                condition += " AND "
-
-        return condition
+    @property
+    def fts_enabled(self) -> bool:
+        return self.backend.fts_enabled
 
     def execute(self, query: str, values: Optional[Tuple[Row, ...]] = None) -> Any:
         """Execute a query
@@ -124,26 +190,64 @@ class Model:
         :type values: Optional[Tuple[Row, ...]], optional
         :raises Exception: If tha database has not been initialized
                             before trying to execute any queries
+        :raises RawSQLNotSupported: If the backend does not speak SQL
         :return: Whatever the query would return
         :rtype: Any
         """
-        with ConnectionManager(self.path) as cur:
-            if values is None:
-                data = cur.execute(query)
-            else:
-                data = cur.execute(query, values)
-            return data.fetchall()
+        with self._timed('execute'):
+            return self.backend.execute(query, values)
+
+    @contextmanager
+    def _timed(self, operation: str) -> Generator[None, None, None]:
+        if self.on_query is None:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.on_query(operation, time.perf_counter() - started)
 
     def init(self) -> None:
         """Create a table based on the `self.table` (**table) kwargs
         provided upon initialization
         """
-        query = f"""
-        CREATE TABLE IF NOT EXISTS {self.name} (
-            {self.table_values}
-        )
+        self.backend.init()
+
+    def close(self) -> None:
+        """Release the backend. In-memory backends lose their data"""
+        self.backend.close()
+
+    def unit_of_work(self, max_pending: int = 500) -> UnitOfWork:
+        """Buffer writes and apply them together, see `UnitOfWork`. Opening
+        it again while one is active returns the active one
+
+        :param max_pending: Flush early once this many writes are queued
+        :type max_pending: int, optional
+        :return: The context manager
+        :rtype: UnitOfWork
         """
-        self.execute(query)
+        if self._unit_of_work is not None:
+            return self._unit_of_work
+        return UnitOfWork(self, max_pending)
+
+    def _write(self, action: str, values: Dict[str, Any]) -> None:
+        if self._unit_of_work is None:
+            self._apply(action, values)
+        else:
+            self._unit_of_work.add(action, values)
+
+    def _discarded(self) -> None:
+        """Called when a `UnitOfWork` drops its queued writes"""
+
+    def _apply(self, action: str, values: Dict[str, Any]) -> None:
+        with self._timed(action):
+            if action == 'save':
+                self.backend.insert(values)
+            elif action == 'edit':
+                self.backend.update(values)
+            elif action == 'delete':
+                self.backend.delete(values)
 
     def save(self, row: Row) -> None:
         """Save a row into the db. Example:
@@ -162,17 +266,7 @@ class Model:
             raise ValueError(f"Row fields {row.keys()} do not much db schema\
  {tuple(self.table.keys())[:-1]}. Consider adding 'Datatype.NULL' for the missing fields")
 
-        marks = []
-        for _ in row.values():
-            marks.append('?')
-
-        query = f"""
-        INSERT INTO {self.name} {row.keys()}
-        VALUES (
-            {", ".join(marks)}
-        )
-        """
-        self.execute(query, row.values())
+        self._write('save', dict(row.items()))
 
     def delete(self, **where: Any) -> None:
         """Delete a row from the db. Example:
@@ -182,15 +276,7 @@ class Model:
             >>> self.delete(name='John')
         ```
         """
-        values = tuple(where.values())
-        condition = self._get_conditions(**where)
-
-        query = f"""
-        DELETE FROM {self.name}
-        WHERE
-            {condition}
-        """
-        self.execute(query, values)
+        self._write('delete', where)
 
     def edit(self, row: Row) -> None:
         """After you picked and changed a row, use this instead of `save` in order
@@ -204,21 +290,7 @@ class Model:
         :param row: _description_
         :type row: Row
         """
-        id = row.id
-        self.delete(id=id)
-
-        marks = []
-        for _ in row.values():
-            marks.append('?')
-
-        query = f"""
-        INSERT INTO {self.name} {row.keys()}
-        VALUES (
-            {", ".join(marks)}
-        )
-        """
-
-        self.execute(query, row.values())
+        self._write('edit', dict(row.items()))
 
     def _entries_as_rows(self, data: List[Any]) -> List[Row]:
         """Take a list of entries and convert it to a list of `Row`s
@@ -245,8 +317,8 @@ class Model:
         return rows
 
     def fetch_all(self) -> Generator[Row, None, None]:
-        query = f"SELECT * FROM {self.name}"
-        data = self.execute(query)
+        with self._timed('select'):
+            data = self.backend.select({})
 
         rows = self._entries_as_rows(data)
         yield from rows
@@ -266,16 +338,8 @@ class Model:
         :rtype: Generator[Row, None, None]
         """
         # cursor.execute("SELECT * FROM my_table WHERE name = ? AND age = ?", (name, age))
-        values = tuple(where.values())
-        condition = self._get_conditions(**where)
-
-        query = f"""
-        SELECT * FROM {self.name}
-        WHERE
-            {condition}
-        """
-
-        data = self.execute(query, values)
+        with self._timed('select'):
+            data = self.backend.select(where)
         rows = self._entries_as_rows(data)
         yield from rows
 
@@ -289,21 +353,94 @@ class Model:
         :return: A `Row` with the values of the matching row
         :rtype: Row
         """
-        values = tuple(where.values())
-
-        condition = self._get_conditions(**where)
-
-        query = f"""
-        SELECT * FROM {self.name}
-        WHERE
-            {condition}
-        """
-        data = self.execute(query, values)[0]
+        with self._timed('select'):
+            data = self.backend.select(where)[0]
         row = {}
         for value, name in zip(data, tuple(self.table.keys())):
             row[name] = value
         return Row(**row)
 
+    def size(self) -> int:
+        """Size of the database in bytes, 0 if it does not exist yet"""
+        return self.backend.size()
+
+    def free_pages(self) -> int:
+        """Number of unused pages waiting to be reclaimed by `vacuum()`"""
+        return self.backend.free_pages()
+
+    def vacuum(self, pages: Optional[int] = None) -> None:
+        """Return free pages to the filesystem with `PRAGMA incremental_vacuum`
+
+        :param pages: Maximum number of pages to reclaim, defaults to all of them
+        :type pages: Optional[int], optional
+        """
+        self.backend.vacuum(pages)
+
+    def optimize(self) -> None:
+        """Let sqlite refresh the query planner statistics it deems stale"""
+        self.backend.optimize()
+
+    def maintain(self, pages: Optional[int] = None) -> Tuple[int, int]:
+        """Cheap periodic maintenance: `vacuum()` followed by `optimize()`
+
+        :param pages: Forwarded to `vacuum()`
+        :type pages: Optional[int], optional
+        :return: The database size in bytes before and after
+        :rtype: Tuple[int, int]
+        """
+        before = self.size()
+        self.vacuum(pages)
+        self.optimize()
+        return before, self.size()
+
+    def compact(self) -> Tuple[int, int]:
+        """Rebuild the whole database file with `VACUUM`. Unlike `maintain()`
+        this also defragments the pages still in use, but it rewrites the
+        entire file so it is meant to be run by hand
+
+        :return: The database size in bytes before and after
+        :rtype: Tuple[int, int]
+        """
+        before = self.size()
+        self.backend.compact()
+        self.optimize()
+        return before, self.size()
+
+    def search(self, query: str, limit: int = 50) -> Generator[Row, None, None]:
+        """Full-text search over `self.fts_columns`, best matches first. Example:
+        ```
+            >>> self.search('creeper AND explosion')
+            <Row{...}>
+        ```
+
+        :param query: An FTS5 query (words, "phrases", `AND`/`OR`/`NOT`, `col:term`)
+        :type query: str
+        :param limit: Maximum number of rows to return, defaults to 50
+        :type limit: int, optional
+        :raises ValueError: If the model has no `fts_columns`
+        :yield: Row with `self.fts_columns`, `self.fts_stored`, `id` and
+            `archived`, whether the row was deleted from the table since
+        :rtype: Generator[Row, None, None]
+        """
+        if not self.fts_columns:
+            raise ValueError(f"{self.__class__.__name__} has no full-text columns")
+
+        columns = self.fts_columns + self.fts_stored + ('id', 'archived')
+        for data in self.backend.search(query, limit):
+            yield Row(**dict(zip(columns, data)))
+
+    def prune_search(self, column: str, before: Any) -> int:
+        """Remove entries that are no longer in the table from the full-text
+        index when their `column` value is lower than `before`
+
+        :param column: One of `self.fts_columns` or `self.fts_stored`
+        :type column: str
+        :param before: Entries with a lower `column` value are removed
+        :type before: Any
+        :return: The number of entries removed
+        :rtype: int
+        """
+        return self.backend.prune_search(column, before)
 
 if __name__ == '__main__':
     pass
@@ -2,11 +2,14 @@
 import unittest
 import os
 from pathlib import Path
+from sqlite3 import OperationalError
+from typing import Any, Optional, Tuple
 from .model import (
     Row,
     Model,
     Datatype
 )
+from .backends import RawSQLNotSupported
 
 
 class TestRow(unittest.TestCase):
@@ -24,12 +27,15 @@ class TestRow(unittest.TestCase):
 
 
 class TestModel(unittest.TestCase):
+    backend = 'sqlite'
+
     def setUp(self) -> None:
         self.base_dir = Path(__file__).parent
         self.name = 'testdb'
         self.db = Model(
             self.name,
             self.base_dir,
+            self.backend,
             name=Datatype.STR,
             age=Datatype.INT,
         )
@@ -37,7 +43,9 @@ class TestModel(unittest.TestCase):
         return super().setUp()
 
     def tearDown(self) -> None:
-        os.remove(self.db.path)
+        self.db.close()
+        if self.backend == 'sqlite':
+            os.remove(self.db.path)
         return super().tearDown()
 
     def test_init(self) -> None:
@@ -81,3 +89,295 @@ class TestModel(unittest.TestCase):
         data = list(filtered)  # type: ignore
         self.assertTrue(all(i.age == age for i in data))  # type: ignore
         self.assertEqual(len(data), 2)
+
+    def test_unit_of_work(self) -> None:
+        self.db.save(Row(name='John', age=14))
+        row = self.db.get(name='John')
+        with self.db.unit_of_work() as uow:
+            self.db.save(Row(name='Mary', age=15))
+            row.age = 15
+            self.db.edit(row)
+            row.age = 16
+            self.db.edit(row)
+            self.assertEqual(len(uow), 2, msg="Repeated edits of a row were not collapsed")
+            self.assertEqual(len(list(self.db.fetch_all())), 1, msg="A buffered write was applied early")
+        self.assertEqual(self.db.get(name='John').age, 16)
+        self.assertEqual(self.db.get(name='Mary').age, 15)
+
+    def test_unit_of_work_discards_on_error(self) -> None:
+        self.db.save(Row(name='John', age=14))
+        with self.assertRaises(RuntimeError):
+            with self.db.unit_of_work():
+                self.db.save(Row(name='Mary', age=15))
+                self.db.delete(name='John')
+                raise RuntimeError
+        self.assertEqual([r.name for r in self.db.fetch_all()], ['John'])
+
+    def test_unit_of_work_is_atomic(self) -> None:
+        with self.assertRaises(Exception):
+            with self.db.unit_of_work():
+                self.db.save(Row(name='John', age=14))
+                self.db.edit(Row(id=99, no_such_column=1))
+        self.assertEqual(len(list(self.db.fetch_all())), 0)
+
+    def test_on_query(self) -> None:
+        observed = []
+        self.db.on_query = lambda operation, seconds: observed.append((operation, seconds))
+        with self.db.unit_of_work():
+            self.db.save(Row(name='John', age=14))
+        row = self.db.get(name='John')
+        self.db.delete(id=row.id)
+        self.assertEqual([op for op, _ in observed], ['save', 'flush', 'select', 'delete'])
+        self.assertTrue(all(seconds >= 0 for _, seconds in observed))
+
+    def test_unit_of_work_flushes_at_threshold(self) -> None:
+        with self.db.unit_of_work(max_pending=2) as uow:
+            self.db.save(Row(name='John', age=14))
+            self.db.save(Row(name='Mary', age=15))
+            self.assertEqual(len(uow), 0)
+            self.assertEqual(len(list(self.db.fetch_all())), 2)
+            self.db.delete(name='John')
+        self.assertEqual([r.name for r in self.db.fetch_all()], ['Mary'])
+
+    def test_add_missing_columns(self) -> None:
+        if self.backend == 'dict':
+            self.skipTest("The dict backend does not persist its schema")
+        self.db.save(Row(name='John', age=14))
+        db = Model(self.name, self.base_dir, self.backend,
+                   name=Datatype.STR, age=Datatype.INT, city=Datatype.STR)
+        db.init()
+        self.assertEqual(db.get(name='John').city, None)
+        db.save(Row(name='Mary', age=15, city='Athens'))
+        self.assertEqual(db.get(name='Mary').city, 'Athens')
+        self.assertEqual(db.get(name='Mary').age, 15)
+        db.close()
+
+    def test_auto_vacuum(self) -> None:
+        self.assertEqual(self.db.execute("PRAGMA auto_vacuum")[0][0], 2)
+
+    def test_vacuum_and_compact(self) -> None:
+        for i in range(200):
+            self.db.save(Row(name='x' * 1000, age=i))
+        grown = self.db.size()
+        self.db.delete(name='x' * 1000)
+        self.assertGreater(self.db.free_pages(), 0)
+
+        before, after = self.db.maintain()
+        self.assertEqual(before, grown)
+        self.assertLess(after, before)
+        self.assertEqual(self.db.free_pages(), 0)
+
+        before, after = self.db.compact()
+        self.assertLessEqual(after, before)
+
+
+class TestMemoryModel(TestModel):
+    backend = 'memory'
+
+    def test_init(self) -> None:
+        self.assertFalse(os.path.exists(self.db.path))
+
+    def test_shared_cache(self) -> None:
+        other = Model(self.name, self.base_dir, self.backend, name=Datatype.STR, age=Datatype.INT)
+        self.db.save(Row(name='John', age=14))
+        self.assertEqual(other.get(name='John').age, 14)
+        other.close()
+
+
+class TestDictModel(TestModel):
+    backend = 'dict'
+
+    def test_init(self) -> None:
+        self.assertFalse(os.path.exists(self.db.path))
+
+    def test_auto_vacuum(self) -> None:
+        with self.assertRaisesRegex(RawSQLNotSupported, "dict backend"):
+            self.db.execute("PRAGMA auto_vacuum")
+
+    def test_vacuum_and_compact(self) -> None:
+        self.db.save(Row(name='John', age=14))
+        self.assertEqual(self.db.maintain(), (0, 0))
+        self.assertEqual(self.db.compact(), (0, 0))
+
+    def test_index_consistency(self) -> None:
+        self.db.save(Row(name='John', age=14))
+        self.db.save(Row(name='Mary', age=14))
+        row = self.db.get(name='John')
+        row.age = 15
+        self.db.edit(row)
+        self.assertEqual([r.name for r in self.db.filter(age=14)], ['Mary'])
+        self.assertEqual([r.id for r in self.db.filter(name='John', age=15)], [row.id])
+        self.db.delete(age=14)
+        self.assertEqual(len(list(self.db.filter(name='Mary'))), 0)
+
+    def test_unknown_backend(self) -> None:
+        with self.assertRaises(ValueError):
+            Model(self.name, self.base_dir, 'nosuchbackend', name=Datatype.STR)
+
+
+class SearchModel(Model):
+    fts_columns = ('title', 'text')
+    fts_stored = ('author',)
+
+
+class TestModelSearch(unittest.TestCase):
+    backend = 'sqlite'
+
+    def setUp(self) -> None:
+        self.db = SearchModel(
+            'testsearch',
+            Path(__file__).parent,
+            self.backend,
+            author=Datatype.STR,
+            title=Datatype.STR,
+            text=Datatype.STR,
+        )
+        self.db.init()
+        return super().setUp()
+
+    def tearDown(self) -> None:
+        self.db.close()
+        if self.backend == 'sqlite':
+            os.remove(self.db.path)
+        return super().tearDown()
+
+    def test_search(self) -> None:
+        self.db.save(Row(author='John', title='Creeper exploded', text='A creeper blew up my house'))
+        self.db.save(Row(author='Mary', title='Server lag', text='A creeper farm'))
+        self.db.save(Row(author='Nick', title='Redstone', text='Nothing to see'))
+
+        result = list(self.db.search('creeper'))
+        self.assertEqual(len(result), 2)
+        self.assertEqual({r.author for r in result}, {'John', 'Mary'})
+        self.assertEqual(list(self.db.search('creeper', limit=1))[0].author, 'John')
+
+    def test_search_follows_edits_and_keeps_deleted(self) -> None:
+        self.db.save(Row(author='John', title='Creeper exploded', text='My house is gone'))
+        row = self.db.get(author='John')
+        row.title = 'Ghast exploded'
+        self.db.edit(row)
+        self.assertEqual(len(list(self.db.search('creeper'))), 0)
+        self.assertEqual(len(list(self.db.search('ghast'))), 1)
+
+        self.assertFalse(list(self.db.search('ghast'))[0].archived)
+
+        self.db.delete(author='John')
+        result = list(self.db.search('ghast'))
+        self.assertEqual(len(result), 1)
+        self.assertEqual(result[0].id, row.id)
+        self.assertTrue(result[0].archived)
+
+    def test_search_keeps_deleted_when_id_is_reused(self) -> None:
+        self.db.save(Row(author='John', title='Creeper exploded', text='My house is gone'))
+        self.db.save(Row(author='Mary', title='Ghast attack', text='Fireballs everywhere'))
+        mary = self.db.get(author='Mary')
+        self.db.delete(author='Mary')
+        self.db.save(Row(author='Nick', title='Redstone', text='Nothing to see'))
+
+        result = list(self.db.search('ghast'))
+        self.assertEqual([r.author for r in result], ['Mary'])
+        self.assertEqual(result[0].id, mary.id)
+        self.assertTrue(result[0].archived)
+        self.assertEqual([(r.author, bool(r.archived)) for r in self.db.search('redstone')], [('Nick', False)])
+
+    def test_prune_search(self) -> None:
+        self.db.save(Row(author='John', title='Creeper exploded', text='My house is gone'))
+        self.db.save(Row(author='Mary', title='Creeper farm', text='Nothing to see'))
+        self.db.delete(author='John')
+        self.assertEqual(self.db.prune_search('author', 'Z'), 1)
+        self.assertEqual([r.author for r in self.db.search('creeper')], ['Mary'])
+
+    def test_search_indexes_existing_rows(self) -> None:
+        if self.backend == 'dict':
+            self.skipTest("The dict backend indexes rows on insert")
+        for name in (f'{self.db.fts_name}_insert', f'{self.db.fts_name}_update', f'{self.db.fts_name}_delete'):
+            self.db.execute(f"DROP TRIGGER {name}")
+        self.db.execute(f"DROP TABLE {self.db.fts_name}")
+        self.db.save(Row(author='John', title='Creeper exploded', text='My house is gone'))
+        self.db.init()
+        self.assertEqual(len(list(self.db.search('house'))), 1)
+
+    def _legacy_index(self) -> None:
+        """Rebuild the search index the way it was laid out before deleted
+        entries were moved out of the way of reused ids
+        """
+        self.db.save(Row(author='John', title='Creeper exploded', text='My house is gone'))
+        self.db.save(Row(author='Mary', title='Ghast attack', text='Fireballs everywhere'))
+        for name in (f'{self.db.fts_name}_insert', f'{self.db.fts_name}_update', f'{self.db.fts_name}_delete'):
+            self.db.execute(f"DROP TRIGGER {name}")
+        self.db.execute(f"DROP TABLE {self.db.fts_name}")
+        self.db.execute(f"CREATE VIRTUAL TABLE {self.db.fts_name} USING fts5(title, text, author UNINDEXED)")
+        self.db.execute(f"""
+        INSERT INTO {self.db.fts_name} (rowid, title, text, author)
+        SELECT id, title, text, author FROM {self.db.name}
+        """)
+        self.db.execute(f"DELETE FROM {self.db.name} WHERE author = 'Mary'")
+        for event in ('insert', 'update'):
+            self.db.execute(f"""
+            CREATE TRIGGER {self.db.fts_name}_{event}
+            AFTER {event.upper()} ON {self.db.name} BEGIN
+                INSERT OR REPLACE INTO {self.db.fts_name} (rowid, title, text, author)
+                VALUES (new.id, new.title, new.text, new.author);
+            END
+            """)
+
+    def test_search_migrates_index_without_row_id(self) -> None:
+        if self.backend == 'dict':
+            self.skipTest("The dict backend keeps no index on disk")
+        self._legacy_index()
+        self.db.init()
+        self.db.save(Row(author='Nick', title='Redstone', text='Nothing to see'))
+        self.assertEqual([r.author for r in self.db.search('ghast')], ['Mary'])
+        self.assertEqual([r.author for r in self.db.search('creeper')], ['John'])
+        self.assertEqual(self.db.prune_search('author', 'Z'), 1)
+
+    def _failing_fts5(self, probe: bool) -> None:
+        """Make creating FTS5 tables fail, the probe for the module only if
+        `probe`
+        """
+        execute = self.db.backend.execute
+
+        def failing(query: str, values: Optional[Tuple[Any, ...]] = None) -> Any:
+            if 'USING fts5' in query and probe == ('_probe' in query):
+                raise OperationalError("no such module: fts5")
+            return execute(query, values)
+        self.db.backend.execute = failing  # type: ignore[method-assign]
+
+    def _assert_legacy_index(self) -> None:
+        tables = {row[0] for row in self.db.execute("SELECT name FROM sqlite_master")}
+        self.assertIn(f'{self.db.fts_name}_insert', tables)
+        self.assertNotIn(f'{self.db.fts_name}_old', tables)
+        self.assertEqual(
+            [row[0] for row in self.db.execute(f"SELECT author FROM {self.db.fts_name} WHERE {self.db.fts_name} MATCH 'ghast'")],
+            ['Mary'],
+        )
+
+    def test_search_migration_without_fts5(self) -> None:
+        if self.backend == 'dict':
+            self.skipTest("The dict backend keeps no index on disk")
+        self._legacy_index()
+        self._failing_fts5(probe=True)
+        self.db.init()
+        self.assertFalse(self.db.fts_enabled)
+        self._assert_legacy_index()
+
+    def test_search_migration_rolls_back_on_error(self) -> None:
+        if self.backend == 'dict':
+            self.skipTest("The dict backend keeps no index on disk")
+        self._legacy_index()
+        self._failing_fts5(probe=False)
+        with self.assertRaises(OperationalError):
+            self.db.init()
+        self._assert_legacy_index()
+
+    def test_search_without_fts_columns(self) -> None:
+        with self.assertRaises(ValueError):
+            list(Model('nofts', Path(__file__).parent, name=Datatype.STR).search('x'))
+
+
+class TestMemoryModelSearch(TestModelSearch):
+    backend = 'memory'
+
+
+class TestDictModelSearch(TestModelSearch):
+    backend = 'dict'
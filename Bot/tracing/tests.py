@@ -0,0 +1,74 @@
+import json
+import shutil
+import unittest
+from pathlib import Path
+from .tracing import (
+    JsonlExporter,
+    Tracer,
+    Span,
+)
+
+
+TMP_DIR = Path(__file__).parent / 'tmp_test'
+
+
+class TestTracer(unittest.TestCase):
+    def setUp(self) -> None:
+        TMP_DIR.mkdir(exist_ok=True)
+        self.path = str(TMP_DIR / 'traces.jsonl')
+        self.tracer = Tracer(JsonlExporter(self.path))
+        return super().setUp()
+
+    def tearDown(self) -> None:
+        self.tracer.close()
+        shutil.rmtree(TMP_DIR)
+        return super().tearDown()
+
+    def spans(self):
+        self.tracer.flush()
+        with open(self.path) as f:
+            lines = [json.loads(line) for line in f]
+        return {
+            span['name']: span
+            for line in lines
+            for span in line['resourceSpans'][0]['scopeSpans'][0]['spans']
+        }
+
+    def test_nesting(self) -> None:
+        with self.tracer.span('cycle', cycle=1):
+            with self.tracer.span('revalidate', **{'post.id': 'abc'}) as span:
+                span.set(outcome='edited')
+                self.tracer.record('GET /comments/{id}', 0.25, **{'http.status_code': 200})
+
+        spans = self.spans()
+        cycle, revalidate, request = spans['cycle'], spans['revalidate'], spans['GET /comments/{id}']
+        self.assertNotIn('parentSpanId', cycle)
+        self.assertEqual(revalidate['parentSpanId'], cycle['spanId'])
+        self.assertEqual(request['parentSpanId'], revalidate['spanId'])
+        self.assertEqual({revalidate['traceId'], request['traceId']}, {cycle['traceId']})
+        self.assertEqual(revalidate['attributes'], [
+            {'key': 'post.id', 'value': {'stringValue': 'abc'}},
+            {'key': 'outcome', 'value': {'stringValue': 'edited'}},
+        ])
+        self.assertEqual(request['attributes'], [{'key': 'http.status_code', 'value': {'intValue': '200'}}])
+        self.assertEqual(int(request['endTimeUnixNano']) - int(request['startTimeUnixNano']), 250_000_000)
+        self.assertEqual(revalidate['status'], {'code': 1})
+
+    def test_error(self) -> None:
+        with self.assertRaises(KeyError):
+            with self.tracer.span('db.get', **{'post.id': 'abc'}):
+                raise KeyError('abc')
+        self.assertIsNone(self.tracer.current().set(ignored=True))
+        self.assertEqual(self.spans()['db.get']['status'], {'code': 2, 'message': "KeyError: 'abc'"})
+
+    def test_disabled(self) -> None:
+        tracer = Tracer()
+        with tracer.span('cycle') as span:
+            span.set(cycle=1)
+            tracer.record('GET /api/info', 0.1)
+        self.assertFalse(tracer.enabled)
+        self.assertNotIsInstance(span, Span)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,201 @@
+from __future__ import annotations
+import json
+import time
+import random
+import contextvars
+from contextlib import contextmanager
+from logger import FileSink
+from typing import (
+    Generator,
+    Optional,
+    Union,
+    List,
+    Dict,
+    Any,
+)
+
+
+__all__ = (
+    'Span',
+    'Tracer',
+    'JsonlExporter',
+)
+
+
+AttributeValue = Union[str, bool, int, float]
+_current: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar('current_span', default=None)
+
+
+class Span:
+    """A timed operation, part of the trace of its root span"""
+    __slots__ = ('name', 'trace_id', 'span_id', 'parent_id', 'start_ns', 'end_ns',
+                 'attributes', 'error')
+
+    def __init__(self, name: str, parent: Optional[Span] = None,
+                 attributes: Optional[Dict[str, AttributeValue]] = None) -> None:
+        self.name = name
+        self.trace_id: str = parent.trace_id if parent is not None else f"{random.getrandbits(128):032x}"
+        self.span_id: str = f"{random.getrandbits(64):016x}"
+        self.parent_id: Optional[str] = parent.span_id if parent is not None else None
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes: Dict[str, AttributeValue] = attributes or {}
+        self.error: Optional[str] = None
+
+    def __str__(self) -> str:
+        return f"<{self.__class__.__name__}({self.name!r}, span_id={self.span_id})>"
+
+    def __repr__(self) -> str:
+        return str(self)
+
+    @property
+    def duration(self) -> float:
+        """Seconds, up to now if the span has not ended"""
+        end = time.time_ns() if self.end_ns is None else self.end_ns
+        return (end - self.start_ns) / 1e9
+
+    def set(self, **attributes: AttributeValue) -> None:
+        self.attributes.update(attributes)
+
+
+class _NoopSpan:
+    """Stands in for a span while tracing is disabled"""
+    def set(self, **attributes: AttributeValue) -> None:
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+def _otlp_value(value: AttributeValue) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        # 64 bit integers are strings in OTLP/JSON
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+class JsonlExporter:
+    """Appends every finished span to `path` as one line of OTLP/JSON (an
+    `ExportTraceServiceRequest`), the format the OpenTelemetry collector's
+    `otlpjsonfile` receiver reads. Lines are written from a background
+    thread, and the file is rotated like a log file (see `FileSink`)
+    """
+    def __init__(self, path: str, service_name: str = 'DeletedPostsBot',
+                 max_bytes: int = 0, backup_count: int = 5) -> None:
+        self.path = path
+        self.service_name = service_name
+        self._sink = FileSink(path, buffered=True, max_bytes=max_bytes, backup_count=backup_count)
+
+    def __str__(self) -> str:
+        return f"<{self.__class__.__name__}({self.path!r})>"
+
+    def __repr__(self) -> str:
+        return str(self)
+
+    def to_otlp(self, span: Span) -> Dict[str, Any]:
+        otlp_span: Dict[str, Any] = {
+            'traceId': span.trace_id,
+            'spanId': span.span_id,
+            'name': span.name,
+            'kind': 1,  # SPAN_KIND_INTERNAL
+            'startTimeUnixNano': str(span.start_ns),
+            'endTimeUnixNano': str(span.end_ns),
+            'attributes': [{'key': k, 'value': _otlp_value(v)} for k, v in span.attributes.items()],
+            # STATUS_CODE_OK or STATUS_CODE_ERROR
+            'status': {'code': 1} if span.error is None else {'code': 2, 'message': span.error},
+        }
+        if span.parent_id is not None:
+            otlp_span['parentSpanId'] = span.parent_id
+        return {'resourceSpans': [{
+            'resource': {'attributes': [
+                {'key': 'service.name', 'value': {'stringValue': self.service_name}},
+            ]},
+            'scopeSpans': [{'scope': {'name': 'deletedposts'}, 'spans': [otlp_span]}],
+        }]}
+
+    def export(self, span: Span) -> None:
+        self._sink.write(json.dumps(self.to_otlp(span), separators=(',', ':')) + '\n')
+
+    def flush(self) -> None:
+        self._sink.flush()
+
+    def close(self) -> None:
+        self._sink.close()
+
+
+class Tracer:
+    """Creates spans that nest through a context variable, and hands them
+    to `exporter` when they end. Without an exporter spans cost next to
+    nothing and are not recorded. Example:
+    ```
+        >>> tracer = Tracer(JsonlExporter('traces.jsonl'))
+        >>> with tracer.span('revalidate', **{'post.id': 'abc'}) as span:
+        ...     span.set(deleted=True)
+    ```
+    """
+    def __init__(self, exporter: Optional[JsonlExporter] = None) -> None:
+        self.exporter = exporter
+
+    def __str__(self) -> str:
+        return f"<{self.__class__.__name__}({self.exporter})>"
+
+    def __repr__(self) -> str:
+        return str(self)
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    def current(self) -> Union[Span, _NoopSpan]:
+        """The innermost open span, or a stand-in that ignores attributes"""
+        span = _current.get()
+        return _NOOP if span is None else span
+
+    @contextmanager
+    def span(self, name: str, **attributes: AttributeValue) -> Generator[Union[Span, _NoopSpan], None, None]:
+        """Time the block as a child of the current span. An exception
+        marks the span as failed and is re-raised
+        """
+        if self.exporter is None:
+            yield _NOOP
+            return
+        span = Span(name, _current.get(), attributes)
+        token = _current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            _current.reset(token)
+            self._end(span)
+
+    def record(self, name: str, seconds: float, error: Optional[str] = None, /,
+               **attributes: AttributeValue) -> None:
+        """Add a span that already finished, e.g. reported by a callback
+        afterwards, as a child of the current span. `error` is positional
+        only so that no attribute name can clash with it
+        """
+        if self.exporter is None:
+            return
+        span = Span(name, _current.get(), attributes)
+        span.end_ns = time.time_ns()
+        span.start_ns = span.end_ns - int(seconds * 1e9)
+        span.error = error
+        self.exporter.export(span)
+
+    def _end(self, span: Span) -> None:
+        span.end_ns = time.time_ns()
+        self.exporter.export(span)  # type: ignore
+
+    def flush(self) -> None:
+        if self.exporter is not None:
+            self.exporter.flush()
+
+    def close(self) -> None:
+        if self.exporter is not None:
+            self.exporter.close()
@@ -1,2 +1,6 @@
 from .constants import *  # noqa
 from .actions import *  # noqa
+from .stats import *  # noqa
+from .settings import *  # noqa
+from .profiling import *  # noqa
+from .scheduler import *  # noqa
@@ -1,19 +1,23 @@
 # mypy: disable-error-code=attr-defined
 import os
+import sqlite3
+import hashlib
 import datetime as dt
 from bot import Posts
 from pathlib import Path
 from enum import Enum
-from typing import List
+from typing import Optional, List
 from logger import Logger
 from sqlitewrapper import Row
 
 
 __all__ = (
     'Flair',
+    'fingerprint',
     'get_flair',
     'modmail_removal_notification',
     'parse_cmd_line_args',
+    'search_posts',
     'submission_is_older',
     'string_to_dt',
 )
@@ -75,6 +79,17 @@ config = {
 }
 """
 
+# the bot's state files that ``reset_db`` removes along with the database,
+# relative to the directory the database is in
+RESET_FILES = (
+    '.deleted_posts.seen',
+    # the cycle checkpoint, its journal and its lock
+    '.deleted_posts.checkpoint',
+    '.deleted_posts.checkpoint.journal',
+    '.deleted_posts.checkpoint.lock',
+)
+
+
 def parse_cmd_line_args(args: List[str], logger: Logger, config_file: Path, posts: Posts) -> bool:
     """Parse a very small set of operations from ``sys.argv``.
 
@@ -95,6 +110,15 @@ def parse_cmd_line_args(args: List[str], logger: Logger, config_file: Path, post
     Command: reset_db
     Args: []
     Description: Reset the database
+
+    Command: compact
+    Args: []
+    Description: Rebuild the database file to reclaim unused space
+
+    Command: search
+    Args: [query]
+    Description: Full-text search the titles, text and authors of tracked and
+                 deleted posts, best matches first
 """
     if len(args) > 1:
         if args[1] == 'help':
@@ -110,12 +134,51 @@ def parse_cmd_line_args(args: List[str], logger: Logger, config_file: Path, post
                 os.remove(posts.path)
             except FileNotFoundError:
                 logger.error("No database found")
+            # the ids seen before the reset would keep their posts from
+            # being tracked again, and a checkpoint would resume a cycle
+            # over posts that are gone
+            for name in RESET_FILES:
+                try:
+                    os.remove(Path(posts.path).parent / name)
+                except FileNotFoundError:
+                    pass
+        elif args[1] == 'compact':
+            posts.init()
+            before, after = posts.compact()
+            logger.info(f"Database compacted: {before:,} -> {after:,} bytes")
+        elif args[1] == 'search':
+            posts.init()
+            search_posts(' '.join(args[2:]), logger, posts)
         else:
             logger.info(help_msg)
         return True
     return False
 
 
+def search_posts(query: str, logger: Logger, posts: Posts) -> None:
+    if not query:
+        logger.error("Usage: search <query>")
+        return
+    try:
+        results = list(posts.search(query))
+    except sqlite3.OperationalError as e:
+        logger.error(f"Invalid search query {query!r}: {e}")
+        return
+
+    for row in results:
+        # rows that expired or were flaired leave the table without a method
+        status = (row.deletion_method or 'Archived') if row.archived else 'Tracked'
+        logger.info(f"https://old.reddit.com/comments/{row.post_id} | u/{row.username} | {status} | {row.title}")
+    logger.info(f"{len(results)} result(s) for {query!r}")
+
+
+def fingerprint(text: Optional[str]) -> str:
+    """A short digest of a post's text, used to tell whether it changed
+    without keeping or comparing the whole body
+    """
+    return hashlib.blake2b((text or '').encode(), digest_size=16).hexdigest()
+
+
 def submission_is_older(submission_date: dt.date, max_days: int) -> bool:
     current_date = dt.datetime.now().date()
     time_difference = current_date - submission_date
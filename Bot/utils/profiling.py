@@ -0,0 +1,125 @@
+import io
+import pstats
+import cProfile
+import tracemalloc
+from pathlib import Path
+from contextlib import contextmanager
+from typing import (
+    Generator,
+    Optional,
+    List,
+)
+
+
+__all__ = (
+    'CycleProfiler',
+    'ProfileReport',
+)
+
+
+class ProfileReport:
+    """What `CycleProfiler.profile()` found about one cycle"""
+    def __init__(self, cycle: int) -> None:
+        self.cycle = cycle
+        self.profile_path: Optional[Path] = None
+        self.snapshot_path: Optional[Path] = None
+        # the slowest functions and the lines that allocated the most
+        self.functions: List[str] = []
+        self.allocations: List[str] = []
+
+    def __str__(self) -> str:
+        return f"<{self.__class__.__name__}(cycle={self.cycle}, profile_path={self.profile_path})>"
+
+    def __repr__(self) -> str:
+        return str(self)
+
+    def summary(self) -> str:
+        return '\n'.join((
+            f"Profile of cycle {self.cycle} saved to {self.profile_path} and {self.snapshot_path}",
+            "Slowest functions (cumulative time):",
+            *(f"    {line}" for line in self.functions),
+            "Memory allocated during the cycle, by line:",
+            *(f"    {line}" for line in self.allocations),
+        ))
+
+
+class CycleProfiler:
+    """Profiles every `every`th cycle with cProfile and tracemalloc, and
+    leaves the others alone so that the overhead stays negligible. The
+    `.prof` (open with `pstats` or snakeviz) and `.snapshot` (open with
+    `tracemalloc.Snapshot.load`) files of the last `keep` profiled cycles
+    are kept in `directory`. Example:
+    ```
+        >>> profiler = CycleProfiler(Path('profiles'), every=10)
+        >>> with profiler.profile(cycle) as report:
+        ...     run_cycle()
+        >>> if report is not None:
+        ...     print(report.summary())
+    ```
+    """
+    def __init__(self, directory: Path, every: int = 0, top: int = 15, keep: int = 10) -> None:
+        self.directory = directory
+        self.every = every
+        self.top = top
+        self.keep = keep
+
+    def __str__(self) -> str:
+        return f"<{self.__class__.__name__}({str(self.directory)!r}, every={self.every})>"
+
+    def __repr__(self) -> str:
+        return str(self)
+
+    def sampled(self, cycle: int) -> bool:
+        return self.every > 0 and cycle % self.every == 0
+
+    @contextmanager
+    def profile(self, cycle: int) -> Generator[Optional[ProfileReport], None, None]:
+        """Profile the block if `cycle` is sampled. The report is yielded
+        right away and filled in once the block exits; `None` otherwise
+        """
+        if not self.sampled(cycle):
+            yield None
+            return
+
+        report = ProfileReport(cycle)
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield report
+        finally:
+            profiler.disable()
+            after = tracemalloc.take_snapshot()
+            if started_tracing:
+                tracemalloc.stop()
+            self._save(report, profiler, before, after)
+
+    def _save(self, report: ProfileReport, profiler: cProfile.Profile,
+              before: tracemalloc.Snapshot, after: tracemalloc.Snapshot) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        report.profile_path = self.directory / f"cycle-{report.cycle}.prof"
+        report.snapshot_path = self.directory / f"cycle-{report.cycle}.snapshot"
+        profiler.dump_stats(str(report.profile_path))
+        after.dump(str(report.snapshot_path))
+
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(self.top)
+        # keep the table rows, without the header pstats prints above them
+        rows = out.getvalue().splitlines()
+        header = next((i for i, line in enumerate(rows) if line.lstrip().startswith('ncalls')), -1)
+        report.functions = [line for line in rows[header + 1:] if line.strip()]
+        report.allocations = [str(stat) for stat in after.compare_to(before, 'lineno')[:self.top]]
+        self._prune()
+
+    def _prune(self) -> None:
+        for pattern in ('cycle-*.prof', 'cycle-*.snapshot'):
+            # oldest first; the cycle number breaks ties of the mtime
+            dumps = sorted(
+                self.directory.glob(pattern),
+                key=lambda path: (path.stat().st_mtime_ns, int(path.stem.split('-')[-1])),
+            )
+            for path in dumps[:max(0, len(dumps) - self.keep)]:
+                path.unlink()
@@ -0,0 +1,85 @@
+from collections import deque
+from typing import (
+    Deque,
+    Iterable,
+    Optional,
+    Tuple,
+)
+
+
+__all__ = (
+    'PollScheduler',
+)
+
+
+class PollScheduler:
+    """Picks the sleep between cycles from how busy the subreddit is. The
+    arrival rate is estimated from the `created_utc` of the posts listed in
+    the last `window` seconds, the deletion rate from the cycles of the last
+    `window` seconds. The sleep is the shorter of the times it takes for
+    `target_posts` new posts (so the listing does not overflow) and for
+    `target_deletions` deletions to happen, kept between `min_sleep` and
+    `max_sleep`. A quiet subreddit is polled every `max_sleep` seconds.
+    Example:
+    ```
+        >>> scheduler = PollScheduler(60, 900, target_posts=90)
+        >>> scheduler.observe_listing([submission.created_utc for submission in listing], time.time())
+        >>> scheduler.observe_cycle(deleted=3, now=time.monotonic())
+        >>> time.sleep(scheduler.next_sleep())
+    ```
+    """
+    def __init__(self, min_sleep: float, max_sleep: float, target_posts: float = 50,
+                 target_deletions: float = 1, window: float = 3600) -> None:
+        self.min_sleep = min_sleep
+        self.max_sleep = max_sleep
+        self.target_posts = target_posts
+        self.target_deletions = target_deletions
+        self.window = window
+        # posts per second, None until a listing was observed
+        self.arrival_rate: Optional[float] = None
+        # (when the cycle ended, posts deleted in it)
+        self._cycles: Deque[Tuple[float, int]] = deque()
+
+    def __str__(self) -> str:
+        return f"<{self.__class__.__name__}({self.min_sleep}, {self.max_sleep})>"
+
+    def __repr__(self) -> str:
+        return str(self)
+
+    def observe_listing(self, created: Iterable[float], now: float) -> None:
+        """Estimate the arrival rate from the creation times of the newest
+        posts, `now` being a UNIX timestamp
+        """
+        created = list(created)
+        if not created:
+            self.arrival_rate = 0.0
+            return
+        recent = [when for when in created if when >= now - self.window]
+        # a listing cut short of the window only tells about the time it spans
+        span = self.window if len(recent) < len(created) else now - min(created)
+        self.arrival_rate = len(recent) / max(span, 1.0)
+
+    def observe_cycle(self, deleted: int, now: float) -> None:
+        self._cycles.append((now, deleted))
+        while self._cycles and self._cycles[0][0] < now - self.window:
+            self._cycles.popleft()
+
+    @property
+    def deletion_rate(self) -> float:
+        """Deletions per second over the cycles in the window"""
+        if len(self._cycles) < 2:
+            return 0.0
+        # the first cycle only marks the start of the span
+        span = self._cycles[-1][0] - self._cycles[0][0]
+        deleted = sum(n for _, n in list(self._cycles)[1:])
+        return deleted / span if span > 0 else 0.0
+
+    def next_sleep(self) -> float:
+        """Seconds to wait before the next cycle"""
+        sleep = self.max_sleep
+        if self.arrival_rate:
+            sleep = min(sleep, self.target_posts / self.arrival_rate)
+        deletion_rate = self.deletion_rate
+        if deletion_rate:
+            sleep = min(sleep, self.target_deletions / deletion_rate)
+        return max(self.min_sleep, min(self.max_sleep, sleep))
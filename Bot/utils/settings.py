@@ -0,0 +1,121 @@
+import os
+import sys
+import json
+import importlib.util
+from pathlib import Path
+from typing import (
+    Optional,
+    Tuple,
+    List,
+    Dict,
+    Any,
+)
+
+
+__all__ = (
+    'RESTART_KEYS',
+    'ConfigWatcher',
+    'changed_keys',
+    'load_config',
+    'validate_config',
+)
+
+
+REQUIRED_KEYS = ('client_id', 'client_secret', 'user_agent', 'username', 'password', 'sub_name')
+# whole numbers that cannot be negative
+INTEGER_KEYS = (
+    'max_days', 'max_posts', 'sleep_minutes', 'maintenance_cycles', 'write_buffer_size',
+    'seen_bloom_bits', 'author_cache_ttl', 'author_cache_size', 'log_max_bytes',
+    'log_backup_count', 'archive_days', 'metrics_port', 'profile_every', 'profile_top',
+    'api_budget', 'min_sleep_minutes', 'max_sleep_minutes',
+)
+# only read when the bot starts
+RESTART_KEYS = (
+    'client_id', 'client_secret', 'user_agent', 'username', 'password',
+    'db_backend', 'seen_bloom_bits', 'log_path', 'log_format', 'log_max_bytes',
+    'log_max_days', 'log_backup_count', 'metrics_port', 'metrics_host', 'trace_path',
+)
+
+
+def load_config(config_path: Path, override_path: Optional[Path] = None) -> Dict[str, Any]:
+    """Execute ``config_path`` and return a copy of its ``config`` dict, with
+    the keys of the JSON object in ``override_path`` on top when that file
+    exists. The module is registered as ``config`` in ``sys.modules``
+    """
+    spec = importlib.util.spec_from_file_location('config', str(config_path))
+    if spec is None or spec.loader is None:
+        raise ImportError(f"Cannot load the configuration from {str(config_path)!r}")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    sys.modules['config'] = module
+
+    config = dict(module.config)
+    if override_path is not None and os.path.exists(override_path):
+        with open(override_path, mode='r') as f:
+            override = json.load(f)
+        if not isinstance(override, dict):
+            raise ValueError(f"{str(override_path)!r} must hold a JSON object")
+        config.update(override)
+    return config
+
+
+def validate_config(config: Dict[str, Any]) -> None:
+    """Raise ``ValueError`` listing every problem found in ``config``.
+    Integer settings given as strings (e.g. from the environment) are
+    converted in place
+    """
+    errors = [f"{key!r} is missing" for key in REQUIRED_KEYS if key not in config]
+    for key in INTEGER_KEYS:
+        value = config.get(key)
+        if value is None or value == '':
+            continue
+        try:
+            config[key] = int(value)
+        except (TypeError, ValueError):
+            errors.append(f"{key!r} must be an integer, got {value!r}")
+            continue
+        if config[key] < 0:
+            errors.append(f"{key!r} cannot be negative")
+    if errors:
+        raise ValueError('; '.join(errors))
+
+
+def changed_keys(old: Dict[str, Any], new: Dict[str, Any]) -> List[str]:
+    return sorted(key for key in old.keys() | new.keys() if old.get(key) != new.get(key))
+
+
+class ConfigWatcher:
+    """Tells when the configuration files changed since the last check,
+    by their modification time and size. Files that do not exist count
+    as unchanged until they appear
+    """
+    def __init__(self, *paths: Optional[Path]) -> None:
+        self.paths = tuple(path for path in paths if path is not None)
+        self._stamps = self._stamp()
+
+    def __str__(self) -> str:
+        return f"<{self.__class__.__name__}({', '.join(map(str, self.paths))})>"
+
+    def __repr__(self) -> str:
+        return str(self)
+
+    def _stamp(self) -> Tuple[Optional[Tuple[int, int]], ...]:
+        stamps: List[Optional[Tuple[int, int]]] = []
+        for path in self.paths:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                stamps.append(None)
+            else:
+                stamps.append((stat.st_mtime_ns, stat.st_size))
+        return tuple(stamps)
+
+    def changed(self) -> bool:
+        """Whether any file changed since the previous call. A change is
+        reported once, whether or not the new content turns out valid
+        """
+        stamps = self._stamp()
+        if stamps == self._stamps:
+            return False
+        self._stamps = stamps
+        return True
@@ -0,0 +1,79 @@
+import time
+from contextlib import contextmanager
+from typing import (
+    Generator,
+    Optional,
+    Callable,
+    List,
+    Dict,
+    Any,
+)
+
+
+__all__ = (
+    'CycleStats',
+)
+
+
+class CycleStats:
+    """Durations and counters of a single bot cycle. Phases can be entered
+    several times and nest; each one accumulates its own wall time. API
+    calls are counted against the innermost open phase. Example:
+    ```
+        >>> stats = CycleStats(1)
+        >>> with stats.phase('listing'):
+        ...     stats.count('new')
+        >>> stats.summary()
+        {'cycle': 1, 'duration': 0.42, 'phases': {'listing': 0.42}, 'new': 1, ...}
+    ```
+    """
+    COUNTERS = ('new', 'edited', 'deleted', 'expired', 'deferred', 'modmail', 'api_calls')
+
+    def __init__(self, cycle: int, clock: Callable[[], float] = time.perf_counter) -> None:
+        self.cycle = cycle
+        self._clock = clock
+        self._started = clock()
+        self.phases: Dict[str, float] = {}
+        self.counts: Dict[str, int] = dict.fromkeys(self.COUNTERS, 0)
+        # API calls by phase, 'other' outside of any
+        self.calls: Dict[str, int] = {}
+        self._open: List[str] = []
+
+    def __str__(self) -> str:
+        return f"<{self.__class__.__name__}({self.summary()})>"
+
+    def __repr__(self) -> str:
+        return str(self)
+
+    @contextmanager
+    def phase(self, name: str) -> Generator[None, None, None]:
+        started = self._clock()
+        self._open.append(name)
+        try:
+            yield
+        finally:
+            self._open.pop()
+            self.phases[name] = self.phases.get(name, 0.0) + self._clock() - started
+
+    @property
+    def current_phase(self) -> Optional[str]:
+        return self._open[-1] if self._open else None
+
+    def count(self, name: str, n: int = 1) -> None:
+        self.counts[name] = self.counts.get(name, 0) + n
+
+    def count_call(self) -> None:
+        """Count an API call, against the current phase"""
+        phase = self.current_phase or 'other'
+        self.calls[phase] = self.calls.get(phase, 0) + 1
+        self.counts['api_calls'] += 1
+
+    def summary(self) -> Dict[str, Any]:
+        """The cycle as a flat record of typed values, durations in seconds"""
+        return {
+            'cycle': self.cycle,
+            'duration': round(self._clock() - self._started, 4),
+            'phases': {name: round(value, 4) for name, value in self.phases.items()},
+            'calls': dict(self.calls),
+            **self.counts,
+        }
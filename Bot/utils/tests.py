@@ -1,14 +1,32 @@
+import os
+import json
+import shutil
+import tempfile
 import unittest
+import unittest.mock
 import datetime as dt
 from pathlib import Path
 from .actions import (
     Flair,
     get_flair,
+    fingerprint,
     string_to_dt,
     submission_is_older,
     parse_cmd_line_args,
+    search_posts,
 )
+from bot import Posts
 from logger import Logger
+from sqlitewrapper import Row
+from .stats import CycleStats
+from .profiling import CycleProfiler
+from .scheduler import PollScheduler
+from .settings import (
+    ConfigWatcher,
+    changed_keys,
+    load_config,
+    validate_config,
+)
 
 
 class DummyPosts:
@@ -33,6 +51,12 @@ class TestActions(unittest.TestCase):
         uknown = get_flair('fsdafsd')
         self.assertEqual(uknown, Flair.UKNOWN)
 
+    def test_fingerprint(self) -> None:
+        self.assertEqual(fingerprint('text'), fingerprint('text'))
+        self.assertNotEqual(fingerprint('text'), fingerprint('text.'))
+        self.assertEqual(fingerprint(None), fingerprint(''))
+        self.assertEqual(len(fingerprint('x' * 100_000)), 32)
+
     def test_string_to_dt(self) -> None:
         datetime = dt.datetime.now()
         string_dt = str(datetime)
@@ -78,3 +102,213 @@ class TestActions(unittest.TestCase):
         result = parse_cmd_line_args(["prog", "reset_db"], logger, cfg_file, posts)
         self.assertTrue(result)
         self.assertFalse(db_file.exists())
+
+    def test_parse_cmd_line_args_reset_db_with_state_files(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            posts = Posts('deleted_posts', Path(tmp))
+            db_file = Path(posts.path)
+            db_file.write_text("x")
+            seen_file = Path(tmp) / ".deleted_posts.seen"
+            seen_file.write_bytes(b"\x00")
+            checkpoint = Path(tmp) / ".deleted_posts.checkpoint"
+            checkpoint_files = [checkpoint, Path(f"{checkpoint}.journal"), Path(f"{checkpoint}.lock")]
+            for path in checkpoint_files:
+                path.write_text("{}")
+            result = parse_cmd_line_args(["prog", "reset_db"], Logger(1), Path(tmp) / "config.py", posts)
+            self.assertTrue(result)
+            self.assertFalse(db_file.exists())
+            self.assertFalse(seen_file.exists())
+            for path in checkpoint_files:
+                self.assertFalse(path.exists())
+
+    def test_search_posts_labels_archived_rows(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            posts = Posts('deleted_posts', Path(tmp))
+            posts.init()
+            for post_id, method in (('live', None), ('expired', None), ('removed', 'Deleted by user')):
+                posts.save(Row(
+                    username='John', title='Creeper', text='Text', post_id=post_id,
+                    deletion_method=method, post_last_edit=None,
+                    record_created='2023-01-01 00:00:00.000000',
+                    record_edited='2023-01-01 00:00:00.000000',
+                    reddit_edited=0.0, text_hash=None,
+                ))
+            posts.delete(post_id='expired')
+            posts.delete(post_id='removed')
+            logger = Logger(1)
+            with unittest.mock.patch.object(logger, 'info') as info:
+                search_posts('creeper', logger, posts)
+            posts.close()
+        statuses = {}
+        for (line,), _ in info.call_args_list[:-1]:
+            link, _, status, _ = line.split(' | ')
+            statuses[link.rsplit('/', 1)[1]] = status
+        self.assertEqual(statuses, {'live': 'Tracked', 'expired': 'Archived', 'removed': 'Deleted by user'})
+
+
+class TestCycleStats(unittest.TestCase):
+    def test_summary(self) -> None:
+        now = [0.0]
+        stats = CycleStats(3, clock=lambda: now[0])
+        with stats.phase('revalidation'):
+            now[0] += 2
+            with stats.phase('modmail'):
+                now[0] += 1
+        with stats.phase('modmail'):
+            now[0] += 0.5
+        stats.count('deleted')
+        stats.count('deleted', 2)
+        stats.count('custom')
+
+        summary = stats.summary()
+        self.assertEqual(summary['cycle'], 3)
+        self.assertEqual(summary['duration'], 3.5)
+        self.assertEqual(summary['phases'], {'modmail': 1.5, 'revalidation': 3.0})
+        self.assertEqual(summary['deleted'], 3)
+        self.assertEqual(summary['new'], 0)
+        self.assertEqual(summary['custom'], 1)
+
+    def test_calls_by_phase(self) -> None:
+        stats = CycleStats(1)
+        stats.count_call()
+        with stats.phase('revalidation'):
+            stats.count_call()
+            with stats.phase('modmail'):
+                self.assertEqual(stats.current_phase, 'modmail')
+                stats.count_call()
+            stats.count_call()
+        self.assertIsNone(stats.current_phase)
+
+        summary = stats.summary()
+        self.assertEqual(summary['api_calls'], 4)
+        self.assertEqual(summary['calls'], {'other': 1, 'revalidation': 2, 'modmail': 1})
+
+
+class TestSettings(unittest.TestCase):
+    def setUp(self) -> None:
+        self.dir = Path(__file__).parent / "tmp_settings"
+        self.dir.mkdir(exist_ok=True)
+        self.config_path = self.dir / "config.py"
+        self.override_path = self.dir / "override.json"
+        self.config_path.write_text(
+            "config = {'client_id': 'id', 'client_secret': 's', 'user_agent': 'ua',\n"
+            "          'username': 'u', 'password': 'p', 'sub_name': 'sub', 'max_days': 180}\n"
+        )
+        return super().setUp()
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.dir)
+        return super().tearDown()
+
+    def test_load_with_override(self) -> None:
+        config = load_config(self.config_path, self.override_path)
+        self.assertEqual(config['max_days'], 180)
+
+        self.override_path.write_text(json.dumps({'max_days': 30, 'sleep_minutes': '2'}))
+        config = load_config(self.config_path, self.override_path)
+        validate_config(config)
+        self.assertEqual(config['max_days'], 30)
+        self.assertEqual(config['sleep_minutes'], 2)
+
+        self.override_path.write_text("[1, 2]")
+        with self.assertRaises(ValueError):
+            load_config(self.config_path, self.override_path)
+
+    def test_validate(self) -> None:
+        config = load_config(self.config_path)
+        config['max_posts'] = ''
+        validate_config(config)
+        config.update(max_days=-1, sleep_minutes='soon')
+        del config['sub_name']
+        with self.assertRaises(ValueError) as ctx:
+            validate_config(config)
+        for key in ('max_days', 'sleep_minutes', 'sub_name'):
+            self.assertIn(key, str(ctx.exception))
+
+    def test_watcher(self) -> None:
+        watcher = ConfigWatcher(self.config_path, self.override_path, None)
+        self.assertFalse(watcher.changed())
+        self.override_path.write_text("{}")
+        self.assertTrue(watcher.changed())
+        self.assertFalse(watcher.changed())
+
+        stat = os.stat(self.config_path)
+        os.utime(self.config_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+        self.assertTrue(watcher.changed())
+
+    def test_changed_keys(self) -> None:
+        self.assertEqual(changed_keys({'a': 1, 'b': 2}, {'a': 1, 'b': 3, 'c': 4}), ['b', 'c'])
+
+
+class TestCycleProfiler(unittest.TestCase):
+    def setUp(self) -> None:
+        self.dir = Path(__file__).parent / "tmp_profiles"
+        return super().setUp()
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.dir, ignore_errors=True)
+        return super().tearDown()
+
+    def test_sampling(self) -> None:
+        profiler = CycleProfiler(self.dir)
+        self.assertFalse(any(profiler.sampled(cycle) for cycle in range(1, 10)))
+        profiler.every = 3
+        self.assertEqual([c for c in range(1, 10) if profiler.sampled(c)], [3, 6, 9])
+        with profiler.profile(4) as report:
+            pass
+        self.assertIsNone(report)
+        self.assertFalse(self.dir.exists())
+
+    def test_profile(self) -> None:
+        profiler = CycleProfiler(self.dir, every=1, top=5, keep=2)
+        for cycle in (1, 2, 3):
+            with profiler.profile(cycle) as report:
+                data = [fingerprint(str(i)) for i in range(2000)]
+        self.assertEqual(len(data), 2000)
+        assert report is not None and report.snapshot_path is not None
+        self.assertEqual(report.profile_path, self.dir / "cycle-3.prof")
+        self.assertTrue(report.snapshot_path.exists())
+        self.assertTrue(any('fingerprint' in line for line in report.functions))
+        self.assertLessEqual(len(report.allocations), 5)
+        self.assertIn("cycle 3", report.summary())
+        self.assertEqual(sorted(p.name for p in self.dir.glob('*.prof')), ['cycle-2.prof', 'cycle-3.prof'])
+
+
+class TestPollScheduler(unittest.TestCase):
+    def setUp(self) -> None:
+        self.scheduler = PollScheduler(60, 900, target_posts=50, target_deletions=1, window=3600)
+        return super().setUp()
+
+    def arrival_rate(self) -> float:
+        assert self.scheduler.arrival_rate is not None, "No listing was observed"
+        return self.scheduler.arrival_rate
+
+    def test_quiet(self) -> None:
+        self.assertEqual(self.scheduler.next_sleep(), 900)
+        self.scheduler.observe_listing([], 10_000)
+        self.assertEqual(self.scheduler.arrival_rate, 0)
+        self.assertEqual(self.scheduler.next_sleep(), 900)
+
+    def test_arrivals(self) -> None:
+        now = 100_000.0
+        # one post every 10 seconds over the last hour, then older ones
+        created = [now - 10 * i for i in range(1, 361)] + [now - 7200, now - 9000]
+        self.scheduler.observe_listing(created, now)
+        self.assertAlmostEqual(self.arrival_rate(), 0.1)
+        self.assertAlmostEqual(self.scheduler.next_sleep(), 500)
+
+        # a listing cut short of the window: 100 posts over the last 100 seconds
+        self.scheduler.observe_listing([now - i for i in range(1, 101)], now)
+        self.assertAlmostEqual(self.arrival_rate(), 1)
+        self.assertEqual(self.scheduler.next_sleep(), 60)
+
+    def test_deletions(self) -> None:
+        for minute in range(0, 70, 10):
+            self.scheduler.observe_cycle(2 if minute else 0, minute * 60.0)
+        # 12 deletions over an hour, one every 5 minutes
+        self.assertAlmostEqual(self.scheduler.deletion_rate, 12 / 3600)
+        self.assertAlmostEqual(self.scheduler.next_sleep(), 300)
+        # cycles older than the window are forgotten
+        self.scheduler.observe_cycle(0, 7200.0)
+        self.scheduler.observe_cycle(0, 7800.0)
+        self.assertEqual(self.scheduler.deletion_rate, 0)